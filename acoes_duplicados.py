@@ -0,0 +1,283 @@
+import os
+
+from formatacao import formatar_bytes
+from movimentacao import PlanoMovimentacao, tamanho_pasta
+
+# Ações para um grupo de arquivos duplicados (modo_acao)
+MANTER_TODOS = 0
+MANTER_PRIMEIRO = 1
+ESCOLHA_MANUAL = 2
+COPIAR_TODOS = 3
+DEDUPLICAR = 4  # troca as cópias por reflinks (ou hardlinks) do arquivo mantido
+
+
+def obter_pasta_tipo_arquivo(extensao):
+    """
+    Retorna o nome da pasta para um determinado tipo de arquivo baseado na extensão.
+    """
+    extensao = extensao.lower().lstrip('.')
+    
+    # Mapeamento de extensões para tipos de arquivo
+    tipos = {
+        # Documentos
+        'pdf': 'PDFs',
+        'doc': 'Documentos',
+        'docx': 'Documentos',
+        'txt': 'Documentos',
+        'rtf': 'Documentos',
+        'odt': 'Documentos',
+        'xls': 'Planilhas',
+        'xlsx': 'Planilhas',
+        'csv': 'Planilhas',
+        'ods': 'Planilhas',
+        'ppt': 'Apresentacoes',
+        'pptx': 'Apresentacoes',
+        'odp': 'Apresentacoes',
+        
+        # Imagens
+        'jpg': 'Imagens',
+        'jpeg': 'Imagens',
+        'png': 'Imagens',
+        'gif': 'Imagens',
+        'bmp': 'Imagens',
+        'tif': 'Imagens',
+        'tiff': 'Imagens',
+        'svg': 'Imagens',
+        'webp': 'Imagens',
+        
+        # Áudio
+        'mp3': 'Audio',
+        'wav': 'Audio',
+        'ogg': 'Audio',
+        'flac': 'Audio',
+        'aac': 'Audio',
+        'wma': 'Audio',
+        
+        # Vídeo
+        'mp4': 'Videos',
+        'avi': 'Videos',
+        'mkv': 'Videos',
+        'mov': 'Videos',
+        'wmv': 'Videos',
+        'flv': 'Videos',
+        'webm': 'Videos',
+        
+        # Compactados
+        'zip': 'Compactados',
+        'rar': 'Compactados',
+        '7z': 'Compactados',
+        'tar': 'Compactados',
+        'gz': 'Compactados',
+        
+        # Executáveis
+        'exe': 'Executaveis',
+        'msi': 'Executaveis',
+        'bat': 'Executaveis',
+        'sh': 'Executaveis',
+        
+        # Código
+        'py': 'Codigo',
+        'java': 'Codigo',
+        'js': 'Codigo',
+        'html': 'Codigo',
+        'css': 'Codigo',
+        'c': 'Codigo',
+        'cpp': 'Codigo',
+        'h': 'Codigo',
+        'php': 'Codigo',
+    }
+    
+    # Retorna o tipo correspondente ou "Outros" se não encontrado
+    return tipos.get(extensao, 'Outros')
+
+
+def mover_para_duplicados(arquivo_origem, pasta_duplicados, plano, mensagem="Arquivo duplicado movido",
+                          tamanho=None, dispositivo=None, recupera=True):
+    """
+    Agenda no plano a movimentação de um arquivo para a pasta de duplicados,
+    organizando por tipo de arquivo. Retorna o caminho de destino reservado.
+    """
+    # Determinar a pasta de destino baseada no tipo de arquivo
+    _, extensao = os.path.splitext(arquivo_origem)
+    pasta_tipo = os.path.join(pasta_duplicados, obter_pasta_tipo_arquivo(extensao))
+    return plano.mover(arquivo_origem, pasta_tipo, mensagem=mensagem, tamanho=tamanho,
+                       dispositivo=dispositivo, recupera=recupera)
+
+
+def agendar_grupo_duplicado(arquivos, pasta_duplicados, plano, modo_acao, arquivo_manter=0):
+    """
+    Agenda no plano a ação escolhida para um grupo de arquivos idênticos.
+    arquivos pode ter caminhos ou entradas do inventário; com as entradas,
+    tamanho e dispositivo vêm do inventário, sem um stat por arquivo.
+    modo_acao e arquivo_manter são os de processar_arquivos_duplicados.
+    
+    Retorna a lista das operações agendadas para o grupo.
+    """
+    def dados(arquivo):
+        if isinstance(arquivo, str):
+            return arquivo, None, None
+        return arquivo.caminho, arquivo.tamanho, arquivo.dispositivo
+    
+    inicio = len(plano.operacoes)
+    valido = 0 <= arquivo_manter < len(arquivos)
+    if modo_acao == MANTER_PRIMEIRO or (modo_acao == ESCOLHA_MANUAL and valido):
+        manter = arquivo_manter if modo_acao == ESCOLHA_MANUAL else 0
+        for i, arquivo in enumerate(arquivos):
+            if i != manter:
+                caminho, tamanho, dispositivo = dados(arquivo)
+                mover_para_duplicados(caminho, pasta_duplicados, plano, tamanho=tamanho, dispositivo=dispositivo)
+    elif modo_acao == COPIAR_TODOS:
+        for arquivo in arquivos:
+            # Copiar para a subpasta do tipo (mantém o original)
+            caminho, tamanho, dispositivo = dados(arquivo)
+            _, extensao = os.path.splitext(caminho)
+            pasta_tipo = os.path.join(pasta_duplicados, obter_pasta_tipo_arquivo(extensao))
+            plano.copiar(caminho, pasta_tipo, mensagem="Arquivo duplicado copiado",
+                         tamanho=tamanho, dispositivo=dispositivo)
+    elif modo_acao == DEDUPLICAR:
+        # Todos os caminhos continuam existindo; as cópias em outro
+        # dispositivo que o arquivo mantido ficam como estão
+        manter = arquivo_manter if valido else 0
+        original, _, dispositivo_original = dados(arquivos[manter])
+        inode_original = getattr(arquivos[manter], 'inode', None)
+        for i, arquivo in enumerate(arquivos):
+            # Hardlinks do mesmo arquivo já não ocupam espaço a mais
+            if i != manter and (inode_original is None or getattr(arquivo, 'inode', None) != inode_original):
+                caminho, tamanho, dispositivo = dados(arquivo)
+                # O vínculo só é feito se os dois ainda forem os arquivos comparados
+                identidade = None
+                if inode_original is not None:
+                    identidade = ((arquivo.inode, arquivo.mtime_ns),
+                                  (inode_original, arquivos[manter].mtime_ns))
+                plano.vincular(caminho, original, tamanho=tamanho, dispositivo=dispositivo,
+                               dispositivo_original=dispositivo_original, identidade=identidade)
+    # Manter todos: nada a agendar
+    return plano.operacoes[inicio:]
+
+
+def retirar_agendados(duplicados, plano):
+    """
+    Tira de cada grupo de duplicados os arquivos que o plano já move ou que
+    ficam em pastas que ele remove (as ações de pastas idênticas, agendadas
+    antes). Retorna só os grupos que ainda têm ao menos dois arquivos.
+    """
+    removidas = tuple(operacao.origem + os.sep for operacao in plano.operacoes if operacao.acao == 'remover_pasta')
+    movidos = {operacao.origem for operacao in plano.operacoes if operacao.acao == 'mover'}
+    restantes = {}
+    for hash_arquivo, arquivos in duplicados.items():
+        arquivos = [arquivo for arquivo in arquivos
+                    if getattr(arquivo, 'caminho', arquivo) not in movidos
+                    and not getattr(arquivo, 'caminho', arquivo).startswith(removidas)]
+        if len(arquivos) > 1:
+            restantes[hash_arquivo] = arquivos
+    return restantes
+
+
+def espaco_recuperado(operacoes, concluidas=None):
+    """
+    Espaço liberado pelas operações de um grupo. Com concluidas (o retorno
+    de PlanoMovimentacao.executar), conta só as que deram certo; sem ele
+    (simulação), o que está previsto.
+    """
+    return sum(operacao.recuperado for operacao in operacoes
+               if concluidas is None or operacao.origem in concluidas)
+
+
+def relatorio_grupo(hash_arquivo, operacoes, concluidas=None):
+    """Linha do log com os arquivos tratados e o espaço recuperado em um grupo de duplicados"""
+    feitas = [operacao for operacao in operacoes if concluidas is None or operacao.origem in concluidas]
+    return (f"Grupo {hash_arquivo}: {len(feitas)} de {len(operacoes)} cópias tratadas, "
+            f"{formatar_bytes(espaco_recuperado(feitas))} recuperados")
+
+
+def processar_arquivos_duplicados(duplicados, pasta_duplicados, modo_acao=0, arquivo_manter=0, log_callback=None,
+                                  plano=None, operacoes_por_grupo=None):
+    """
+    Processa arquivos duplicados de acordo com o modo de ação escolhido.
+    Todas as operações são planejadas primeiro e executadas em lote.
+    
+    Parâmetros:
+    - duplicados: dicionário com hash como chave e lista de arquivos duplicados como valor
+    - pasta_duplicados: pasta onde os arquivos duplicados serão movidos
+    - modo_acao: 0=manter todos, 1=manter primeiro, 2=escolha manual, 3=copiar todos para a pasta de duplicados,
+      4=deduplicar no lugar (reflink ou hardlink do primeiro arquivo; nenhum caminho some)
+    - arquivo_manter: índice do arquivo a manter (para modo_acao=2)
+    - log_callback: função para registrar mensagens de log
+    - plano: PlanoMovimentacao onde as operações são apenas agendadas
+      (simulação); se None, as operações são executadas em seguida
+    - operacoes_por_grupo: dicionário opcional preenchido com hash -> operações
+      agendadas, para o relatório de espaço recuperado por grupo
+    
+    Retorna o plano usado.
+    """
+    executar = plano is None
+    if executar:
+        plano = PlanoMovimentacao()
+    if operacoes_por_grupo is None:
+        operacoes_por_grupo = {}
+    
+    for hash_arquivo, arquivos in duplicados.items():
+        operacoes_por_grupo[hash_arquivo] = agendar_grupo_duplicado(arquivos, pasta_duplicados, plano,
+                                                                    modo_acao, arquivo_manter)
+    
+    if executar:
+        concluidas = plano.executar(log_callback)
+        if log_callback and modo_acao == DEDUPLICAR:
+            for hash_arquivo, operacoes in operacoes_por_grupo.items():
+                if operacoes:
+                    log_callback(relatorio_grupo(hash_arquivo, operacoes, concluidas))
+    return plano
+
+
+def processar_pastas_identicas(grupo_pastas, modo_acao=0, log_callback=None, plano=None):
+    """
+    Processa pastas idênticas de acordo com o modo de ação escolhido.
+    
+    Parâmetros:
+    - grupo_pastas: tupla com dois caminhos de pastas idênticas
+    - modo_acao: 0=manter ambas, 1=manter primeira, 2=manter segunda, 3=mesclar conteúdo
+    - log_callback: função para registrar mensagens de log
+    - plano: PlanoMovimentacao onde as operações são apenas agendadas
+      (simulação); se None, as operações são executadas em seguida
+    
+    Retorna o plano usado.
+    """
+    folder1, folder2 = grupo_pastas
+    executar = plano is None
+    if executar:
+        plano = PlanoMovimentacao()
+    
+    try:
+        if modo_acao == 1:  # Manter apenas a primeira
+            plano.remover_pasta(folder2)
+                
+        elif modo_acao == 2:  # Manter apenas a segunda
+            plano.remover_pasta(folder1)
+                
+        elif modo_acao == 3:  # Mesclar conteúdo
+            # Mover itens únicos da segunda pasta para a primeira; o que
+            # sobra (já existente na primeira) é liberado com a remoção
+            restante = 0
+            for item in os.listdir(folder2):
+                src = os.path.join(folder2, item)
+                if not plano.existe(folder1, item):
+                    plano.mover(src, folder1, item)
+                elif os.path.isdir(src) and not os.path.islink(src):
+                    restante += tamanho_pasta(src)
+                else:
+                    restante += os.lstat(src).st_size
+            
+            # Remover a segunda pasta após a mesclagem
+            plano.remover_pasta(folder2, mensagem=f"Pasta mesclada em {folder1} e removida", tamanho=restante)
+                
+        else:  # Manter ambas (modo_acao == 0)
+            if log_callback:
+                log_callback("Ambas as pastas mantidas")
+                
+    except Exception as e:
+        if log_callback:
+            log_callback(f"Erro ao processar pastas: {str(e)}")
+    
+    if executar:
+        plano.executar(log_callback)
+    return plano
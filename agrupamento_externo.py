@@ -0,0 +1,218 @@
+import os
+import sqlite3
+import tempfile
+import weakref
+from collections.abc import Mapping, MutableMapping
+
+# Estimativas (bytes) usadas para decidir quando sair da memória:
+# - por arquivo no agrupamento por tamanho em memória (vetores de tamanhos,
+#   ordem e índices e as cópias temporárias do NumPy ou do Counter)
+# - por arquivo em análise no filtro de hashes (entrada do inventário,
+#   caminho, hashes parciais e tarefa no executor)
+# - por caminho guardado no mapeamento caminho -> hash
+BYTES_POR_ARQUIVO_AGRUPAMENTO = 80
+BYTES_POR_ARQUIVO_EM_ANALISE = 1024
+BYTES_POR_HASH = 320
+
+# Registros acumulados antes de cada gravação na tabela temporária
+TAMANHO_LOTE = 10000
+
+# Fração do limite de memória usada pelo cache de páginas do SQLite
+FRACAO_CACHE_SQLITE = 4
+
+
+class _BancoTemporario:
+    """
+    Banco SQLite em um arquivo da pasta temporária do sistema (TMPDIR),
+    sem diário nem sincronização: nada ali precisa sobreviver a uma queda.
+    O arquivo é apagado em fechar() ou quando o objeto é coletado.
+
+    As ordenações (CREATE INDEX, ORDER BY, GROUP BY) que não cabem no
+    cache de páginas são feitas pelo SQLite em disco, por intercalação
+    de trechos ordenados, com a memória limitada pelo cache.
+    """
+
+    def __init__(self, memoria_maxima=None):
+        descritor, self.caminho = tempfile.mkstemp(prefix='organizador_', suffix='.sqlite')
+        os.close(descritor)
+        # Usado só por quem o criou, mas pode ser fechado pelo coletor em outra thread
+        self.conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=OFF")
+        self.conexao.execute("PRAGMA synchronous=OFF")
+        self.conexao.execute("PRAGMA temp_store=FILE")
+        if memoria_maxima:
+            self.conexao.execute(f"PRAGMA cache_size=-{max(1024, memoria_maxima // FRACAO_CACHE_SQLITE // 1024)}")
+        self._finalizador = weakref.finalize(self, _apagar_banco, self.conexao, self.caminho)
+
+    def fechar(self):
+        self._finalizador()
+
+
+def _apagar_banco(conexao, caminho):
+    conexao.close()
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+class GruposPorTamanhoEmDisco(Mapping):
+    """
+    Versão de varredura.GruposPorTamanho com os pares (tamanho, índice do
+    arquivo) em uma tabela SQLite temporária, ordenada por um índice em
+    (tamanho, índice). Oferece a mesma interface (unicos, quantidade e
+    quantidades, e as entradas de um grupo montadas só quando lido); cada
+    consulta vai ao disco, então é mais lenta, mas a memória não cresce
+    com a quantidade de arquivos do HD.
+    """
+
+    def __init__(self, banco, montar_entrada, unicos, grupos):
+        self._banco = banco
+        self._conexao = banco.conexao
+        self._montar_entrada = montar_entrada
+        self._grupos = grupos
+        self.unicos = unicos
+
+    def _quantidade(self, tamanho):
+        linha = self._conexao.execute("SELECT quantidade FROM grupos WHERE tamanho = ?", (tamanho,)).fetchone()
+        return linha[0] if linha is not None else 0
+
+    def __getitem__(self, tamanho):
+        if not self._quantidade(tamanho):
+            raise KeyError(tamanho)
+        consulta = self._conexao.execute("SELECT indice FROM arquivos WHERE tamanho = ? ORDER BY indice",
+                                         (tamanho,))
+        return [self._montar_entrada(indice) for indice, in consulta]
+
+    def __contains__(self, tamanho):
+        return bool(self._quantidade(tamanho))
+
+    def __iter__(self):
+        return (tamanho for tamanho, in self._conexao.execute("SELECT tamanho FROM grupos ORDER BY tamanho"))
+
+    def __len__(self):
+        return self._grupos
+
+    def quantidade(self, tamanho):
+        """Quantidade de arquivos com o tamanho, sem montar as entradas"""
+        return self._quantidade(tamanho)
+
+    def quantidades(self):
+        """Pares (tamanho, quantidade de arquivos) em ordem crescente de tamanho"""
+        return iter(self._conexao.execute("SELECT tamanho, quantidade FROM grupos ORDER BY tamanho"))
+
+    def fechar(self):
+        self._banco.fechar()
+
+
+def agrupar_por_tamanho_em_disco(tamanhos, montar_entrada, minimo=1, filtro=None, memoria_maxima=None):
+    """
+    Agrupa os arquivos pelo tamanho em uma tabela temporária, para HDs em
+    que o agrupamento em memória passaria do limite.
+
+    tamanhos é a sequência com o tamanho de cada arquivo (o índice na
+    sequência identifica o arquivo), montar_entrada(índice) monta a
+    EntradaInventario e filtro(tamanho), se informado, descarta de antemão
+    tamanhos que com certeza são únicos (usado com minimo > 1). Retorna um
+    GruposPorTamanhoEmDisco.
+    """
+    banco = _BancoTemporario(memoria_maxima)
+    conexao = banco.conexao
+    conexao.execute("CREATE TABLE arquivos (tamanho INTEGER NOT NULL, indice INTEGER NOT NULL)")
+    conexao.execute("CREATE TABLE grupos (tamanho INTEGER PRIMARY KEY, quantidade INTEGER NOT NULL)")
+
+    lote = []
+    for indice, tamanho in enumerate(tamanhos):
+        if filtro is not None and not filtro(tamanho):
+            continue
+        lote.append((tamanho, indice))
+        if len(lote) >= TAMANHO_LOTE:
+            conexao.executemany("INSERT INTO arquivos VALUES (?, ?)", lote)
+            lote = []
+    conexao.executemany("INSERT INTO arquivos VALUES (?, ?)", lote)
+
+    # O índice é montado por uma ordenação externa, em trechos que cabem no cache
+    conexao.execute("CREATE INDEX idx_tamanho ON arquivos (tamanho, indice)")
+    conexao.execute("INSERT INTO grupos SELECT tamanho, COUNT(*) FROM arquivos GROUP BY tamanho HAVING COUNT(*) >= ?",
+                    (minimo,))
+    grupos, agrupados = conexao.execute("SELECT COUNT(*), COALESCE(SUM(quantidade), 0) FROM grupos").fetchone()
+    conexao.commit()
+    return GruposPorTamanhoEmDisco(banco, montar_entrada, len(tamanhos) - agrupados, grupos)
+
+
+class HashesPorCaminho(MutableMapping):
+    """
+    Mapeamento caminho -> hash dos arquivos duplicados, usado na comparação
+    de pastas. Fica em um dicionário enquanto couber em memoria_maxima;
+    depois, todo o conteúdo passa para uma tabela SQLite temporária e as
+    consultas vão ao disco (mais lentas, sem aumentar a memória). Sem
+    limite, é um dicionário comum.
+    """
+
+    def __init__(self, memoria_maxima=None):
+        self.memoria_maxima = memoria_maxima
+        self._memoria = {}
+        self._banco = None
+        self._pendentes = []
+        self._limite = max(1, memoria_maxima // BYTES_POR_HASH) if memoria_maxima else None
+
+    @property
+    def em_disco(self):
+        return self._banco is not None
+
+    def _transbordar(self):
+        self._banco = _BancoTemporario(self.memoria_maxima)
+        self._banco.conexao.execute("CREATE TABLE hashes (caminho BLOB PRIMARY KEY, hash TEXT NOT NULL)")
+        self._pendentes = list(self._memoria.items())
+        self._memoria = {}
+        self._gravar()
+
+    def _gravar(self):
+        if self._pendentes:
+            # Os caminhos vão como bytes: nomes inválidos em UTF-8 também são aceitos
+            self._banco.conexao.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?)",
+                                            ((os.fsencode(caminho), hash_) for caminho, hash_ in self._pendentes))
+            self._pendentes = []
+
+    def __setitem__(self, caminho, hash_):
+        if self._banco is None:
+            self._memoria[caminho] = hash_
+            if self._limite is not None and len(self._memoria) > self._limite:
+                self._transbordar()
+        else:
+            self._pendentes.append((caminho, hash_))
+            if len(self._pendentes) >= TAMANHO_LOTE:
+                self._gravar()
+
+    def __getitem__(self, caminho):
+        if self._banco is None:
+            return self._memoria[caminho]
+        self._gravar()
+        linha = self._banco.conexao.execute("SELECT hash FROM hashes WHERE caminho = ?",
+                                            (os.fsencode(caminho),)).fetchone()
+        if linha is None:
+            raise KeyError(caminho)
+        return linha[0]
+
+    def __delitem__(self, caminho):
+        if self._banco is None:
+            del self._memoria[caminho]
+            return
+        self[caminho]  # KeyError se não existir
+        self._banco.conexao.execute("DELETE FROM hashes WHERE caminho = ?", (os.fsencode(caminho),))
+
+    def __iter__(self):
+        if self._banco is None:
+            return iter(self._memoria)
+        self._gravar()
+        return (os.fsdecode(caminho) for caminho, in self._banco.conexao.execute("SELECT caminho FROM hashes"))
+
+    def __len__(self):
+        if self._banco is None:
+            return len(self._memoria)
+        self._gravar()
+        return self._banco.conexao.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def fechar(self):
+        if self._banco is not None:
+            self._banco.fechar()
@@ -0,0 +1,119 @@
+"""
+Microbenchmark do cálculo de hash de arquivos.
+
+Compara a leitura original (f.read em blocos de 64 KiB, um novo objeto
+bytes por bloco), a leitura atual (readinto em buffer reaproveitado com
+bloco escolhido pelo tamanho do arquivo) e a leitura via mmap, para
+vários tamanhos de arquivo.
+
+Uso:
+    python benchmarks/benchmark_hash.py [--tamanhos 64K,1M,64M,512M]
+                                        [--algoritmo blake2b] [--repeticoes 3]
+
+Os arquivos de teste ficam em uma pasta temporária e costumam estar no
+cache de páginas do sistema, então o resultado mede principalmente o custo
+de CPU e de chamadas por bloco, não a velocidade do disco.
+"""
+import argparse
+import mmap
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hash_arquivos import calcular_hash_arquivo, novo_hash, ALGORITMO_PADRAO  # noqa: E402
+
+UNIDADES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def converter_tamanho(texto):
+    texto = texto.strip().upper()
+    if texto[-1] in UNIDADES:
+        return int(texto[:-1]) * UNIDADES[texto[-1]]
+    return int(texto)
+
+
+def hash_original(caminho, algoritmo, block_size=65536):
+    """Implementação anterior: um objeto bytes novo a cada bloco"""
+    h = novo_hash(algoritmo)
+    with open(caminho, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_mmap(caminho, algoritmo):
+    """Mapeia o arquivo inteiro na memória e passa para o hash de uma vez"""
+    h = novo_hash(algoritmo)
+    with open(caminho, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            h.update(m)
+    return h.hexdigest()
+
+
+def hash_atual(caminho, algoritmo):
+    return calcular_hash_arquivo(caminho, algoritmo=algoritmo)
+
+
+IMPLEMENTACOES = {
+    'original': hash_original,
+    'readinto': hash_atual,
+    'mmap': hash_mmap,
+}
+
+
+def criar_arquivo(pasta, tamanho):
+    caminho = os.path.join(pasta, f"arquivo_{tamanho}.bin")
+    bloco = os.urandom(1024 * 1024)
+    with open(caminho, 'wb') as f:
+        restante = tamanho
+        while restante > 0:
+            f.write(bloco[:min(restante, len(bloco))])
+            restante -= len(bloco)
+    return caminho
+
+
+def medir(funcao, caminho, algoritmo, repeticoes):
+    """Retorna o melhor tempo entre as repetições (menos ruído)"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(caminho, algoritmo)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark do cálculo de hash de arquivos")
+    parser.add_argument('--tamanhos', default='64K,1M,64M,512M',
+                        help="tamanhos dos arquivos de teste, separados por vírgula")
+    parser.add_argument('--algoritmo', default=ALGORITMO_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    tamanhos = [converter_tamanho(t) for t in args.tamanhos.split(',')]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        print(f"Algoritmo: {args.algoritmo}")
+        print(f"{'tamanho':>10} " + " ".join(f"{nome:>18}" for nome in IMPLEMENTACOES))
+        for tamanho in tamanhos:
+            caminho = criar_arquivo(pasta, tamanho)
+            esperado = hash_original(caminho, args.algoritmo)
+            colunas = []
+            for nome, funcao in IMPLEMENTACOES.items():
+                if funcao(caminho, args.algoritmo) != esperado:
+                    raise SystemExit(f"Hash divergente na implementação {nome}")
+                duracao = medir(funcao, caminho, args.algoritmo, args.repeticoes)
+                velocidade = tamanho / duracao / (1024 ** 2) if duracao else 0.0
+                colunas.append(f"{duracao * 1000:8.2f}ms {velocidade:6.0f}MB/s")
+            print(f"{tamanho:>10} " + " ".join(f"{coluna:>18}" for coluna in colunas))
+            os.remove(caminho)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,298 @@
+"""
+Benchmark do organizador inteiro, etapa por etapa, sobre HDs sintéticos.
+
+Para cada cenário de gerar_hd_sintetico.py, gera a árvore em uma pasta
+temporária e mede separadamente:
+- varredura: varrer sem snapshot
+- varredura_incremental: varrer com o snapshot já preenchido
+- agrupamento: arquivos_por_tamanho
+- hash: gerar_grupos_duplicados, sem cache de hashes
+- pastas: pastas idênticas e semelhantes
+- planejamento: agendar "manter o primeiro" para todos os grupos
+- movimentacao: executar o plano dos duplicados
+- mesclagem_planejamento: planejar_mesclagem com um segundo HD gerado
+- mesclagem: executar o plano da mesclagem
+
+Cada etapa registra o tempo total, o tempo de CPU, a quantidade de itens e
+(com --memoria) o pico de memória alocada pelo Python. O resultado pode ser
+gravado em JSON com a versão do código e a máquina, para comparar com uma
+execução anterior na mesma máquina (--comparar).
+
+Uso:
+    python benchmarks/benchmark_pipeline.py [--cenarios fotos,minusculos]
+                                            [--escala 1] [--semente 0]
+                                            [--tamanho-video 1G]
+                                            [--repeticoes 1] [--pasta /mnt/teste]
+                                            [--memoria] [--esvaziar-cache]
+                                            [--saida resultado.json]
+                                            [--comparar anterior.json]
+
+Sem --esvaziar-cache, os arquivos recém-gerados costumam estar no cache de
+páginas do sistema, e o hash mede principalmente CPU; com ele (requer root
+no Linux), cada etapa começa com o cache vazio. Use --pasta para gerar os
+HDs no disco que se quer medir, e não no /tmp.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from varredura import varrer, numpy  # noqa: E402
+from snapshot_varredura import abrir_snapshot  # noqa: E402
+from hash_arquivos import gerar_grupos_duplicados, ALGORITMO_PADRAO  # noqa: E402
+from pastas_identicas import encontrar_pastas_identicas  # noqa: E402
+from pastas_semelhantes import encontrar_pastas_semelhantes  # noqa: E402
+from movimentacao import PlanoMovimentacao  # noqa: E402
+from acoes_duplicados import agendar_grupo_duplicado, MANTER_PRIMEIRO  # noqa: E402
+from mesclar_hds import planejar_mesclagem  # noqa: E402
+from gerar_hd_sintetico import (gerar, gerar_origem_mesclagem, converter_tamanho, CENARIOS,  # noqa: E402
+                                TAMANHO_VIDEO_PADRAO)
+
+FORMATO_RESULTADO = 1
+
+
+class Medidor:
+    """Mede cada etapa de uma repetição e guarda os resultados por nome"""
+
+    def __init__(self, memoria=False, esvaziar_cache=False):
+        self.memoria = memoria
+        self.esvaziar_cache = esvaziar_cache
+        self.etapas = {}
+
+    def medir(self, etapa, funcao):
+        """Executa funcao() e registra a etapa; funcao retorna (resultado, itens)"""
+        if self.esvaziar_cache:
+            esvaziar_cache_paginas()
+        if self.memoria:
+            tracemalloc.start()
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            resultado, itens = funcao()
+        finally:
+            duracao, cpu = time.perf_counter() - inicio, time.process_time() - inicio_cpu
+            pico = None
+            if self.memoria:
+                pico = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        self.etapas[etapa] = {"segundos": duracao, "cpu": cpu, "itens": itens}
+        if pico is not None:
+            self.etapas[etapa]["memoria_pico"] = pico
+        return resultado
+
+
+def esvaziar_cache_paginas():
+    """Descarta o cache de páginas do Linux; sem permissão, não faz nada"""
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+    except OSError:
+        pass
+
+
+def executar_cenario(cenario, pasta, args, tamanho_video):
+    """Gera o cenário em pasta e mede todas as etapas uma vez"""
+    hd = os.path.join(pasta, "hd")
+    origem = os.path.join(pasta, "origem")
+    inicio = time.perf_counter()
+    arvore = gerar(hd, cenario, args.escala, args.semente, tamanho_video)
+    mesclagem = gerar_origem_mesclagem(hd, origem, args.semente)
+    arvore["geracao_segundos"] = time.perf_counter() - inicio
+
+    medidor = Medidor(args.memoria, args.esvaziar_cache)
+    medir = medidor.medir
+
+    def varrer_hd():
+        inventario = varrer(hd)
+        return inventario, inventario.total_arquivos
+    inventario = medir('varredura', varrer_hd)
+
+    snapshot = abrir_snapshot(hd)
+    if snapshot is not None:
+        try:
+            # A primeira varredura só preenche o snapshot
+            varrer(hd, snapshot=snapshot)
+            medir('varredura_incremental', lambda: (None, varrer(hd, snapshot=snapshot).total_reaproveitadas))
+        finally:
+            snapshot.fechar()
+
+    def agrupar():
+        grupos_tamanho = inventario.arquivos_por_tamanho(minimo=2)
+        return grupos_tamanho, len(grupos_tamanho)
+    grupos_tamanho = medir('agrupamento', agrupar)
+
+    def calcular_hashes():
+        grupos = list(gerar_grupos_duplicados(grupos_tamanho, algoritmo=args.algoritmo))
+        return grupos, len(grupos)
+    grupos = medir('hash', calcular_hashes)
+    copias = sum(len(entradas) - 1 for _, _, entradas in grupos)
+    medidor.etapas['hash']["copias"] = copias
+    if copias != arvore["copias"]:
+        print(f"Aviso: {cenario}: {copias} cópias encontradas, {arvore['copias']} geradas", file=sys.stderr)
+
+    def comparar_pastas():
+        hashes = {entrada.caminho: hash_arquivo for hash_arquivo, _, entradas in grupos for entrada in entradas}
+        identicas = encontrar_pastas_identicas(inventario, hashes)
+        semelhantes = encontrar_pastas_semelhantes(inventario, hashes)
+        return None, len(identicas) + len(semelhantes)
+    medir('pastas', comparar_pastas)
+
+    def planejar():
+        plano = PlanoMovimentacao()
+        pasta_duplicados = os.path.join(hd, "Arquivos Duplicados")
+        for _, _, entradas in grupos:
+            agendar_grupo_duplicado(entradas, pasta_duplicados, plano, MANTER_PRIMEIRO)
+        return plano, len(plano.operacoes)
+    plano = medir('planejamento', planejar)
+    medir('movimentacao', lambda: (None, len(plano.executar())))
+
+    def planejar_mesclagem_hds():
+        stats = {"arquivos_movidos": 0, "arquivos_duplicados": 0, "duplicados_outro_caminho": 0,
+                 "conflitos": 0, "pastas_criadas": 0}
+        plano_mesclagem = planejar_mesclagem(hd, origem, os.path.join(hd, "Arquivos Duplicados"), stats,
+                                             criar_pastas=False)
+        return plano_mesclagem, len(plano_mesclagem.operacoes)
+    plano_mesclagem = medir('mesclagem_planejamento', planejar_mesclagem_hds)
+    medir('mesclagem', lambda: (None, len(plano_mesclagem.executar())))
+
+    return {"arvore": arvore, "mesclagem": mesclagem, "etapas": medidor.etapas}
+
+
+def combinar(repeticoes):
+    """
+    Junta as repetições de um cenário: de cada etapa fica a de menor tempo
+    (menos ruído), com a lista de todos os tempos para conferência
+    """
+    resultado = dict(repeticoes[0])
+    etapas = {}
+    for etapa in repeticoes[0]["etapas"]:
+        medidas = [repeticao["etapas"][etapa] for repeticao in repeticoes if etapa in repeticao["etapas"]]
+        melhor = dict(min(medidas, key=lambda medida: medida["segundos"]))
+        melhor["todas"] = [medida["segundos"] for medida in medidas]
+        etapas[etapa] = melhor
+    resultado["etapas"] = etapas
+    return resultado
+
+
+def versao_codigo():
+    """Commit atual do repositório e se há alterações não gravadas (None fora do git)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True)
+        estado = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit.stdout.strip(), "alterado": bool(estado.stdout.strip())}
+
+
+def ambiente():
+    return {
+        "python": platform.python_version(),
+        "implementacao": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "maquina": platform.node(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__ if numpy is not None else None,
+    }
+
+
+def formatar_memoria(valor):
+    return f"{valor / 1024 ** 2:8.1f}MiB" if valor is not None else ""
+
+
+def imprimir(resultado, anterior=None):
+    for cenario, dados in resultado["cenarios"].items():
+        arvore = dados["arvore"]
+        print(f"\n{cenario}: {arvore['arquivos']} arquivos, {arvore['bytes'] / 1024 ** 2:.0f} MiB, "
+              f"{arvore['copias']} cópias")
+        etapas_anteriores = (anterior or {}).get("cenarios", {}).get(cenario, {}).get("etapas", {})
+        print(f"  {'etapa':<24}{'tempo':>10}{'cpu':>10}{'itens':>10}{'memória':>12}"
+              + (f"{'anterior':>10}{'variação':>10}" if anterior else ""))
+        for etapa, medida in dados["etapas"].items():
+            linha = (f"  {etapa:<24}{medida['segundos'] * 1000:8.1f}ms{medida['cpu'] * 1000:8.1f}ms"
+                     f"{medida['itens']:>10}{formatar_memoria(medida.get('memoria_pico')):>12}")
+            antes = etapas_anteriores.get(etapa)
+            if antes:
+                variacao = (medida['segundos'] / antes['segundos'] - 1) * 100 if antes['segundos'] else 0.0
+                linha += f"{antes['segundos'] * 1000:8.1f}ms{variacao:+9.1f}%"
+            print(linha)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do organizador, etapa por etapa, sobre HDs sintéticos")
+    parser.add_argument('--cenarios', default=','.join(CENARIOS),
+                        help="cenários a medir, separados por vírgula")
+    parser.add_argument('--escala', type=float, default=1.0)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--tamanho-video', default=TAMANHO_VIDEO_PADRAO)
+    parser.add_argument('--algoritmo', default=ALGORITMO_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=1,
+                        help="gera e mede cada cenário N vezes e guarda o melhor tempo de cada etapa")
+    parser.add_argument('--pasta', default=None, help="onde gerar os HDs (padrão: pasta temporária do sistema)")
+    parser.add_argument('--memoria', action='store_true',
+                        help="mede o pico de memória de cada etapa com tracemalloc (deixa tudo mais lento)")
+    parser.add_argument('--esvaziar-cache', action='store_true',
+                        help="esvazia o cache de páginas antes de cada etapa (Linux, requer root)")
+    parser.add_argument('--saida', help="grava o resultado em JSON neste arquivo")
+    parser.add_argument('--comparar', help="resultado JSON anterior para comparar os tempos")
+    args = parser.parse_args()
+
+    cenarios = [cenario.strip() for cenario in args.cenarios.split(',') if cenario.strip()]
+    for cenario in cenarios:
+        if cenario not in CENARIOS:
+            parser.error(f"cenário desconhecido: {cenario} (disponíveis: {', '.join(CENARIOS)})")
+    tamanho_video = converter_tamanho(args.tamanho_video)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anterior = json.load(f)
+
+    resultado = {
+        "formato": FORMATO_RESULTADO,
+        "criado_em": datetime.datetime.now().isoformat(timespec='seconds'),
+        "versao": versao_codigo(),
+        "ambiente": ambiente(),
+        "parametros": {
+            "escala": args.escala,
+            "semente": args.semente,
+            "tamanho_video": tamanho_video,
+            "algoritmo": args.algoritmo,
+            "repeticoes": args.repeticoes,
+            "memoria": args.memoria,
+            "esvaziar_cache": args.esvaziar_cache,
+        },
+        "cenarios": {},
+    }
+    if anterior is not None:
+        # Só as repetições podem mudar sem invalidar a comparação
+        diferentes = [nome for nome, valor in resultado["parametros"].items()
+                      if nome != "repeticoes" and anterior.get("parametros", {}).get(nome) != valor]
+        if diferentes:
+            print(f"Aviso: o resultado anterior usou outros parâmetros ({', '.join(diferentes)})", file=sys.stderr)
+
+    for cenario in cenarios:
+        repeticoes = []
+        for _ in range(max(1, args.repeticoes)):
+            with tempfile.TemporaryDirectory(prefix=f"benchmark_{cenario}_", dir=args.pasta) as pasta:
+                repeticoes.append(executar_cenario(cenario, pasta, args, tamanho_video))
+        resultado["cenarios"][cenario] = combinar(repeticoes)
+
+    imprimir(resultado, anterior)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado gravado em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""
+Gerador determinístico de HDs sintéticos para os benchmarks.
+
+Cada cenário reproduz um caso que pesa em uma etapa diferente do
+organizador:
+- fotos: árvore funda de fotos (ano/mês/evento) com backups do celular
+  que repetem eventos inteiros (pastas idênticas) ou em parte (semelhantes)
+- minusculos: muitos arquivos pequenos, em que quase todos os tamanhos se
+  repetem e a varredura e o agrupamento dominam
+- videos: arquivos de vários GB esparsos (não ocupam o disco), em que o
+  hash completo domina
+- mesmo_tamanho: muitos arquivos do mesmo tamanho que não são duplicados;
+  metade só difere no meio e passa pelo hash parcial
+- nomes: os mesmos nomes (com variações de maiúsculas) em muitas pastas,
+  o que pesa na reserva de nomes do plano
+
+Com o mesmo cenário, semente e escala, a árvore gerada é sempre a mesma,
+inclusive as datas de modificação, fixadas no passado para que o snapshot
+possa reaproveitar as pastas.
+
+Uso:
+    python benchmarks/gerar_hd_sintetico.py DESTINO [--cenario fotos]
+                                            [--escala 1] [--semente 0]
+                                            [--tamanho-video 1G]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+# Datas fixas: bem antes da margem de segurança do snapshot
+DATA_BASE = 1_600_000_000
+TAMANHO_MARCA = 16
+UNIDADES = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+TAMANHO_VIDEO_PADRAO = '1G'
+
+
+def converter_tamanho(texto):
+    texto = texto.strip().upper()
+    if texto[-1] in UNIDADES:
+        return int(texto[:-1]) * UNIDADES[texto[-1]]
+    return int(texto)
+
+
+def _bytes_aleatorios(rng, quantidade):
+    """Bytes determinísticos pela semente (Random.randbytes só existe a partir do Python 3.9)"""
+    return rng.getrandbits(8 * quantidade).to_bytes(quantidade, 'little')
+
+
+class _Gerador:
+    """Escreve os arquivos de um cenário e conta o que foi gerado"""
+
+    def __init__(self, raiz, rng):
+        self.raiz = raiz
+        self.rng = rng
+        self.arquivos = 0
+        self.bytes = 0
+        self.copias = 0   # arquivos que repetem o conteúdo de outro já gerado
+
+    def marca(self):
+        return _bytes_aleatorios(self.rng, TAMANHO_MARCA)
+
+    def escrever(self, relativo, tamanho, marca, marca_meio=b'', esparso=False, copia=False):
+        """
+        Grava um arquivo de tamanho bytes. O conteúdo é a marca repetida
+        (ou, se esparso, só a marca no início e no fim, com um buraco no
+        meio); marca_meio, se informada, substitui os bytes do meio.
+        """
+        caminho = os.path.join(self.raiz, relativo)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, 'wb') as f:
+            if esparso:
+                f.write(marca)
+                f.truncate(tamanho)
+                f.seek(tamanho - len(marca))
+                f.write(marca)
+            else:
+                dados = bytearray((marca * (tamanho // len(marca) + 1))[:tamanho])
+                f.write(dados)
+            if marca_meio:
+                f.seek(tamanho // 2)
+                f.write(marca_meio)
+        os.utime(caminho, (DATA_BASE + self.arquivos, DATA_BASE + self.arquivos))
+        self.arquivos += 1
+        self.bytes += tamanho
+        if copia:
+            self.copias += 1
+        return caminho
+
+
+def _fotos(g, escala, opcoes):
+    rng = g.rng
+    eventos = []
+    total = max(1, int(400 * escala))
+    numero = 1
+    while numero <= total:
+        ano = 2005 + rng.randrange(18)
+        mes = rng.randrange(1, 13)
+        evento = os.path.join("Fotos", str(ano), f"{mes:02d}", f"Evento {len(eventos) + 1:04d}")
+        fotos = []
+        for _ in range(rng.randrange(5, 40)):
+            nome = f"IMG_{numero % 10000:04d}.JPG"
+            tamanho = rng.randrange(20 * 1024, 400 * 1024)
+            marca = g.marca()
+            # Algumas fotos editadas ficam uma pasta mais funda
+            pasta = os.path.join(evento, "Editadas") if rng.random() < 0.1 else evento
+            g.escrever(os.path.join(pasta, nome), tamanho, marca)
+            fotos.append((os.path.relpath(pasta, evento), nome, tamanho, marca))
+            numero += 1
+        eventos.append((evento, fotos))
+
+    # Backup do celular: eventos inteiros (pastas idênticas) ou em parte (semelhantes)
+    for evento, fotos in eventos:
+        sorteio = rng.random()
+        if sorteio < 0.15:
+            escolhidas = fotos
+        elif sorteio < 0.3:
+            escolhidas = [foto for foto in fotos if rng.random() < 0.7]
+        else:
+            continue
+        backup = os.path.join("Backup Celular", os.path.basename(evento))
+        for subpasta, nome, tamanho, marca in escolhidas:
+            g.escrever(os.path.join(backup, subpasta, nome), tamanho, marca, copia=True)
+
+
+def _minusculos(g, escala, opcoes):
+    rng = g.rng
+    total = max(1, int(20000 * escala))
+    conteudos = []
+    pasta = None
+    for i in range(total):
+        if i % 50 == 0:
+            partes = [f"nivel{rng.randrange(8)}" for _ in range(rng.randrange(1, 5))]
+            pasta = os.path.join("Projetos", *partes, f"pacote{i // 50:06d}")
+        if conteudos and rng.random() < 0.05:
+            tamanho, marca = rng.choice(conteudos)
+            g.escrever(os.path.join(pasta, f"copia_{i:07d}.txt"), tamanho, marca, copia=True)
+        else:
+            # Tamanhos pequenos se repetem muito; a marca mantém o conteúdo único
+            tamanho = rng.randrange(TAMANHO_MARCA, 4096)
+            marca = g.marca()
+            g.escrever(os.path.join(pasta, f"arquivo_{i:07d}.txt"), tamanho, marca)
+            if len(conteudos) < 1000:
+                conteudos.append((tamanho, marca))
+
+
+def _videos(g, escala, opcoes):
+    rng = g.rng
+    tamanho = opcoes.get('tamanho_video') or converter_tamanho(TAMANHO_VIDEO_PADRAO)
+    # Abaixo disso, o início e o fim dos vídeos se sobrepõem
+    tamanho = max(tamanho, 4 * TAMANHO_MARCA)
+    total = max(2, int(4 * escala))
+    for i in range(total):
+        marca = g.marca()
+        g.escrever(os.path.join("Videos", f"video_{i:03d}.mkv"), tamanho, marca, esparso=True)
+        if i % 2 == 0:
+            # Cópia real em outra pasta: o hash completo lê as duas
+            g.escrever(os.path.join("Videos", "Backup", f"video_{i:03d}.mkv"), tamanho, marca,
+                       esparso=True, copia=True)
+        else:
+            # Mesmo início e fim, conteúdo diferente no meio
+            g.escrever(os.path.join("Videos", "Editados", f"video_{i:03d}_editado.mkv"), tamanho, marca,
+                       marca_meio=g.marca(), esparso=True)
+    # Vários tamanhos próximos, que o agrupamento por tamanho separa
+    for i in range(total):
+        g.escrever(os.path.join("Videos", "Outros", f"clipe_{i:03d}.mp4"),
+                   tamanho - rng.randrange(1, max(2, tamanho // 4)), g.marca(), esparso=True)
+
+
+def _mesmo_tamanho(g, escala, opcoes):
+    rng = g.rng
+    total = max(2, int(2000 * escala))
+    # Maior que duas amostras do hash parcial, para que ele seja usado
+    tamanho = 256 * 1024
+    base = g.marca()
+    gerados = []
+    for i in range(total):
+        pasta = os.path.join("Mesmo Tamanho", f"lote{i // 100:04d}")
+        if gerados and rng.random() < 0.05:
+            marca, marca_meio = rng.choice(gerados)
+            g.escrever(os.path.join(pasta, f"copia_{i:06d}.dat"), tamanho, marca, marca_meio=marca_meio,
+                       copia=True)
+        elif i % 2:
+            # Início e fim iguais aos dos outros: só o hash completo separa
+            marca_meio = g.marca()
+            g.escrever(os.path.join(pasta, f"meio_{i:06d}.dat"), tamanho, base, marca_meio=marca_meio)
+            gerados.append((base, marca_meio))
+        else:
+            marca = g.marca()
+            g.escrever(os.path.join(pasta, f"inicio_{i:06d}.dat"), tamanho, marca)
+            gerados.append((marca, b''))
+
+
+def _nomes(g, escala, opcoes):
+    rng = g.rng
+    nomes = ["IMG_0001.JPG", "img_0001.jpg", "Foto.jpg", "foto.JPG", "documento.pdf", "Documento.PDF",
+             "Thumbs.db", "desktop.ini", "Novo Documento.txt", "backup.zip"]
+    total = max(1, int(200 * escala))
+    anteriores = []
+    for i in range(total):
+        pasta = os.path.join("Pastas", f"grupo{i % 10}", f"pasta{i:05d}")
+        for nome in nomes:
+            if anteriores and rng.random() < 0.3:
+                tamanho, marca = rng.choice(anteriores)
+                g.escrever(os.path.join(pasta, nome), tamanho, marca, copia=True)
+            else:
+                tamanho = rng.randrange(1024, 64 * 1024)
+                marca = g.marca()
+                g.escrever(os.path.join(pasta, nome), tamanho, marca)
+                if len(anteriores) < 500:
+                    anteriores.append((tamanho, marca))
+
+
+CENARIOS = {
+    'fotos': _fotos,
+    'minusculos': _minusculos,
+    'videos': _videos,
+    'mesmo_tamanho': _mesmo_tamanho,
+    'nomes': _nomes,
+}
+
+
+def _fixar_datas_pastas(raiz):
+    """Data fixa também nas pastas, depois que todos os arquivos foram criados"""
+    for i, (pasta, _, _) in enumerate(os.walk(raiz, topdown=False)):
+        os.utime(pasta, (DATA_BASE + i, DATA_BASE + i))
+
+
+def gerar(destino, cenario, escala=1.0, semente=0, tamanho_video=None):
+    """
+    Gera o cenário dentro de destino (criado se não existir) e retorna um
+    dicionário com os parâmetros e as contagens: arquivos, bytes (tamanho
+    lógico, inclusive o dos arquivos esparsos) e copias, a quantidade de
+    arquivos que repetem o conteúdo de outro (o que a análise de
+    duplicados deve encontrar).
+    """
+    if cenario not in CENARIOS:
+        raise ValueError(f"Cenário desconhecido: {cenario}")
+    os.makedirs(destino, exist_ok=True)
+    # Semente em texto: o mesmo cenário e semente geram sempre a mesma sequência
+    g = _Gerador(destino, random.Random(f"{cenario}:{semente}"))
+    CENARIOS[cenario](g, escala, {'tamanho_video': tamanho_video})
+    _fixar_datas_pastas(destino)
+    return {
+        "cenario": cenario,
+        "escala": escala,
+        "semente": semente,
+        "arquivos": g.arquivos,
+        "bytes": g.bytes,
+        "copias": g.copias,
+    }
+
+
+def _copiar_esparso(origem, destino, bloco=1024 * 1024):
+    """Copia mantendo os buracos: blocos só de zeros não são gravados"""
+    with open(origem, 'rb') as entrada, open(destino, 'wb') as saida:
+        while True:
+            dados = entrada.read(bloco)
+            if not dados:
+                break
+            if dados.count(0) == len(dados):
+                saida.seek(len(dados), os.SEEK_CUR)
+            else:
+                saida.write(dados)
+        saida.truncate()
+
+
+def gerar_origem_mesclagem(destino, origem, semente=0):
+    """
+    Gera em origem um segundo HD para a mesclagem com destino: parte dos
+    arquivos é copiada no mesmo caminho (idênticos), parte tem o mesmo
+    nome com outro conteúdo (conflitos) e parte só existe na origem
+    (novos). Retorna as contagens de cada tipo.
+    """
+    rng = random.Random(f"mesclagem:{semente}")
+    contagem = {"identicos": 0, "conflitos": 0, "novos": 0}
+    for pasta, subpastas, arquivos in os.walk(destino):
+        subpastas.sort()
+        relativa = os.path.relpath(pasta, destino)
+        for nome in sorted(arquivos):
+            sorteio = rng.random()
+            if sorteio >= 0.6:
+                continue
+            caminho = os.path.join(origem, relativa, nome)
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            if sorteio < 0.4:
+                _copiar_esparso(os.path.join(pasta, nome), caminho)
+                contagem["identicos"] += 1
+            else:
+                with open(caminho, 'wb') as f:
+                    f.write(_bytes_aleatorios(rng, rng.randrange(TAMANHO_MARCA, 4096)))
+                contagem["conflitos"] += 1
+            if rng.random() < 0.1:
+                with open(os.path.join(origem, relativa, f"novo_{nome}"), 'wb') as f:
+                    f.write(_bytes_aleatorios(rng, rng.randrange(TAMANHO_MARCA, 4096)))
+                contagem["novos"] += 1
+    _fixar_datas_pastas(origem)
+    return contagem
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um HD sintético determinístico para os benchmarks")
+    parser.add_argument('destino', help="pasta onde a árvore será criada")
+    parser.add_argument('--cenario', choices=sorted(CENARIOS), default='fotos')
+    parser.add_argument('--escala', type=float, default=1.0,
+                        help="multiplica a quantidade de arquivos (ex.: 50 no cenário minusculos gera 1 milhão)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--tamanho-video', default=TAMANHO_VIDEO_PADRAO,
+                        help="tamanho lógico de cada vídeo esparso")
+    args = parser.parse_args()
+
+    resumo = gerar(args.destino, args.cenario, args.escala, args.semente, converter_tamanho(args.tamanho_video))
+    json.dump(resumo, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,9 +6,24 @@ from PyQt6 import QtCore
 # Obtém o caminho do Qt
 qt_path = os.path.dirname(QtCore.__file__)
 
+# Módulos do Qt que o programa não usa; sem eles o pacote fica bem menor
+# e há menos bibliotecas para carregar na abertura
+QT_NAO_USADOS = [
+    'QtNetwork', 'QtQml', 'QtQuick', 'QtQuickWidgets', 'QtSql', 'QtSvg',
+    'QtMultimedia', 'QtMultimediaWidgets', 'QtWebEngineCore', 'QtWebEngineWidgets',
+    'QtWebChannel', 'QtOpenGL', 'QtOpenGLWidgets', 'QtPdf', 'QtPdfWidgets',
+    'QtPositioning', 'QtBluetooth', 'QtNfc', 'QtSensors', 'QtSerialPort',
+    'QtTest', 'QtDesigner', 'QtHelp', 'QtPrintSupport', 'QtXml', 'Qt3DCore',
+]
+
+# Por padrão gera uma pasta (--onedir): o executável abre direto, sem
+# extrair o pacote inteiro para uma pasta temporária a cada execução.
+# Use "python build.py --onefile" para gerar um único arquivo.
+modo = '--onefile' if '--onefile' in sys.argv[1:] else '--onedir'
+
 PyInstaller.__main__.run([
     'organizador_hd_gui.py',
-    '--onefile',
+    modo,
     '--windowed',
     '--name=Organizador_de_HD',
     '--icon=organizador_hd_gui.ico',
@@ -17,6 +32,17 @@ PyInstaller.__main__.run([
     '--hidden-import=PyQt6.QtCore',
     '--hidden-import=PyQt6.QtGui',
     '--hidden-import=PyQt6.QtWidgets',
-    '--collect-all=PyQt6',
+    # Importados só quando usados (diálogos e motor da análise)
+    '--hidden-import=dialogos_gui',
+    '--hidden-import=acoes_duplicados',
+    '--hidden-import=mesclar_hds',
+    '--hidden-import=cache_hash',
+    '--hidden-import=snapshot_varredura',
+    '--hidden-import=pastas_identicas',
+    '--hidden-import=pastas_semelhantes',
+    '--hidden-import=agrupamento_externo',
+    '--hidden-import=movimentacao',
+    '--hidden-import=hash_arquivos',
+] + [f'--exclude-module=PyQt6.{modulo}' for modulo in QT_NAO_USADOS] + [
     '--clean'
 ])
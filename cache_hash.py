@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import time
+
+# Arquivo do cache, salvo na raiz do HD junto com reorganizacao_log.txt
+NOME_ARQUIVO_CACHE = "cache_hashes.sqlite"
+
+# Incrementar sempre que o esquema mudar; o cache antigo é descartado
+VERSAO_ESQUEMA = 3
+
+# Quantidade máxima de entradas mantidas no cache
+MAX_ENTRADAS_PADRAO = 5_000_000
+
+# Quantidade de gravações acumuladas antes de cada commit
+TAMANHO_LOTE = 1000
+
+# Intervalo máximo (segundos) entre commits, para que uma interrupção no meio
+# de arquivos grandes não perca os hashes já calculados
+INTERVALO_GRAVACAO = 5.0
+
+
+class CacheHash:
+    """
+    Cache persistente de hashes em SQLite.
+
+    Cada hash é indexado por (dispositivo, inode, tamanho, mtime_ns) do
+    arquivo; se qualquer um desses valores mudar, a entrada simplesmente
+    deixa de ser encontrada e o arquivo é recalculado. O tipo distingue o
+    hash completo do hash parcial (início e fim do arquivo), e o algoritmo
+    registra qual função de hash produziu cada valor.
+    """
+
+    def __init__(self, caminho, max_entradas=MAX_ENTRADAS_PADRAO):
+        self.caminho = caminho
+        self.max_entradas = max_entradas
+        self.acertos = 0
+        self.falhas = 0
+        self.removidas = 0
+        self._execucao = int(time.time())
+        self._pendentes = []
+        self._usadas = []
+        self._ultima_gravacao = time.monotonic()
+
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute("PRAGMA journal_mode=TRUNCATE")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self._criar_esquema()
+
+    def _criar_esquema(self):
+        versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        if versao != VERSAO_ESQUEMA:
+            self.conexao.execute("DROP TABLE IF EXISTS hashes")
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dispositivo INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                algoritmo TEXT NOT NULL,
+                caminho TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                usado_em INTEGER NOT NULL,
+                PRIMARY KEY (dispositivo, inode, tamanho, mtime_ns, tipo, algoritmo)
+            ) WITHOUT ROWID
+        """)
+        self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_usado_em ON hashes (usado_em)")
+        self.conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+        self.conexao.commit()
+
+    @staticmethod
+    def _chave(entrada):
+        return (entrada.dispositivo, entrada.inode, entrada.tamanho, entrada.mtime_ns)
+
+    def obter(self, entrada, tipo='completo', algoritmo='sha256'):
+        """Retorna o hash em cache da entrada do inventário, ou None"""
+        if not entrada.inode:
+            # Sem inode confiável não há como identificar o arquivo com segurança
+            self.falhas += 1
+            return None
+        chave = self._chave(entrada) + (tipo, algoritmo)
+        linha = self.conexao.execute(
+            "SELECT hash FROM hashes "
+            "WHERE dispositivo=? AND inode=? AND tamanho=? AND mtime_ns=? AND tipo=? AND algoritmo=?",
+            chave
+        ).fetchone()
+        if linha is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        self._usadas.append(chave)
+        if len(self._usadas) >= TAMANHO_LOTE:
+            self._gravar_pendentes()
+        return linha[0]
+
+    def gravar(self, entrada, hash_arquivo, tipo='completo', algoritmo='sha256'):
+        """Registra o hash calculado para a entrada do inventário"""
+        if not entrada.inode:
+            return
+        self._pendentes.append(
+            self._chave(entrada) + (tipo, algoritmo, entrada.caminho, hash_arquivo, self._execucao)
+        )
+        if (len(self._pendentes) >= TAMANHO_LOTE
+                or time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO):
+            self._gravar_pendentes()
+
+    def _gravar_pendentes(self):
+        self._ultima_gravacao = time.monotonic()
+        if self._pendentes:
+            self.conexao.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._pendentes
+            )
+            self._pendentes = []
+        if self._usadas:
+            self.conexao.executemany(
+                f"UPDATE hashes SET usado_em = {self._execucao} "
+                "WHERE dispositivo=? AND inode=? AND tamanho=? AND mtime_ns=? AND tipo=? AND algoritmo=?",
+                self._usadas
+            )
+            self._usadas = []
+        self.conexao.commit()
+
+    def remover_ausentes(self, inventario):
+        """
+        Remove do cache as entradas de arquivos que não existem mais
+        (ou que mudaram) de acordo com o inventário da varredura atual.
+        """
+        self._gravar_pendentes()
+        self.conexao.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS atuais (
+                dispositivo INTEGER, inode INTEGER, tamanho INTEGER, mtime_ns INTEGER,
+                PRIMARY KEY (dispositivo, inode, tamanho, mtime_ns)
+            ) WITHOUT ROWID
+        """)
+        self.conexao.execute("DELETE FROM atuais")
+        self.conexao.executemany(
+            "INSERT OR IGNORE INTO atuais VALUES (?, ?, ?, ?)",
+            inventario.identificacoes()
+        )
+        cursor = self.conexao.execute("""
+            DELETE FROM hashes WHERE NOT EXISTS (
+                SELECT 1 FROM atuais a
+                WHERE a.dispositivo = hashes.dispositivo AND a.inode = hashes.inode
+                  AND a.tamanho = hashes.tamanho AND a.mtime_ns = hashes.mtime_ns
+            )
+        """)
+        self.removidas += cursor.rowcount
+        self.conexao.execute("DELETE FROM atuais")
+        self.conexao.commit()
+
+    def aplicar_limite(self):
+        """Descarta as entradas usadas há mais tempo quando o limite é excedido"""
+        self._gravar_pendentes()
+        total = self.conexao.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        excesso = total - self.max_entradas
+        if excesso > 0:
+            cursor = self.conexao.execute("""
+                DELETE FROM hashes WHERE (dispositivo, inode, tamanho, mtime_ns, tipo, algoritmo) IN (
+                    SELECT dispositivo, inode, tamanho, mtime_ns, tipo, algoritmo
+                    FROM hashes ORDER BY usado_em LIMIT ?
+                )
+            """, (excesso,))
+            self.removidas += cursor.rowcount
+            self.conexao.commit()
+
+    def resumo(self):
+        """Texto com as estatísticas de uso do cache para o log"""
+        consultas = self.acertos + self.falhas
+        taxa = (100.0 * self.acertos / consultas) if consultas else 0.0
+        return (f"Cache de hashes: {self.acertos} acertos, {self.falhas} falhas "
+                f"({taxa:.1f}% de acerto), {self.removidas} entradas removidas")
+
+    def fechar(self):
+        self._gravar_pendentes()
+        self.aplicar_limite()
+        self.conexao.close()
+
+
+def abrir_cache(pasta, max_entradas=MAX_ENTRADAS_PADRAO):
+    """
+    Abre (ou cria) o cache de hashes na raiz da pasta.
+    Retorna None se não for possível gravar no HD (ex.: somente leitura).
+    """
+    try:
+        return CacheHash(os.path.join(pasta, NOME_ARQUIVO_CACHE), max_entradas)
+    except sqlite3.Error:
+        return None
@@ -0,0 +1,12 @@
+# Constantes compartilhadas pela interface, pela linha de comando e pelo
+# motor; sem dependências, para que a interface abra sem carregar o motor
+
+# SHA-256 continua como padrão: em CPUs com extensões SHA (x86 SHA-NI, ARMv8)
+# ele é mais rápido que o BLAKE2b do hashlib (ver benchmarks/benchmark_hash.py)
+ALGORITMO_PADRAO = 'sha256'
+
+# Nome padrão do arquivo de plano, salvo na raiz do HD junto com os logs
+NOME_ARQUIVO_PLANO = "plano_reorganizacao.jsonl"
+
+# Diário da mesclagem em andamento, salvo na raiz do HD de destino
+NOME_ARQUIVO_DIARIO = "mesclagem_em_andamento.jsonl"
@@ -0,0 +1,369 @@
+import errno
+import filecmp
+import os
+import queue
+import shutil
+import stat
+import sys
+import threading
+import time
+from collections import namedtuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from executor_hash import ExecutorHash
+from hash_arquivos import novo_hash
+
+# Tamanho de cada bloco que passa do leitor para o gravador
+TAMANHO_BLOCO_COPIA = 1024 * 1024
+
+# Blocos lidos à frente do gravador (limita a memória usada por arquivo)
+BLOCOS_EM_FILA = 8
+
+# Arquivos até este tamanho são copiados sem a thread de leitura separada;
+# a sobreposição vem de vários arquivos pequenos sendo copiados ao mesmo tempo
+LIMITE_PIPELINE = 2 * TAMANHO_BLOCO_COPIA
+
+# Erros que indicam que a cópia pelo kernel não é suportada para esse par de arquivos
+_SEM_SUPORTE = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+# ioctl do Linux que cria um reflink (cópia que compartilha os blocos do
+# original) em sistemas de arquivos como btrfs e XFS
+FICLONE = getattr(fcntl, 'FICLONE', 0x40049409)
+
+# Erros que indicam que o reflink não é suportado (o sistema de arquivos
+# responde ENOTTY ou EOPNOTSUPP, conforme o tipo)
+_SEM_REFLINK = _SEM_SUPORTE | {errno.ENOTTY}
+
+
+class ResultadoCopia(namedtuple('ResultadoCopia', ['tamanho', 'hash', 'dispositivo', 'inode', 'mtime_ns'])):
+    """
+    Resultado de uma cópia: bytes copiados, hash do conteúdo (calculado
+    durante a cópia, ou None) e a identificação do arquivo no destino,
+    usada para gravar o hash no cache sem ler o arquivo de novo.
+    """
+    __slots__ = ()
+
+
+def _copiar_kernel(origem, destino):
+    """
+    Copia pelo kernel, sem passar os dados pelo Python: copy_file_range
+    (Linux 4.5+, entre sistemas de arquivos a partir do 5.3) ou sendfile.
+    Retorna os bytes copiados, ou None se nenhum dos dois estiver disponível.
+
+    Só no Linux o sendfile aceita um arquivo como destino; no macOS e nos
+    BSDs ele exige um socket, e a cópia fica com o laço em Python.
+    """
+    copiados = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while True:
+                n = os.copy_file_range(origem, destino, TAMANHO_BLOCO_COPIA * 64)
+                if not n:
+                    return copiados
+                copiados += n
+        except OSError as e:
+            if copiados or e.errno not in _SEM_SUPORTE:
+                raise
+    if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        try:
+            while True:
+                n = os.sendfile(destino, origem, copiados, TAMANHO_BLOCO_COPIA * 64)
+                if not n:
+                    return copiados
+                copiados += n
+        except OSError:
+            # Antes do primeiro byte qualquer erro só significa "use o laço em Python"
+            if copiados:
+                raise
+    return None
+
+
+def _copiar_sequencial(origem, destino, h):
+    copiados = 0
+    while True:
+        bloco = origem.read(TAMANHO_BLOCO_COPIA)
+        if not bloco:
+            return copiados
+        if h is not None:
+            h.update(bloco)
+        destino.write(bloco)
+        copiados += len(bloco)
+
+
+def _copiar_pipeline(origem, destino, h):
+    """
+    Uma thread lê os blocos para uma fila limitada enquanto esta grava e
+    calcula o hash; leitura, gravação e hash liberam o GIL e se sobrepõem.
+    """
+    fila = queue.Queue(BLOCOS_EM_FILA)
+    parar = threading.Event()
+    erros = []
+
+    def ler():
+        try:
+            while not parar.is_set():
+                bloco = origem.read(TAMANHO_BLOCO_COPIA)
+                fila.put(bloco)
+                if not bloco:
+                    return
+        except BaseException as e:
+            erros.append(e)
+            fila.put(b'')
+
+    leitor = threading.Thread(target=ler, daemon=True)
+    leitor.start()
+    copiados = 0
+    try:
+        while True:
+            bloco = fila.get()
+            if not bloco:
+                break
+            if h is not None:
+                h.update(bloco)
+            destino.write(bloco)
+            copiados += len(bloco)
+    except BaseException:
+        # Libera o leitor, que pode estar parado esperando espaço na fila
+        parar.set()
+        while leitor.is_alive():
+            try:
+                fila.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise
+    leitor.join()
+    if erros:
+        raise erros[0]
+    return copiados
+
+
+def copiar_arquivo(origem, destino, algoritmo=None):
+    """
+    Copia um arquivo comum preservando as datas (como shutil.copy2), sem
+    nunca sobrescrever o destino.
+
+    Sem algoritmo, os dados são copiados pelo kernel quando possível. Com
+    algoritmo, o hash do conteúdo é calculado durante a cópia, sem uma
+    segunda leitura; arquivos grandes passam por um leitor e um gravador
+    ligados por uma fila limitada. Se a cópia falhar, o destino incompleto
+    é removido. Retorna um ResultadoCopia.
+    """
+    h = novo_hash(algoritmo) if algoritmo else None
+    criado = False
+    try:
+        with open(origem, 'rb') as f_origem:
+            tamanho = os.fstat(f_origem.fileno()).st_size
+            with open(destino, 'xb') as f_destino:
+                criado = True
+                copiados = None
+                if h is None:
+                    copiados = _copiar_kernel(f_origem.fileno(), f_destino.fileno())
+                if copiados is None:
+                    if tamanho > LIMITE_PIPELINE:
+                        copiados = _copiar_pipeline(f_origem, f_destino, h)
+                    else:
+                        copiados = _copiar_sequencial(f_origem, f_destino, h)
+        if copiados != tamanho:
+            raise OSError(errno.EIO, f"O arquivo mudou durante a cópia ({copiados} de {tamanho} bytes)", origem)
+        shutil.copystat(origem, destino)
+        st = os.stat(destino)
+    except BaseException:
+        if criado:
+            try:
+                os.remove(destino)
+            except OSError:
+                pass
+        raise
+    return ResultadoCopia(copiados, h.hexdigest() if h is not None else None,
+                          st.st_dev, st.st_ino, st.st_mtime_ns)
+
+
+def mover_arquivo(origem, destino):
+    """
+    Move um arquivo (ou pasta) com os.rename quando origem e destino estão
+    no mesmo dispositivo; entre dispositivos diferentes, copia (preservando
+    datas) e remove a origem.
+    """
+    try:
+        os.rename(origem, destino)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        pasta = os.path.isdir(origem) and not os.path.islink(origem)
+        try:
+            if pasta:
+                shutil.copytree(origem, destino, symlinks=True)
+            else:
+                shutil.copy2(origem, destino, follow_symlinks=False)
+        except BaseException:
+            # Não deixa uma cópia incompleta no destino
+            if pasta:
+                shutil.rmtree(destino, ignore_errors=True)
+            else:
+                try:
+                    os.remove(destino)
+                except OSError:
+                    pass
+            raise
+        if pasta:
+            shutil.rmtree(origem)
+        else:
+            os.remove(origem)
+
+
+def transferir_arquivo(origem, destino, mover=False, algoritmo=None):
+    """
+    Copia (ou move, removendo a origem depois da cópia completa) um item
+    para outro dispositivo. Arquivos comuns passam por copiar_arquivo;
+    pastas e links simbólicos seguem o caminho de shutil. Retorna um
+    ResultadoCopia (hash None quando não foi calculado).
+    """
+    st = os.lstat(origem)
+    if stat.S_ISREG(st.st_mode):
+        resultado = copiar_arquivo(origem, destino, algoritmo)
+        if mover:
+            os.remove(origem)
+        return resultado
+    if mover:
+        mover_arquivo(origem, destino)
+    else:
+        shutil.copy2(origem, destino)
+    return ResultadoCopia(st.st_size, None, None, None, None)
+
+
+def _clonar(origem, destino):
+    """Cria destino como reflink de origem; OSError se não for suportado"""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, "Reflink não suportado neste sistema", origem)
+    with open(origem, 'rb') as f_origem:
+        with open(destino, 'xb') as f_destino:
+            try:
+                fcntl.ioctl(f_destino.fileno(), FICLONE, f_origem.fileno())
+            except BaseException:
+                os.remove(destino)
+                raise
+
+
+def vincular_arquivo(original, duplicado, identidade=None):
+    """
+    Troca o duplicado, no mesmo caminho, por um reflink do original (os
+    blocos passam a ser compartilhados, e cada arquivo continua independente
+    se um deles for alterado depois) ou, onde não houver reflink, por um
+    hardlink (os dois caminhos passam a ser o mesmo arquivo, com as datas e
+    permissões do original). O vínculo é criado com um nome temporário na
+    mesma pasta e só então substitui o duplicado, com os.replace; se nada
+    funcionar, o duplicado fica como estava e o OSError é propagado.
+
+    identidade é ((inode, mtime_ns) do duplicado, (inode, mtime_ns) do
+    original) registrada quando os arquivos foram comparados; se qualquer
+    um dos dois mudou desde então (mesmo mantendo o tamanho), nada é feito.
+    Sem identidade, o conteúdo dos dois é comparado byte a byte antes.
+
+    Retorna 'reflink', 'hardlink' ou None se os dois já eram o mesmo arquivo.
+    """
+    st_original = os.stat(original)
+    st_duplicado = os.lstat(duplicado)
+    if not stat.S_ISREG(st_duplicado.st_mode):
+        raise OSError(errno.EINVAL, "Não é um arquivo comum", duplicado)
+    if os.path.samestat(st_original, st_duplicado):
+        return None
+    if st_original.st_dev != st_duplicado.st_dev:
+        raise OSError(errno.EXDEV, "O original está em outro dispositivo", duplicado)
+    if st_original.st_size != st_duplicado.st_size:
+        raise OSError(errno.EIO, "O arquivo mudou desde a análise", duplicado)
+    if identidade is not None:
+        for st, (inode, mtime_ns), caminho in zip((st_duplicado, st_original), identidade,
+                                                 (duplicado, original)):
+            if (st.st_ino, st.st_mtime_ns) != (inode, mtime_ns):
+                raise OSError(errno.EIO, "O arquivo mudou desde a análise", caminho)
+    elif not filecmp.cmp(original, duplicado, shallow=False):
+        raise OSError(errno.EIO, "O conteúdo difere do original", duplicado)
+
+    pasta, nome = os.path.split(duplicado)
+    temporario = os.path.join(pasta, f".{nome}.vinculo")
+    try:
+        # Sobra de uma execução interrompida
+        os.remove(temporario)
+    except FileNotFoundError:
+        pass
+    try:
+        _clonar(original, temporario)
+        metodo = 'reflink'
+    except OSError as e:
+        if e.errno not in _SEM_REFLINK:
+            raise
+        os.link(original, temporario)
+        metodo = 'hardlink'
+    try:
+        if metodo == 'reflink':
+            # O reflink é um arquivo novo: mantém as datas e permissões do duplicado
+            shutil.copystat(duplicado, temporario)
+        os.replace(temporario, duplicado)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+    return metodo
+
+
+class CopiadorArquivos:
+    """
+    Executa várias transferências ao mesmo tempo, respeitando o limite de
+    leituras simultâneas por disco de origem do ExecutorHash (poucas em
+    HDs rotativos, mais em SSDs), e mede a vazão em MB/s e arquivos/s.
+    """
+
+    def __init__(self, algoritmo=None, executor=None, metricas=None):
+        self.algoritmo = algoritmo
+        self.metricas = metricas
+        self._executor_proprio = executor is None
+        self.executor = executor if executor is not None else ExecutorHash()
+        self.arquivos = 0
+        self.bytes = 0
+        self._inicio = None
+
+    def enviar(self, origem, destino, mover=False, dispositivo=None, contexto=None, tamanho=0):
+        """
+        Agenda a transferência; o resultado sai em resultados() com o contexto.
+        tamanho (do plano ou do inventário) só é usado nas métricas.
+        """
+        if self._inicio is None:
+            self._inicio = time.monotonic()
+        args = (transferir_arquivo, origem, destino, mover, self.algoritmo)
+        if self.metricas is not None:
+            # A thread que copia marca o arquivo como o atual nas métricas
+            args = (self.metricas.medir, origem, tamanho) + args
+        self.executor.enviar(dispositivo, *args, contexto=contexto)
+
+    def resultados(self):
+        """Gera tuplas (contexto, ResultadoCopia, erro) à medida que as transferências terminam"""
+        for contexto, resultado, erro in self.executor.resultados():
+            if erro is None:
+                self.arquivos += 1
+                self.bytes += resultado.tamanho
+            if self.metricas is not None:
+                self.metricas.definir_fila(self.executor.fila)
+            yield contexto, resultado, erro
+
+    def vazao(self):
+        """(MB/s, arquivos/s) desde a primeira transferência"""
+        decorrido = time.monotonic() - self._inicio if self._inicio is not None else 0
+        if decorrido <= 0:
+            return 0.0, 0.0
+        return self.bytes / (1024 * 1024) / decorrido, self.arquivos / decorrido
+
+    def resumo(self):
+        """Texto com a vazão das cópias para o log"""
+        mb_s, arquivos_s = self.vazao()
+        return (f"Cópia entre dispositivos: {self.arquivos} arquivos, "
+                f"{self.bytes / (1024 * 1024):.1f} MB ({mb_s:.1f} MB/s, {arquivos_s:.1f} arquivos/s)")
+
+    def fechar(self):
+        if self._executor_proprio:
+            self.executor.fechar()
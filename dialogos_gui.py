@@ -0,0 +1,219 @@
+from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QDialog, QRadioButton,
+                             QButtonGroup, QFrame, QGroupBox)
+from hash_arquivos import algoritmos_disponiveis, ALGORITMO_PADRAO, VERIFICACOES
+from estilo_gui import STYLE, AnimatedButton
+
+# Diálogos usados só sob demanda; a janela principal importa este módulo
+# quando um deles é aberto pela primeira vez
+
+class StyledDialog(QDialog):
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.setModal(True)
+        self.setStyleSheet(STYLE)
+        self.setMinimumSize(700, 500)
+
+class BatchSettingsDialog(StyledDialog):
+    def __init__(self, parent=None):
+        super().__init__("Configurações de Processamento em Lote", parent)
+        
+        layout = QVBoxLayout()
+        
+        # Título
+        title_label = QLabel("Configurações de Processamento em Lote")
+        title_label.setStyleSheet("font-size: 18px; font-weight: bold; margin-bottom: 10px;")
+        layout.addWidget(title_label)
+        
+        # Container principal
+        main_container = QFrame()
+        main_container.setObjectName("card")
+        main_layout = QVBoxLayout(main_container)
+        
+        # Opções para arquivos duplicados
+        duplicate_group = QGroupBox("Tratamento de Arquivos Duplicados")
+        duplicate_layout = QVBoxLayout(duplicate_group)
+        
+        self.duplicate_radio_group = QButtonGroup()
+        duplicate_options = [
+            "Perguntar para cada arquivo",
+            "Manter todos os arquivos",
+            "Manter apenas o primeiro arquivo (mover outros para pasta de duplicados)",
+            "Mover todos os duplicados para pasta específica (mantém originais)",
+            "Deduplicar no lugar (troca as cópias por reflinks ou hardlinks do primeiro)"
+        ]
+        
+        for i, text in enumerate(duplicate_options):
+            radio = QRadioButton(text)
+            radio.setStyleSheet("font-size: 14px;")
+            self.duplicate_radio_group.addButton(radio, i)
+            duplicate_layout.addWidget(radio)
+        
+        # Seleciona a opção padrão
+        self.duplicate_radio_group.button(2).setChecked(True)
+        
+        main_layout.addWidget(duplicate_group)
+        
+        # Opções para pastas duplicadas
+        folder_group = QGroupBox("Tratamento de Pastas Duplicadas")
+        folder_layout = QVBoxLayout(folder_group)
+        
+        self.folder_radio_group = QButtonGroup()
+        folder_options = [
+            "Perguntar para cada pasta",
+            "Manter todas as pastas",
+            "Manter apenas a primeira pasta",
+            "Mesclar conteúdo das pastas"
+        ]
+        
+        for i, text in enumerate(folder_options):
+            radio = QRadioButton(text)
+            radio.setStyleSheet("font-size: 14px;")
+            self.folder_radio_group.addButton(radio, i)
+            folder_layout.addWidget(radio)
+        
+        # Seleciona a opção padrão
+        self.folder_radio_group.button(3).setChecked(True)
+        
+        main_layout.addWidget(folder_group)
+        
+        # Algoritmo de hash usado para agrupar os arquivos
+        hash_group = QGroupBox("Algoritmo de Hash")
+        hash_layout = QVBoxLayout(hash_group)
+        
+        self.algorithms = algoritmos_disponiveis()
+        self.hash_radio_group = QButtonGroup()
+        for i, name in enumerate(self.algorithms):
+            radio = QRadioButton(name)
+            radio.setStyleSheet("font-size: 14px;")
+            self.hash_radio_group.addButton(radio, i)
+            hash_layout.addWidget(radio)
+        
+        # Seleciona a opção padrão
+        self.hash_radio_group.button(self.algorithms.index(ALGORITMO_PADRAO)).setChecked(True)
+        
+        main_layout.addWidget(hash_group)
+        
+        # Confirmação dos duplicados antes de mover
+        verification_group = QGroupBox("Confirmação dos Duplicados")
+        verification_layout = QVBoxLayout(verification_group)
+        
+        self.verifications = list(VERIFICACOES)
+        self.verification_radio_group = QButtonGroup()
+        for i, name in enumerate(self.verifications):
+            radio = QRadioButton(VERIFICACOES[name])
+            radio.setStyleSheet("font-size: 14px;")
+            self.verification_radio_group.addButton(radio, i)
+            verification_layout.addWidget(radio)
+        
+        # Seleciona a opção padrão
+        self.verification_radio_group.button(0).setChecked(True)
+        
+        main_layout.addWidget(verification_group)
+        
+        # Memória máxima do agrupamento e da comparação dos arquivos
+        memory_group = QGroupBox("Limite de Memória")
+        memory_layout = QVBoxLayout(memory_group)
+        
+        memory_options = [
+            ("Sem limite", None),
+            ("512 MB", 512 * 1024 ** 2),
+            ("1 GB", 1024 ** 3),
+            ("2 GB", 2 * 1024 ** 3),
+            ("4 GB", 4 * 1024 ** 3),
+            ("8 GB", 8 * 1024 ** 3),
+        ]
+        self.memory_limits = [limit for _, limit in memory_options]
+        self.memory_radio_group = QButtonGroup()
+        for i, (text, _) in enumerate(memory_options):
+            radio = QRadioButton(text)
+            radio.setStyleSheet("font-size: 14px;")
+            self.memory_radio_group.addButton(radio, i)
+            memory_layout.addWidget(radio)
+        
+        # Seleciona a opção padrão
+        self.memory_radio_group.button(0).setChecked(True)
+        
+        memory_info = QLabel("Acima do limite, os dados da análise vão para arquivos temporários no disco: "
+                             "mais lento, sem esgotar a memória")
+        memory_info.setWordWrap(True)
+        memory_info.setStyleSheet("font-size: 12px; color: #aaaaaa;")
+        memory_layout.addWidget(memory_info)
+        
+        main_layout.addWidget(memory_group)
+        
+        # Informação sobre organização por tipo
+        info_label = QLabel("Os arquivos duplicados serão organizados em subpastas por tipo (PDFs, Imagens, etc.)")
+        info_label.setStyleSheet("font-size: 14px; color: #aaaaaa; margin-top: 10px;")
+        main_layout.addWidget(info_label)
+        
+        layout.addWidget(main_container)
+        
+        # Botões
+        buttons_layout = QHBoxLayout()
+        
+        cancel_btn = AnimatedButton("Cancelar")
+        cancel_btn.clicked.connect(self.reject)
+        
+        confirm_btn = AnimatedButton("Confirmar")
+        confirm_btn.clicked.connect(self.accept)
+        
+        buttons_layout.addWidget(cancel_btn)
+        buttons_layout.addWidget(confirm_btn)
+        
+        layout.addLayout(buttons_layout)
+        
+        self.setLayout(layout)
+
+class FolderActionDialog(StyledDialog):
+    def __init__(self, folder1, folder2, parent=None):
+        super().__init__("Ação para Pastas Duplicadas", parent)
+        
+        layout = QVBoxLayout()
+        
+        # Título
+        title_label = QLabel("Pastas Idênticas Encontradas")
+        title_label.setStyleSheet("font-size: 18px; font-weight: bold; margin-bottom: 10px;")
+        layout.addWidget(title_label)
+        
+        # Container principal
+        main_container = QFrame()
+        main_container.setObjectName("card")
+        main_layout = QVBoxLayout(main_container)
+        
+        # Informação das pastas
+        paths_frame = QFrame()
+        paths_frame.setObjectName("card")
+        paths_layout = QVBoxLayout(paths_frame)
+        paths_layout.addWidget(QLabel(f"1: {folder1}"))
+        paths_layout.addWidget(QLabel(f"2: {folder2}"))
+        main_layout.addWidget(paths_frame)
+        
+        # Opções
+        options_frame = QFrame()
+        options_frame.setObjectName("card")
+        options_layout = QVBoxLayout(options_frame)
+        
+        self.radio_group = QButtonGroup()
+        options = [
+            "Manter ambas",
+            "Manter apenas a primeira",
+            "Manter apenas a segunda",
+            "Mesclar conteúdo"
+        ]
+        
+        for i, text in enumerate(options):
+            radio = QRadioButton(text)
+            radio.setStyleSheet("font-size: 14px;")
+            self.radio_group.addButton(radio, i)
+            options_layout.addWidget(radio)
+        
+        main_layout.addWidget(options_frame)
+        layout.addWidget(main_container)
+        
+        # Botão de confirmação
+        confirm_btn = AnimatedButton("Confirmar")
+        confirm_btn.clicked.connect(self.accept)
+        layout.addWidget(confirm_btn)
+        
+        self.setLayout(layout)
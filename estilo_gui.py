@@ -0,0 +1,195 @@
+from PyQt6.QtWidgets import QPushButton
+from PyQt6.QtCore import QSize, QPropertyAnimation, QEasingCurve
+
+# Definição de estilos
+STYLE = """
+QMainWindow, QDialog {
+    background-color: #2b2b2b;
+}
+
+QTabWidget::pane {
+    border: 1px solid #3d3d3d;
+    background-color: #2b2b2b;
+    border-radius: 5px;
+}
+
+QTabBar::tab {
+    background-color: #3d3d3d;
+    color: #ffffff;
+    padding: 8px 20px;
+    border-top-left-radius: 5px;
+    border-top-right-radius: 5px;
+    margin-right: 2px;
+}
+
+QTabBar::tab:selected {
+    background-color: #0d47a1;
+}
+
+QPushButton {
+    background-color: #0d47a1;
+    color: white;
+    border: none;
+    padding: 8px 15px;
+    border-radius: 4px;
+    font-weight: bold;
+    min-height: 30px;
+}
+
+QPushButton:hover {
+    background-color: #1565c0;
+}
+
+QPushButton:pressed {
+    background-color: #0a3d87;
+}
+
+QPushButton:disabled {
+    background-color: #666666;
+}
+
+QTextEdit {
+    background-color: #1e1e1e;
+    color: #ffffff;
+    border: 1px solid #3d3d3d;
+    border-radius: 4px;
+    padding: 5px;
+    selection-background-color: #0d47a1;
+}
+
+QProgressBar {
+    border: 2px solid #3d3d3d;
+    border-radius: 5px;
+    text-align: center;
+    height: 25px;
+    background-color: #1e1e1e;
+    color: white;
+}
+
+QProgressBar::chunk {
+    background-color: #0d47a1;
+    border-radius: 3px;
+}
+
+QLabel {
+    color: #ffffff;
+    font-size: 12px;
+}
+
+QRadioButton, QCheckBox {
+    color: #ffffff;
+    spacing: 8px;
+    padding: 2px;
+}
+
+QRadioButton::indicator, QCheckBox::indicator {
+    width: 18px;
+    height: 18px;
+}
+
+QRadioButton::indicator:unchecked, QCheckBox::indicator:unchecked {
+    background-color: #1e1e1e;
+    border: 2px solid #3d3d3d;
+    border-radius: 9px;
+}
+
+QRadioButton::indicator:checked, QCheckBox::indicator:checked {
+    background-color: #0d47a1;
+    border: 2px solid #3d3d3d;
+    border-radius: 9px;
+}
+
+QListWidget {
+    background-color: #1e1e1e;
+    color: #ffffff;
+    border: 1px solid #3d3d3d;
+    border-radius: 4px;
+    padding: 5px;
+}
+
+QListWidget::item {
+    padding: 5px;
+    border-radius: 3px;
+}
+
+QListWidget::item:selected {
+    background-color: #0d47a1;
+}
+
+QListWidget::item:hover {
+    background-color: #3d3d3d;
+}
+
+QScrollBar:vertical {
+    border: none;
+    background-color: #1e1e1e;
+    width: 12px;
+    margin: 0px;
+}
+
+QScrollBar::handle:vertical {
+    background-color: #3d3d3d;
+    border-radius: 6px;
+    min-height: 20px;
+}
+
+QScrollBar::handle:vertical:hover {
+    background-color: #4d4d4d;
+}
+
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    height: 0px;
+}
+
+QFrame#card {
+    background-color: #3d3d3d;
+    border-radius: 8px;
+    padding: 10px;
+    margin: 5px;
+}
+
+QGroupBox {
+    color: #ffffff;
+    border: 1px solid #3d3d3d;
+    border-radius: 5px;
+    margin-top: 1.5ex;
+    padding-top: 1.5ex;
+    font-weight: bold;
+}
+
+QGroupBox::title {
+    subcontrol-origin: margin;
+    subcontrol-position: top center;
+    padding: 0 5px;
+}
+
+QWidget {
+    font-family: 'Segoe UI', Arial, sans-serif;
+}
+"""
+
+
+class AnimatedButton(QPushButton):
+    def __init__(self, text, parent=None):
+        super().__init__(text, parent)
+        self.setMinimumHeight(40)
+        self._animation = QPropertyAnimation(self, b"size")
+        self._animation.setDuration(100)
+        self._animation.setEasingCurve(QEasingCurve.Type.OutQuad)
+        self.original_size = None
+    
+    def enterEvent(self, event):
+        if not self.original_size:
+            self.original_size = self.size()
+        target_size = QSize(int(self.width() * 1.05), int(self.height() * 1.05))
+        self._animation.setStartValue(self.size())
+        self._animation.setEndValue(target_size)
+        self._animation.start()
+        super().enterEvent(event)
+    
+    def leaveEvent(self, event):
+        if self.original_size:
+            self._animation.setStartValue(self.size())
+            self._animation.setEndValue(self.original_size)
+            self._animation.start()
+        super().leaveEvent(event)
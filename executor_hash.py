@@ -0,0 +1,131 @@
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Leitores simultâneos em um disco rotativo (mais que isso gera excesso de seeks)
+LEITORES_HDD = 2
+
+# Leitores simultâneos quando não é possível descobrir o tipo do disco.
+# HDs externos costumam ser rotativos, então o padrão é conservador.
+LEITORES_DESCONHECIDO = 2
+
+
+def trabalhadores_padrao():
+    """Quantidade padrão de threads de leitura/hash"""
+    return min(32, (os.cpu_count() or 1) * 2)
+
+
+def disco_rotativo(dispositivo):
+    """
+    Informa se o dispositivo (st_dev) é um disco rotativo.
+    Retorna True, False ou None quando não for possível descobrir
+    (só há suporte para Linux, via /sys/dev/block).
+    """
+    if not dispositivo:
+        return None
+    try:
+        base = os.path.realpath(f"/sys/dev/block/{os.major(dispositivo)}:{os.minor(dispositivo)}")
+    except (AttributeError, ValueError, OSError):
+        return None
+    # Partições não têm a pasta queue; o valor fica no disco pai
+    for pasta in (base, os.path.dirname(base)):
+        try:
+            with open(os.path.join(pasta, "queue", "rotational")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+class ExecutorHash:
+    """
+    Executa o cálculo de hashes em um pool de threads limitado,
+    respeitando um máximo de leituras simultâneas por dispositivo.
+
+    O hashlib libera o GIL ao processar blocos grandes, então as threads
+    trabalham em paralelo de verdade. O escalonamento é feito na thread
+    que consome os resultados: uma tarefa só é enviada ao pool quando o
+    seu dispositivo está abaixo do limite, e nenhuma thread fica bloqueada
+    esperando vaga.
+
+    Parâmetros:
+    - trabalhadores: tamanho do pool (padrão: 2x o número de CPUs, até 32)
+    - leitores_por_dispositivo: limite fixo por dispositivo; se None, usa
+      LEITORES_HDD para discos rotativos, o pool inteiro para SSD/NVMe e
+      LEITORES_DESCONHECIDO quando o tipo não puder ser detectado
+    """
+
+    def __init__(self, trabalhadores=None, leitores_por_dispositivo=None):
+        self.trabalhadores = trabalhadores or trabalhadores_padrao()
+        self.leitores_por_dispositivo = leitores_por_dispositivo
+        self._pool = ThreadPoolExecutor(max_workers=self.trabalhadores)
+        self._pendentes = defaultdict(deque)
+        self._em_andamento = defaultdict(int)
+        self._limites = {}
+        self._futuros = {}
+
+    def limite_leitores(self, dispositivo):
+        """Quantidade máxima de leituras simultâneas no dispositivo"""
+        if dispositivo not in self._limites:
+            if self.leitores_por_dispositivo:
+                limite = self.leitores_por_dispositivo
+            else:
+                rotativo = disco_rotativo(dispositivo)
+                if rotativo is None:
+                    limite = LEITORES_DESCONHECIDO
+                elif rotativo:
+                    limite = LEITORES_HDD
+                else:
+                    limite = self.trabalhadores
+            self._limites[dispositivo] = max(1, min(limite, self.trabalhadores))
+        return self._limites[dispositivo]
+
+    def enviar(self, dispositivo, funcao, *args, contexto=None, urgente=False):
+        """
+        Agenda funcao(*args); o resultado sai em resultados() junto com o contexto.
+        Tarefas urgentes passam na frente das que já estão na fila do dispositivo.
+        """
+        if urgente:
+            self._pendentes[dispositivo].appendleft((funcao, args, contexto))
+        else:
+            self._pendentes[dispositivo].append((funcao, args, contexto))
+
+    @property
+    def fila(self):
+        """Quantidade de tarefas aguardando vaga ou em execução"""
+        return sum(len(fila) for fila in self._pendentes.values()) + len(self._futuros)
+
+    def _despachar(self):
+        for dispositivo, fila in self._pendentes.items():
+            limite = self.limite_leitores(dispositivo)
+            while fila and self._em_andamento[dispositivo] < limite:
+                funcao, args, contexto = fila.popleft()
+                futuro = self._pool.submit(funcao, *args)
+                self._futuros[futuro] = (dispositivo, contexto)
+                self._em_andamento[dispositivo] += 1
+
+    def resultados(self):
+        """
+        Gera tuplas (contexto, resultado, erro) à medida que as tarefas
+        terminam. Tarefas enviadas durante a iteração também são executadas.
+        """
+        while True:
+            self._despachar()
+            if not self._futuros:
+                return
+            concluidos, _ = wait(list(self._futuros), return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                dispositivo, contexto = self._futuros.pop(futuro)
+                self._em_andamento[dispositivo] -= 1
+                erro = futuro.exception()
+                yield contexto, (None if erro else futuro.result()), erro
+                self._despachar()
+
+    def fechar(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
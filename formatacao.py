@@ -0,0 +1,11 @@
+# Formatação de valores para mensagens, log e interface; sem dependências,
+# para que qualquer módulo (inclusive a interface) possa usá-la sem carregar o motor
+
+
+def formatar_bytes(valor):
+    """Formata uma quantidade de bytes em B, KB, MB, GB ou TB"""
+    for unidade in ("B", "KB", "MB", "GB"):
+        if abs(valor) < 1024:
+            return f"{valor:.0f} {unidade}" if unidade == "B" else f"{valor:.1f} {unidade}"
+        valor /= 1024
+    return f"{valor:.1f} TB"
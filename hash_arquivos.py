@@ -0,0 +1,508 @@
+import filecmp
+import hashlib
+import os
+import threading
+from collections import defaultdict
+from constantes import ALGORITMO_PADRAO
+from executor_hash import ExecutorHash
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# Quantidade de bytes lidos do início e do fim do arquivo no hash parcial
+TAMANHO_AMOSTRA = 64 * 1024
+
+# Algoritmos disponíveis para agrupar arquivos. xxh3 e blake3 só aparecem
+# quando os pacotes opcionais estão instalados.
+ALGORITMOS = {
+    'sha256': hashlib.sha256,
+    'blake2b': hashlib.blake2b,
+}
+if xxhash is not None:
+    ALGORITMOS['xxh3'] = xxhash.xxh3_128
+if blake3 is not None:
+    ALGORITMOS['blake3'] = blake3.blake3
+
+# Buffers de leitura, um por thread do executor
+_buffers = threading.local()
+
+# Abaixo deste tamanho as chamadas a posix_fadvise custam mais do que economizam.
+# Em sistemas sem posix_fadvise (Windows, macOS) o limite desativa as dicas.
+LIMITE_FADVISE = 8 * 1024 * 1024 if hasattr(os, 'posix_fadvise') else float('inf')
+
+# Modos de confirmação dos grupos finais antes de qualquer arquivo ser movido
+VERIFICACOES = {
+    'nenhuma': "Sem confirmação",
+    'sha256': "Confirmar com SHA-256",
+    'bytes': "Comparar byte a byte",
+}
+
+
+def algoritmos_disponiveis():
+    """Lista os algoritmos de hash disponíveis nesta instalação"""
+    return list(ALGORITMOS)
+
+
+def novo_hash(algoritmo):
+    """Cria um objeto de hash do algoritmo escolhido"""
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo de hash não disponível: {algoritmo}")
+    return ALGORITMOS[algoritmo]()
+
+
+def tamanho_bloco(tamanho_arquivo):
+    """Escolhe o tamanho do bloco de leitura de acordo com o tamanho do arquivo"""
+    if tamanho_arquivo <= 1024 * 1024:
+        return 64 * 1024
+    if tamanho_arquivo <= 64 * 1024 * 1024:
+        return 256 * 1024
+    return 1024 * 1024
+
+
+def _buffer_leitura(tamanho):
+    """
+    Buffer reaproveitado entre leituras da mesma thread, evitando criar um
+    novo objeto bytes a cada bloco lido.
+    """
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < tamanho:
+        buffer = bytearray(tamanho)
+        _buffers.buffer = buffer
+    return memoryview(buffer)[:tamanho]
+
+
+def _aconselhar(fd, conselho):
+    """Repassa uma dica de acesso ao kernel (posix_fadvise)"""
+    try:
+        os.posix_fadvise(fd, 0, 0, conselho)
+    except OSError:
+        pass
+
+
+def calcular_hash_arquivo(caminho_arquivo, block_size=None, algoritmo='sha256'):
+    """
+    Calcula o hash de um arquivo (SHA-256 por padrão).
+
+    A leitura usa readinto em um buffer reaproveitado e, se block_size não
+    for informado, o bloco é escolhido pelo tamanho do arquivo. Em arquivos
+    grandes o kernel é avisado (posix_fadvise) de que a leitura é sequencial
+    e, ao final, de que as páginas lidas podem ser descartadas, para que
+    varrer um HD inteiro não expulse do cache o que os outros programas
+    estão usando.
+
+    mmap não é usado: se o HD externo for desconectado durante a leitura,
+    o acesso à memória mapeada encerra o processo com SIGBUS.
+    """
+    h = novo_hash(algoritmo)
+    with open(caminho_arquivo, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        tamanho = os.fstat(fd).st_size
+        if block_size is None:
+            block_size = tamanho_bloco(tamanho)
+        buffer = _buffer_leitura(block_size)
+        aconselhar = tamanho > LIMITE_FADVISE
+        if aconselhar:
+            _aconselhar(fd, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            lidos = f.readinto(buffer)
+            if not lidos:
+                break
+            h.update(buffer[:lidos])
+        if aconselhar:
+            _aconselhar(fd, os.POSIX_FADV_DONTNEED)
+    return h.hexdigest()
+
+
+def calcular_hash_parcial(caminho_arquivo, tamanho, tamanho_amostra=TAMANHO_AMOSTRA, algoritmo='sha256'):
+    """
+    Calcula um hash barato a partir do início e do fim do arquivo.
+    Serve apenas para descartar candidatos; arquivos com o mesmo hash
+    parcial ainda precisam do hash completo.
+    """
+    h = novo_hash(algoritmo)
+    with open(caminho_arquivo, 'rb') as f:
+        h.update(f.read(tamanho_amostra))
+        if tamanho > tamanho_amostra:
+            f.seek(max(tamanho - tamanho_amostra, tamanho_amostra))
+            h.update(f.read(tamanho_amostra))
+    return h.hexdigest()
+
+
+def comparar_arquivos(arquivo1, arquivo2):
+    """Compara o conteúdo de dois arquivos byte a byte"""
+    return filecmp.cmp(arquivo1, arquivo2, shallow=False)
+
+
+class _GrupoTamanho:
+    """Estado de um grupo de arquivos de mesmo tamanho durante o filtro"""
+    __slots__ = ('entradas', 'hashes', 'pendentes', 'etapa', 'anteriores', 'arquivos')
+
+    def __init__(self, entradas):
+        self.entradas = entradas
+        # Arquivos do grupo ao entrar no filtro, contados no limite de resolver()
+        self.arquivos = len(entradas)
+        self.hashes = {}
+        self.pendentes = 0
+        self.etapa = None
+        # Grupos da etapa anterior, usados na comparação byte a byte
+        self.anteriores = None
+
+
+class _FiltroDuplicados:
+    """
+    Conduz cada grupo de tamanho pelas etapas de hash parcial, hash completo
+    e, opcionalmente, confirmação. As consultas ao cache e a gravação dos
+    resultados acontecem na thread que chama resolver(); só a leitura dos
+    arquivos vai para o executor.
+    """
+
+    def __init__(self, cache, executor, estatisticas, algoritmo, verificacao, metricas=None):
+        self.cache = cache
+        self.executor = executor
+        self.estatisticas = estatisticas
+        self.algoritmo = algoritmo
+        self.verificacao = verificacao
+        self.metricas = metricas
+
+    def _algoritmo_etapa(self, etapa):
+        return 'sha256' if etapa == 'verificacao' else self.algoritmo
+
+    def _tipo_cache(self, etapa):
+        return 'parcial' if etapa == 'parcial' else 'completo'
+
+    @staticmethod
+    def _bytes_lidos(etapa, entrada):
+        if etapa == 'parcial':
+            return min(entrada.tamanho, 2 * TAMANHO_AMOSTRA)
+        if etapa == 'bytes':
+            return 2 * entrada.tamanho
+        return entrada.tamanho
+
+    def _enviar(self, etapa, entrada, funcao, *args, contexto, urgente=False):
+        """Envia a leitura ao executor, registrando-a nas métricas quando houver"""
+        if self.metricas is not None:
+            tamanho = self._bytes_lidos(etapa, entrada)
+            self.metricas.agendar(etapa, bytes_=tamanho)
+            args = (entrada.caminho, tamanho, funcao) + args
+            funcao = self.metricas.medir
+        self.executor.enviar(entrada.dispositivo, funcao, *args, contexto=contexto, urgente=urgente)
+
+    def _iniciar_etapa(self, indice, grupo, entradas, etapa, referencias=None):
+        grupo.entradas = entradas
+        grupo.hashes = {}
+        grupo.pendentes = 0
+        grupo.etapa = etapa
+        algoritmo = self._algoritmo_etapa(etapa)
+        for posicao, entrada in enumerate(entradas):
+            contexto = (indice, posicao)
+            if etapa == 'bytes':
+                self._enviar(etapa, entrada, comparar_arquivos,
+                             referencias[posicao].caminho, entrada.caminho,
+                             contexto=contexto, urgente=True)
+                grupo.pendentes += 1
+                continue
+            hash_cache = None
+            if self.cache is not None:
+                hash_cache = self.cache.obter(entrada, tipo=self._tipo_cache(etapa), algoritmo=algoritmo)
+            if hash_cache is not None:
+                grupo.hashes[posicao] = hash_cache
+                if etapa == 'completo':
+                    self.estatisticas["completo_cache"] += 1
+            elif etapa == 'parcial':
+                self._enviar(etapa, entrada, calcular_hash_parcial,
+                             entrada.caminho, entrada.tamanho, TAMANHO_AMOSTRA, algoritmo,
+                             contexto=contexto)
+                grupo.pendentes += 1
+            else:
+                # Etapas finais passam na frente para que os grupos terminem logo
+                self._enviar(etapa, entrada, calcular_hash_arquivo,
+                             entrada.caminho, None, algoritmo,
+                             contexto=contexto, urgente=True)
+                grupo.pendentes += 1
+
+    def _agrupar(self, grupo):
+        # Percorre na ordem do inventário, não na ordem em que as leituras terminaram
+        grupos = defaultdict(list)
+        for posicao, entrada in enumerate(grupo.entradas):
+            hash_ = grupo.hashes.get(posicao)
+            if hash_ is not None:
+                grupos[hash_].append(entrada)
+        return grupos
+
+    def _duplicados(self, grupo):
+        return {hash_: entradas for hash_, entradas in self._agrupar(grupo).items()
+                if len(entradas) > 1}
+
+    def _avancar(self, indice, grupo):
+        """
+        Chamado quando uma etapa do grupo termina. Retorna o dicionário
+        hash -> entradas duplicadas quando o grupo está resolvido, ou None
+        se ainda há leituras pendentes.
+        """
+        while True:
+            if grupo.etapa == 'parcial':
+                tamanho = grupo.entradas[0].tamanho
+                sobreviventes = []
+                for entradas in self._agrupar(grupo).values():
+                    if len(entradas) > 1:
+                        sobreviventes.extend(entradas)
+                    else:
+                        self.estatisticas["eliminados_parcial"] += 1
+                        self.estatisticas["bytes_evitados"] += tamanho - 2 * TAMANHO_AMOSTRA
+                if len(sobreviventes) < 2:
+                    return {}
+                self._iniciar_etapa(indice, grupo, sobreviventes, 'completo')
+
+            elif grupo.etapa == 'completo':
+                duplicados = self._duplicados(grupo)
+                if not duplicados:
+                    return {}
+                if self.verificacao == 'sha256' and self.algoritmo != 'sha256':
+                    entradas = [entrada for grupo_hash in duplicados.values() for entrada in grupo_hash]
+                    self.estatisticas["verificados"] += len(entradas)
+                    self._iniciar_etapa(indice, grupo, entradas, 'verificacao')
+                elif self.verificacao == 'bytes':
+                    # Cada arquivo é comparado com o primeiro do seu grupo
+                    entradas, referencias = [], []
+                    for grupo_hash in duplicados.values():
+                        for entrada in grupo_hash[1:]:
+                            entradas.append(entrada)
+                            referencias.append(grupo_hash[0])
+                    self.estatisticas["verificados"] += len(entradas)
+                    grupo.anteriores = duplicados
+                    self._iniciar_etapa(indice, grupo, entradas, 'bytes', referencias)
+                else:
+                    return {f"{self.algoritmo}:{hash_}": entradas for hash_, entradas in duplicados.items()}
+
+            elif grupo.etapa == 'verificacao':
+                duplicados = {f"sha256:{hash_}": entradas for hash_, entradas in self._duplicados(grupo).items()}
+                confirmados = sum(len(entradas) for entradas in duplicados.values())
+                self.estatisticas["descartados_verificacao"] += len(grupo.entradas) - confirmados
+                return duplicados
+
+            else:  # 'bytes'
+                iguais = {entrada for posicao, entrada in enumerate(grupo.entradas)
+                          if grupo.hashes.get(posicao)}
+                self.estatisticas["descartados_verificacao"] += len(grupo.entradas) - len(iguais)
+                duplicados = {}
+                for hash_, entradas in grupo.anteriores.items():
+                    confirmados = [entradas[0]] + [entrada for entrada in entradas[1:] if entrada in iguais]
+                    if len(confirmados) > 1:
+                        duplicados[f"{self.algoritmo}:{hash_}"] = confirmados
+                grupo.anteriores = None
+                return duplicados
+
+            if grupo.pendentes:
+                return None
+
+    def _admitir(self, indice, grupo):
+        """Inicia o grupo; retorna o resultado se ele já foi resolvido (pelo cache), ou None"""
+        entradas = grupo.entradas
+        # Arquivos pequenos são lidos por inteiro no hash parcial; vai direto ao completo
+        if entradas[0].tamanho > 2 * TAMANHO_AMOSTRA:
+            self._iniciar_etapa(indice, grupo, entradas, 'parcial')
+        else:
+            self._iniciar_etapa(indice, grupo, entradas, 'completo')
+        if not grupo.pendentes:
+            return self._avancar(indice, grupo)
+        return None
+
+    def resolver(self, candidatos, limite=None):
+        """
+        Gera um dicionário hash -> entradas duplicadas para cada grupo de
+        tamanho, na ordem em que os grupos terminam.
+
+        Sem limite, todos os grupos são enviados ao executor de uma vez.
+        Com limite, candidatos é consumido aos poucos: um grupo só entra
+        enquanto houver menos de limite arquivos em análise (sempre ao
+        menos um grupo, mesmo que maior que o limite), e cada grupo
+        resolvido abre espaço para os próximos.
+        """
+        grupos = {}
+        pendentes = enumerate(candidatos)
+        em_analise = 0
+        esgotados = False
+        while True:
+            while not esgotados and (limite is None or not grupos or em_analise < limite):
+                proximo = next(pendentes, None)
+                if proximo is None:
+                    esgotados = True
+                    break
+                indice, entradas = proximo
+                grupo = _GrupoTamanho(entradas)
+                resultado = self._admitir(indice, grupo)
+                if resultado is not None:
+                    yield resultado
+                else:
+                    grupos[indice] = grupo
+                    em_analise += grupo.arquivos
+
+            for (indice, posicao), hash_, erro in self.executor.resultados():
+                grupo = grupos[indice]
+                if self.metricas is not None:
+                    self.metricas.concluir(grupo.etapa, bytes_=self._bytes_lidos(grupo.etapa, grupo.entradas[posicao]))
+                    self.metricas.definir_fila(self.executor.fila)
+                if erro is not None:
+                    self.estatisticas["erros_leitura"] += 1
+                    grupo.hashes[posicao] = None
+                else:
+                    grupo.hashes[posicao] = hash_
+                    if grupo.etapa == 'completo':
+                        # Só conta o que foi de fato lido; acertos do cache vão em completo_cache
+                        self.estatisticas["hash_completo"] += 1
+                    if self.cache is not None and grupo.etapa != 'bytes':
+                        self.cache.gravar(grupo.entradas[posicao], hash_,
+                                          tipo=self._tipo_cache(grupo.etapa),
+                                          algoritmo=self._algoritmo_etapa(grupo.etapa))
+                grupo.pendentes -= 1
+                if not grupo.pendentes:
+                    resultado = self._avancar(indice, grupo)
+                    if resultado is not None:
+                        del grupos[indice]
+                        em_analise -= grupo.arquivos
+                        yield resultado
+                        # Volta a admitir grupos; o executor continua de onde parou
+                        if not esgotados and limite is not None:
+                            break
+            else:
+                # O executor esvaziou: todos os grupos enviados foram resolvidos
+                if esgotados:
+                    return
+
+
+def novas_estatisticas():
+    """Contadores de cada etapa do filtro de duplicados"""
+    return {
+        "arquivos": 0,
+        "eliminados_tamanho": 0,
+        "eliminados_parcial": 0,
+        "hash_completo": 0,
+        "completo_cache": 0,
+        "verificados": 0,
+        "descartados_verificacao": 0,
+        "bytes_evitados": 0,
+        "erros_leitura": 0,
+    }
+
+
+def resumo_estatisticas(estatisticas, algoritmo=ALGORITMO_PADRAO):
+    """Texto com o resultado de cada etapa do filtro de duplicados"""
+    return (
+        f"Filtro de duplicados ({algoritmo}): {estatisticas['arquivos']} arquivos; "
+        f"{estatisticas['eliminados_tamanho']} descartados pelo tamanho, "
+        f"{estatisticas['eliminados_parcial']} pelo hash parcial, "
+        f"{estatisticas['hash_completo']} com hash completo "
+        f"(mais {estatisticas['completo_cache']} pelo cache); "
+        f"{estatisticas['bytes_evitados'] / (1024 ** 3):.2f} GB de leitura evitados"
+    )
+
+
+def gerar_grupos_duplicados(arquivos_por_tamanho, cache=None, callback=None, log_callback=None,
+                            executor=None, algoritmo=ALGORITMO_PADRAO, verificacao='nenhuma', metricas=None,
+                            memoria_maxima=None):
+    """
+    Filtro em etapas: tamanho -> hash parcial (início e fim) -> hash completo
+    -> confirmação opcional.
+
+    Os grupos são gerados assim que cada grupo de tamanho é resolvido, como
+    tuplas ("algoritmo:hash", tamanho, lista de entradas do inventário), sem
+    esperar o fim da análise do HD inteiro.
+
+    Parâmetros:
+    - arquivos_por_tamanho: dicionário (ou GruposPorTamanho) tamanho -> lista
+      de entradas do inventário
+    - cache: CacheHash opcional
+    - callback: função chamada com (grupos_processados, total_grupos)
+    - log_callback: função que recebe as mensagens com as contagens de cada etapa
+    - executor: ExecutorHash usado para ler os arquivos em paralelo; se None,
+      um executor com a configuração padrão é criado para esta chamada
+    - algoritmo: algoritmo usado para agrupar (ver algoritmos_disponiveis())
+    - verificacao: 'nenhuma', 'sha256' (recalcula os grupos finais com SHA-256)
+      ou 'bytes' (compara cada arquivo com o primeiro do grupo)
+    - metricas: MetricasProgresso opcional, que recebe as leituras de cada
+      etapa (bytes, arquivos, fila do executor e arquivo atual)
+    - memoria_maxima: limite de memória em bytes; os grupos de tamanho são
+      lidos de arquivos_por_tamanho aos poucos (que pode estar em disco,
+      ver agrupamento_externo) e só entram na análise enquanto os arquivos
+      em análise couberem no limite
+    """
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo de hash não disponível: {algoritmo}")
+    if verificacao not in VERIFICACOES:
+        raise ValueError(f"Modo de verificação inválido: {verificacao}")
+
+    estatisticas = novas_estatisticas()
+    # O agrupamento do inventário com minimo=2 já deixa de fora os tamanhos únicos, só contados
+    unicos = getattr(arquivos_por_tamanho, 'unicos', 0)
+    estatisticas["arquivos"] += unicos
+    estatisticas["eliminados_tamanho"] += unicos
+    if hasattr(arquivos_por_tamanho, 'quantidades'):
+        # Conta pelos tamanhos, sem montar as entradas; cada grupo é montado
+        # só quando entra no filtro
+        total_grupos = 0
+        for _, quantidade in arquivos_por_tamanho.quantidades():
+            estatisticas["arquivos"] += quantidade
+            if quantidade > 1:
+                total_grupos += 1
+            else:
+                estatisticas["eliminados_tamanho"] += 1
+        candidatos = (arquivos for arquivos in arquivos_por_tamanho.values() if len(arquivos) > 1)
+    else:
+        candidatos = []
+        for arquivos in arquivos_por_tamanho.values():
+            estatisticas["arquivos"] += len(arquivos)
+            if len(arquivos) > 1:
+                candidatos.append(arquivos)
+            else:
+                estatisticas["eliminados_tamanho"] += 1
+        total_grupos = len(candidatos)
+
+    if log_callback:
+        log_callback(f"Etapa 1 (tamanho): {estatisticas['eliminados_tamanho']} arquivos com tamanho único descartados, "
+                     f"{estatisticas['arquivos'] - estatisticas['eliminados_tamanho']} candidatos em {total_grupos} grupos")
+
+    limite = None
+    if memoria_maxima:
+        from agrupamento_externo import BYTES_POR_ARQUIVO_EM_ANALISE
+        limite = max(1, memoria_maxima // BYTES_POR_ARQUIVO_EM_ANALISE)
+    executor_proprio = executor is None
+    if executor_proprio:
+        executor = ExecutorHash()
+    try:
+        filtro = _FiltroDuplicados(cache, executor, estatisticas, algoritmo, verificacao, metricas)
+        for grupos_processados, resultado in enumerate(filtro.resolver(candidatos, limite), 1):
+            for hash_, grupo in resultado.items():
+                yield hash_, grupo[0].tamanho, grupo
+            if callback:
+                callback(grupos_processados, total_grupos)
+    finally:
+        if executor_proprio:
+            executor.fechar()
+
+    if log_callback:
+        log_callback(f"Etapa 2 (hash parcial, {algoritmo}): {estatisticas['eliminados_parcial']} arquivos descartados")
+        log_callback(f"Etapa 3 (hash completo, {algoritmo}): {estatisticas['hash_completo']} arquivos lidos por inteiro, "
+                     f"{estatisticas['completo_cache']} encontrados no cache")
+        if verificacao != 'nenhuma':
+            log_callback(f"Etapa 4 ({VERIFICACOES[verificacao]}): {estatisticas['verificados']} arquivos conferidos, "
+                         f"{estatisticas['descartados_verificacao']} descartados")
+        log_callback(resumo_estatisticas(estatisticas, algoritmo))
+
+
+def encontrar_duplicados_por_conteudo(arquivos_por_tamanho, **opcoes):
+    """
+    Versão de gerar_grupos_duplicados que espera o fim da análise.
+    Aceita as mesmas opções e retorna um dicionário
+    "algoritmo:hash" -> lista de caminhos duplicados.
+    """
+    return {
+        hash_: [entrada.caminho for entrada in entradas]
+        for hash_, _, entradas in gerar_grupos_duplicados(arquivos_por_tamanho, **opcoes)
+    }
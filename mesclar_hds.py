@@ -1,119 +1,201 @@
 import os
-import shutil
-import filecmp
-from collections import defaultdict
+from collections.abc import Mapping
+from varredura import varrer
+from snapshot_varredura import abrir_snapshot
+from cache_hash import abrir_cache
+from hash_arquivos import gerar_grupos_duplicados, ALGORITMO_PADRAO
+from movimentacao import PlanoMovimentacao, NOME_ARQUIVO_PLANO, NOME_ARQUIVO_DIARIO
+# obter_pasta_tipo_arquivo continua disponível aqui para quem já o importava deste módulo
+from acoes_duplicados import obter_pasta_tipo_arquivo, mover_para_duplicados  # noqa: F401
+from perfilamento import etapa
 
-def obter_pasta_tipo_arquivo(extensao):
+class _TamanhosComuns(Mapping):
     """
-    Retorna o nome da pasta para um determinado tipo de arquivo baseado na extensão.
+    Tamanhos que existem na origem e no destino, com os arquivos dos dois
+    lados. Os tamanhos comuns são encontrados intercalando as quantidades
+    dos dois agrupamentos (ambas em ordem crescente de tamanho), sem guardar
+    nada; as entradas só são montadas quando o grupo é lido.
     """
-    extensao = extensao.lower().lstrip('.')
-    
-    # Mapeamento de extensões para tipos de arquivo
-    tipos = {
-        # Documentos
-        'pdf': 'PDFs',
-        'doc': 'Documentos',
-        'docx': 'Documentos',
-        'txt': 'Documentos',
-        'rtf': 'Documentos',
-        'odt': 'Documentos',
-        'xls': 'Planilhas',
-        'xlsx': 'Planilhas',
-        'csv': 'Planilhas',
-        'ods': 'Planilhas',
-        'ppt': 'Apresentacoes',
-        'pptx': 'Apresentacoes',
-        'odp': 'Apresentacoes',
-        
-        # Imagens
-        'jpg': 'Imagens',
-        'jpeg': 'Imagens',
-        'png': 'Imagens',
-        'gif': 'Imagens',
-        'bmp': 'Imagens',
-        'tif': 'Imagens',
-        'tiff': 'Imagens',
-        'svg': 'Imagens',
-        'webp': 'Imagens',
-        
-        # Áudio
-        'mp3': 'Audio',
-        'wav': 'Audio',
-        'ogg': 'Audio',
-        'flac': 'Audio',
-        'aac': 'Audio',
-        'wma': 'Audio',
-        
-        # Vídeo
-        'mp4': 'Videos',
-        'avi': 'Videos',
-        'mkv': 'Videos',
-        'mov': 'Videos',
-        'wmv': 'Videos',
-        'flv': 'Videos',
-        'webm': 'Videos',
-        
-        # Compactados
-        'zip': 'Compactados',
-        'rar': 'Compactados',
-        '7z': 'Compactados',
-        'tar': 'Compactados',
-        'gz': 'Compactados',
-        
-        # Executáveis
-        'exe': 'Executaveis',
-        'msi': 'Executaveis',
-        'bat': 'Executaveis',
-        'sh': 'Executaveis',
-        
-        # Código
-        'py': 'Codigo',
-        'java': 'Codigo',
-        'js': 'Codigo',
-        'html': 'Codigo',
-        'css': 'Codigo',
-        'c': 'Codigo',
-        'cpp': 'Codigo',
-        'h': 'Codigo',
-        'php': 'Codigo',
-    }
-    
-    # Retorna o tipo correspondente ou "Outros" se não encontrado
-    return tipos.get(extensao, 'Outros')
 
-def mover_para_duplicados(arquivo_origem, pasta_duplicados):
+    def __init__(self, tamanhos_origem, tamanhos_destino):
+        self._origem = tamanhos_origem
+        self._destino = tamanhos_destino
+
+    def quantidades(self):
+        """Pares (tamanho, quantidade de arquivos) em ordem crescente de tamanho"""
+        destino = iter(self._destino.quantidades())
+        atual = next(destino, None)
+        for tamanho, quantidade in self._origem.quantidades():
+            while atual is not None and atual[0] < tamanho:
+                atual = next(destino, None)
+            if atual is None:
+                return
+            if atual[0] == tamanho:
+                yield tamanho, quantidade + atual[1]
+
+    def __getitem__(self, tamanho):
+        if tamanho not in self._origem or tamanho not in self._destino:
+            raise KeyError(tamanho)
+        return self._origem[tamanho] + self._destino[tamanho]
+
+    def __iter__(self):
+        return (tamanho for tamanho, _ in self.quantidades())
+
+    def __len__(self):
+        return sum(1 for _ in self.quantidades())
+
+
+def classificar_arquivos(inventario_origem, inventario_destino, cache=None, progress_callback=None, metricas=None,
+                         memoria_maxima=None):
+    """
+    Descobre quais arquivos da origem já têm o mesmo conteúdo em algum
+    lugar do destino, com o filtro em etapas do organizador (tamanho ->
+    hash parcial -> hash completo), lido em paralelo e com o cache de hashes.
+
+    Só entram na comparação os arquivos da origem cujo tamanho existe no
+    destino, e só os arquivos do destino com esses tamanhos; a maioria é
+    descartada pelo tamanho ou pelo hash parcial sem ler o arquivo inteiro.
+    Com memoria_maxima (bytes), o agrupamento e a análise respeitam o
+    limite (ver Inventario.arquivos_por_tamanho e gerar_grupos_duplicados).
+
+    Retorna um dicionário caminho na origem -> caminho de um arquivo
+    idêntico no destino (o do mesmo caminho relativo, quando for idêntico).
     """
-    Move um arquivo para a pasta de duplicados, organizando por tipo de arquivo.
+    tamanhos_destino = inventario_destino.arquivos_por_tamanho(memoria_maxima=memoria_maxima)
+    tamanhos_origem = inventario_origem.arquivos_por_tamanho(memoria_maxima=memoria_maxima)
+    # As entradas só são montadas para os tamanhos que existem nos dois lados
+    candidatos = _TamanhosComuns(tamanhos_origem, tamanhos_destino)
+    try:
+        return _comparar(inventario_origem, inventario_destino, candidatos, cache, progress_callback, metricas,
+                         memoria_maxima)
+    finally:
+        tamanhos_origem.fechar()
+        tamanhos_destino.fechar()
+
+def _comparar(inventario_origem, inventario_destino, candidatos, cache, progress_callback, metricas,
+              memoria_maxima):
+    """Compara os grupos de tamanho comuns e monta o dicionário de classificar_arquivos"""
+    prefixo_origem = os.path.join(inventario_origem.raiz, '')
+    prefixo_destino = os.path.join(inventario_destino.raiz, '')
+    no_destino = {}
+    for _, _, entradas in gerar_grupos_duplicados(candidatos, cache=cache, callback=progress_callback,
+                                                  metricas=metricas, memoria_maxima=memoria_maxima):
+        destino = [entrada.caminho for entrada in entradas if entrada.caminho.startswith(prefixo_destino)
+                   and not entrada.caminho.startswith(prefixo_origem)]
+        if not destino:
+            continue
+        caminhos = set(destino)
+        for entrada in entradas:
+            if entrada.caminho in caminhos:
+                continue
+            mesmo_caminho = os.path.join(inventario_destino.raiz,
+                                         os.path.relpath(entrada.caminho, inventario_origem.raiz))
+            no_destino[entrada.caminho] = mesmo_caminho if mesmo_caminho in caminhos else destino[0]
+    return no_destino
+
+def planejar_mesclagem(hd_destino, hd_origem, pasta_duplicados, stats, criar_pastas=True, progress_callback=None,
+                       metricas=None, perfil=None, memoria_maxima=None):
     """
-    os.makedirs(pasta_duplicados, exist_ok=True)
+    Planeja a mesclagem inteira sem mover nada. Origem e destino são
+    varridos uma única vez (o destino pelo snapshot incremental) e cada
+    arquivo da origem é classificado em lote:
+    - novo: nenhum arquivo com o mesmo nome no destino; é movido para lá
+    - idêntico: o mesmo conteúdo já existe no destino, no mesmo caminho ou
+      em qualquer outro; vai para a pasta de duplicados
+    - conflito: mesmo nome com conteúdo diferente; é movido com outro nome
     
-    # Obter nome e extensão do arquivo
-    nome_arquivo = os.path.basename(arquivo_origem)
-    _, extensao = os.path.splitext(nome_arquivo)
+    Com criar_pastas, a estrutura de pastas da origem já é recriada no
+    destino (inclusive as pastas vazias). Retorna o PlanoMovimentacao e
+    atualiza as contagens em stats. metricas (MetricasProgresso opcional)
+    acompanha a varredura e a comparação dos arquivos; perfil
+    (perfilamento.Perfil opcional) mede cada etapa; memoria_maxima (bytes)
+    limita a memória da comparação dos arquivos.
+    """
+    hd_destino, hd_origem = os.path.abspath(hd_destino), os.path.abspath(hd_origem)
+    with etapa(perfil, 'varredura_origem'):
+        inventario = varrer(hd_origem, metricas=metricas)
+    with etapa(perfil, 'varredura_destino'):
+        snapshot = abrir_snapshot(hd_destino)
+        try:
+            inventario_destino = varrer(hd_destino, snapshot=snapshot, metricas=metricas)
+        finally:
+            if snapshot is not None:
+                snapshot.fechar()
     
-    # Determinar a pasta de destino baseada no tipo de arquivo
-    tipo_pasta = obter_pasta_tipo_arquivo(extensao)
-    pasta_tipo = os.path.join(pasta_duplicados, tipo_pasta)
+    with etapa(perfil, 'classificacao'):
+        cache = abrir_cache(hd_destino)
+        try:
+            no_destino = classificar_arquivos(inventario, inventario_destino, cache, progress_callback, metricas,
+                                              memoria_maxima)
+        finally:
+            if cache is not None:
+                cache.fechar()
     
-    # Criar a pasta do tipo se não existir
-    os.makedirs(pasta_tipo, exist_ok=True)
+    with etapa(perfil, 'planejamento'):
+        return _planejar(inventario, inventario_destino, no_destino, hd_destino, hd_origem, pasta_duplicados,
+                         stats, criar_pastas, progress_callback)
+
+def _planejar(inventario, inventario_destino, no_destino, hd_destino, hd_origem, pasta_duplicados, stats,
+              criar_pastas, progress_callback):
+    """Monta o plano da mesclagem a partir dos inventários e da classificação"""
+    total_files = inventario.total_arquivos
+    processed_files = 0
     
-    # Definir o caminho de destino
-    destino = os.path.join(pasta_tipo, nome_arquivo)
+    # Os nomes existentes no destino vêm do inventário, sem listar cada pasta
+    plano = PlanoMovimentacao()
+    plano.usar_inventario(inventario_destino)
     
-    # Se já existe um arquivo com mesmo nome na pasta de destino
-    contador = 1
-    while os.path.exists(destino):
-        nome_base, ext = os.path.splitext(nome_arquivo)
-        destino = os.path.join(pasta_tipo, f"{nome_base}_{contador}{ext}")
-        contador += 1
+    # Percorrer toda a estrutura do HD de origem a partir do inventário
+    for pasta_atual, arquivos in inventario.percorrer():
+        # Calcular o caminho relativo para recriar a mesma estrutura no destino
+        caminho_relativo = os.path.relpath(pasta_atual, hd_origem)
+        pasta_destino = os.path.join(hd_destino, caminho_relativo)
+        
+        # Criar a estrutura de pastas no destino (na simulação, o plano
+        # cria as pastas necessárias quando for aplicado)
+        if caminho_relativo != '.':
+            if criar_pastas:
+                os.makedirs(pasta_destino, exist_ok=True)
+            stats["pastas_criadas"] += 1
+        
+        # Planejar cada arquivo na pasta atual
+        for entrada in arquivos:
+            arquivo_origem = entrada.caminho
+            identico = no_destino.get(arquivo_origem)
+            
+            if identico is not None:
+                # O destino já tem esse conteúdo: a origem vai para a pasta de duplicados
+                if identico == os.path.join(pasta_destino, entrada.nome):
+                    mensagem = "Arquivo duplicado movido"
+                else:
+                    mensagem = f"Arquivo já existente no destino ({identico}) movido"
+                    stats["duplicados_outro_caminho"] += 1
+                mover_para_duplicados(arquivo_origem, pasta_duplicados, plano, mensagem=mensagem,
+                                      tamanho=entrada.tamanho, dispositivo=entrada.dispositivo)
+                stats["arquivos_duplicados"] += 1
+            elif plano.existe(pasta_destino, entrada.nome):
+                # Mesmo nome e conteúdo diferente: move o arquivo de origem com um novo nome
+                mover_para_duplicados(
+                    arquivo_origem, pasta_destino, plano,
+                    mensagem="Arquivo com mesmo nome (conteúdo diferente) renomeado",
+                    tamanho=entrada.tamanho, dispositivo=entrada.dispositivo, recupera=False
+                )
+                stats["arquivos_movidos"] += 1
+                stats["conflitos"] += 1
+            else:
+                # Se não existe arquivo com mesmo nome, move normalmente
+                plano.mover(arquivo_origem, pasta_destino, entrada.nome,
+                            tamanho=entrada.tamanho, dispositivo=entrada.dispositivo)
+                stats["arquivos_movidos"] += 1
+        
+        processed_files += len(arquivos)
+        if progress_callback:
+            progress_callback(processed_files, total_files)
     
-    # Mover o arquivo
-    shutil.move(arquivo_origem, destino)
-    return destino
+    return plano
 
-def mesclar_hds(hd_destino, hd_origem, manter_primeiro=True, progress_callback=None):
+def mesclar_hds(hd_destino, hd_origem, manter_primeiro=True, progress_callback=None, arquivo_plano=None,
+                metricas=None, estatisticas=None, perfil=None, memoria_maxima=None):
     """
     Mescla o conteúdo de dois HDs, movendo todos os arquivos do HD de origem para o HD de destino.
     Arquivos duplicados são movidos para uma pasta especial, organizados por tipo.
@@ -123,97 +205,149 @@ def mesclar_hds(hd_destino, hd_origem, manter_primeiro=True, progress_callback=N
         hd_origem: Caminho do HD de origem
         manter_primeiro: Se True, mantém o primeiro arquivo e move duplicatas para pasta de duplicados
         progress_callback: Função de callback para atualizar o progresso (valor, máximo)
+        arquivo_plano: Se informado, apenas simula: grava o plano completo nesse
+            arquivo (ver movimentacao.PlanoMovimentacao) sem alterar nenhum HD
+        metricas: MetricasProgresso opcional com a vazão e o ETA de cada fase
+            (varredura, hash parcial, hash completo e movimentação)
+        estatisticas: dicionário opcional que recebe as contagens da
+            mesclagem (arquivos movidos, duplicados, conflitos, pastas
+            criadas e, fora da simulação, erros)
+        perfil: perfilamento.Perfil opcional; mede cada etapa e acrescenta a
+            tabela com os tempos ao log da mesclagem
+        memoria_maxima: limite de memória (bytes) da comparação dos
+            arquivos; acima dele os agrupamentos vão para tabelas SQLite
+            temporárias (ver agrupamento_externo)
+    
+    Fora da simulação, o plano é gravado no diário (NOME_ARQUIVO_DIARIO, na
+    raiz do HD de destino) antes de ser executado, e as operações concluídas
+    são registradas nele em lotes. Se a mesclagem for interrompida, chamar
+    de novo com os mesmos HDs retoma a execução de onde ela parou, sem
+    varrer nem comparar os arquivos outra vez.
     """
     # Validar caminhos
     if not os.path.exists(hd_destino) or not os.path.exists(hd_origem):
         print("Um dos caminhos especificados não existe!")
         return False
+    # O plano e o diário guardam caminhos absolutos, aplicáveis de qualquer pasta
+    hd_destino, hd_origem = os.path.abspath(hd_destino), os.path.abspath(hd_origem)
     
-    # Criar pasta para arquivos duplicados
+    # Pasta para arquivos duplicados (criada pelo plano quando necessário)
     pasta_duplicados = os.path.join(hd_destino, "Arquivos Duplicados")
-    os.makedirs(pasta_duplicados, exist_ok=True)
     
     # Criar arquivo de log
     log_file = os.path.join(hd_destino, "mesclagem_log.txt")
     
     # Contador para estatísticas
-    stats = {
+    stats = estatisticas if estatisticas is not None else {}
+    stats.update({
         "arquivos_movidos": 0,
         "arquivos_duplicados": 0,
+        "duplicados_outro_caminho": 0,
+        "conflitos": 0,
         "pastas_criadas": 0
-    }
+    })
     
     print("\n=== Iniciando processo de mesclagem de HDs ===")
     print(f"HD Destino: {hd_destino}")
     print(f"HD Origem: {hd_origem}")
     print(f"Modo: {'Manter primeiro arquivo' if manter_primeiro else 'Modo padrão'}")
+    if arquivo_plano:
+        print(f"Simulação: o plano será salvo em {arquivo_plano}")
     
-    # Contar total de arquivos para barra de progresso
-    total_files = sum([len(files) for _, _, files in os.walk(hd_origem)])
-    processed_files = 0
+    # Uma mesclagem interrompida com os mesmos parâmetros é retomada pelo diário
+    diario = os.path.join(hd_destino, NOME_ARQUIVO_DIARIO)
+    trabalho = {
+        "tipo": "mesclagem",
+        "origem": os.path.abspath(hd_origem),
+        "destino": os.path.abspath(hd_destino),
+        "manter_primeiro": manter_primeiro,
+    }
+    plano = None
+    retomada = False
+    if not arquivo_plano and os.path.exists(diario):
+        try:
+            anterior = PlanoMovimentacao.carregar(diario)
+        except (OSError, ValueError):
+            anterior = None
+        if anterior is not None and anterior.trabalho == trabalho:
+            plano = anterior
+            retomada = True
+            print(f"Retomando mesclagem interrompida: {len(plano.concluidas_anteriores)} de "
+                  f"{len(plano)} operações já concluídas")
+        else:
+            print(f"Diário de outra mesclagem encontrado em {diario}; ele será substituído.")
     
     with open(log_file, 'a', encoding='utf-8') as log:
-        log.write(f"\n=== Nova operação de mesclagem ===\n")
-        log.write(f"HD Origem: {hd_origem}\n")
-        log.write(f"HD Destino: {hd_destino}\n")
-        log.write(f"Modo: {'Manter primeiro arquivo' if manter_primeiro else 'Modo padrão'}\n\n")
+        if retomada:
+            log.write("\n=== Retomando mesclagem interrompida ===\n")
+            log.write(f"{len(plano.concluidas_anteriores)} de {len(plano)} operações já concluídas\n\n")
+        else:
+            log.write("\n=== Nova operação de mesclagem ===\n")
+            log.write(f"HD Origem: {hd_origem}\n")
+            log.write(f"HD Destino: {hd_destino}\n")
+            log.write(f"Modo: {'Manter primeiro arquivo' if manter_primeiro else 'Modo padrão'}\n\n")
+            plano = planejar_mesclagem(hd_destino, hd_origem, pasta_duplicados, stats,
+                                       criar_pastas=not arquivo_plano, progress_callback=progress_callback,
+                                       metricas=metricas, perfil=perfil, memoria_maxima=memoria_maxima)
         
-        # Percorrer toda a estrutura do HD de origem
-        for pasta_atual, subpastas, arquivos in os.walk(hd_origem):
-            # Calcular o caminho relativo para recriar a mesma estrutura no destino
-            caminho_relativo = os.path.relpath(pasta_atual, hd_origem)
-            pasta_destino = os.path.join(hd_destino, caminho_relativo)
-            
-            # Criar a estrutura de pastas no destino
-            if caminho_relativo != '.':
-                os.makedirs(pasta_destino, exist_ok=True)
-                stats["pastas_criadas"] += 1
-            
-            # Processar cada arquivo na pasta atual
-            for arquivo in arquivos:
-                arquivo_origem = os.path.join(pasta_atual, arquivo)
-                arquivo_destino = os.path.join(pasta_destino, arquivo)
-                
-                # Verificar se já existe um arquivo com mesmo nome no destino
-                if os.path.exists(arquivo_destino):
-                    # Comparar conteúdo dos arquivos
-                    if filecmp.cmp(arquivo_origem, arquivo_destino, shallow=False):
-                        # Se são idênticos e estamos no modo "manter primeiro"
-                        # Move o arquivo de origem para pasta de duplicados
-                        novo_caminho = mover_para_duplicados(arquivo_origem, pasta_duplicados)
-                        log.write(f"Arquivo duplicado movido: {arquivo_origem} -> {novo_caminho}\n")
-                        stats["arquivos_duplicados"] += 1
-                    else:
-                        # Se têm conteúdo diferente, move o arquivo de origem com um novo nome
-                        novo_caminho = mover_para_duplicados(arquivo_origem, pasta_destino)
-                        log.write(f"Arquivo com mesmo nome (conteúdo diferente) renomeado: {arquivo_origem} -> {novo_caminho}\n")
-                        stats["arquivos_movidos"] += 1
-                else:
-                    # Se não existe arquivo com mesmo nome, move normalmente
-                    shutil.move(arquivo_origem, arquivo_destino)
-                    log.write(f"Arquivo movido: {arquivo_origem} -> {arquivo_destino}\n")
-                    stats["arquivos_movidos"] += 1
-                
-                processed_files += 1
-                if progress_callback:
-                    progress_callback(processed_files, total_files)
-    
-    # Remover pastas vazias do HD de origem
-    for pasta_atual, subpastas, arquivos in os.walk(hd_origem, topdown=False):
-        try:
-            os.rmdir(pasta_atual)
-        except OSError:
-            pass  # Ignora se a pasta não estiver vazia
+        if arquivo_plano:
+            plano.salvar(arquivo_plano)
+            log.write(f"Simulação: {plano.resumo()}\nPlano salvo em {arquivo_plano}\n")
+            print(f"\n{plano.resumo()}")
+            print(f"Plano salvo em: {arquivo_plano}")
+            _registrar_perfil(perfil, log_file)
+            return True
+        
+        # O plano vai para o diário antes da primeira operação
+        if not retomada:
+            plano.salvar(diario, trabalho)
+        log.write(f"{plano.resumo()}\n")
+        print(plano.resumo())
+        # Entre HDs diferentes, o hash de cada arquivo é calculado durante a
+        # cópia e vai para o cache do destino, que não precisa lê-lo de novo
+        with etapa(perfil, 'movimentacao'):
+            cache = abrir_cache(hd_destino)
+            try:
+                plano.executar(lambda msg: log.write(f"{msg}\n"), progress_callback, diario=diario,
+                               cache=cache, algoritmo=ALGORITMO_PADRAO, metricas=metricas)
+            finally:
+                if cache is not None:
+                    cache.fechar()
+        log.write(f"Mesclagem concluída com {plano.erros} erros\n")
+        stats["erros"] = plano.erros
+    
+    # Todas as operações foram tentadas; não há mais o que retomar
+    try:
+        os.remove(diario)
+    except OSError:
+        pass
+    
+    # Remover pastas vazias do HD de origem (das mais profundas para a raiz)
+    with etapa(perfil, 'limpeza_origem'):
+        for pasta_atual in reversed(varrer(hd_origem).pastas_listadas):
+            try:
+                os.rmdir(pasta_atual)
+            except OSError:
+                pass  # Ignora se a pasta não estiver vazia
     
     # Exibir estatísticas
     print("\n=== Estatísticas da Mesclagem ===")
     print(f"Arquivos movidos com sucesso: {stats['arquivos_movidos']}")
-    print(f"Arquivos duplicados encontrados: {stats['arquivos_duplicados']}")
+    print(f"Arquivos duplicados encontrados: {stats['arquivos_duplicados']} "
+          f"({stats['duplicados_outro_caminho']} já existentes em outro caminho do destino)")
+    print(f"Arquivos com mesmo nome e conteúdo diferente (renomeados): {stats['conflitos']}")
     print(f"Pastas criadas: {stats['pastas_criadas']}")
     print(f"\nLog completo salvo em: {log_file}")
+    _registrar_perfil(perfil, log_file)
     
     return True
 
+def _registrar_perfil(perfil, log_file):
+    """Mostra a tabela do perfil e a acrescenta ao log da mesclagem"""
+    if perfil is not None and perfil.medidas:
+        print(f"\n=== Perfil da execução ===\n{perfil.tabela()}")
+        perfil.registrar(log_file)
+
 def main():
     print("=== Mesclagem de HDs ===")
     print("Este programa irá mesclar o conteúdo de dois HDs, movendo todos os arquivos")
@@ -233,6 +367,13 @@ def main():
     opcao = input("Escolha uma opção (1 ou 2): ").strip()
     manter_primeiro = opcao == "1"
     
+    simular = input("\nDeseja apenas simular (gerar um plano sem mover nada)? (s/n): ").strip().lower() == 's'
+    if simular:
+        arquivo_plano = os.path.join(hd_destino, NOME_ARQUIVO_PLANO)
+        mesclar_hds(hd_destino, hd_origem, manter_primeiro, arquivo_plano=arquivo_plano)
+        print("Para aplicá-lo, execute: python movimentacao.py")
+        return
+    
     confirmacao = input(f"\nATENÇÃO: Todos os arquivos de '{hd_origem}' serão movidos para '{hd_destino}'.\nDeseja continuar? (s/n): ").lower()
     
     if confirmacao == 's':
@@ -0,0 +1,279 @@
+import math
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from formatacao import formatar_bytes
+
+# Constante de tempo (segundos) da média móvel exponencial das taxas: quanto
+# maior, mais estável o ETA e mais devagar ele reage a mudanças de ritmo
+SUAVIZACAO = 10.0
+
+# Amostras mais próximas que isso não atualizam as taxas
+INTERVALO_MINIMO = 0.5
+
+# Atualizações de progresso repassadas por segundo (taxa de quadros)
+QUADROS_POR_SEGUNDO = 10
+
+# Avanço mínimo, em fração do máximo, repassado mesmo antes do próximo quadro
+PASSO_PROGRESSO = 0.01
+
+# Nome exibido e unidade contada em cada fase
+FASES = {
+    'varredura': ("Varredura", "pastas"),
+    'parcial': ("Hash parcial", "arquivos"),
+    'completo': ("Hash completo", "arquivos"),
+    'verificacao': ("Confirmação SHA-256", "arquivos"),
+    'bytes': ("Comparação byte a byte", "arquivos"),
+    'movimentacao': ("Movimentação", "operações"),
+}
+
+
+class AmostraFase(namedtuple('AmostraFase', ['fase', 'itens', 'itens_total', 'bytes', 'bytes_total',
+                                             'itens_s', 'bytes_s', 'eta'])):
+    """
+    Situação de uma fase em um instante: itens e bytes concluídos e
+    agendados (total 0 quando desconhecido), taxas suavizadas por segundo e
+    segundos restantes estimados (None quando não há como estimar).
+    """
+    __slots__ = ()
+
+
+class _Fase:
+    __slots__ = ('itens', 'itens_total', 'bytes', 'bytes_total',
+                 'itens_s', 'bytes_s', 'amostra')
+
+    def __init__(self):
+        self.itens = 0
+        self.itens_total = 0
+        self.bytes = 0
+        self.bytes_total = 0
+        self.itens_s = None
+        self.bytes_s = None
+        # (momento, itens, bytes) da última atualização das taxas
+        self.amostra = (time.monotonic(), 0, 0)
+
+    def atualizar_taxas(self, agora):
+        momento, itens, bytes_ = self.amostra
+        decorrido = agora - momento
+        if decorrido < INTERVALO_MINIMO:
+            return
+        itens_s = (self.itens - itens) / decorrido
+        bytes_s = (self.bytes - bytes_) / decorrido
+        if self.itens_s is None:
+            self.itens_s, self.bytes_s = itens_s, bytes_s
+        else:
+            peso = 1 - math.exp(-decorrido / SUAVIZACAO)
+            self.itens_s += peso * (itens_s - self.itens_s)
+            self.bytes_s += peso * (bytes_s - self.bytes_s)
+        self.amostra = (agora, self.itens, self.bytes)
+
+    def eta(self):
+        # O volume em bytes é a melhor medida do trabalho restante quando é conhecido
+        if self.bytes_total and self.bytes_s:
+            return max(0.0, (self.bytes_total - self.bytes) / self.bytes_s)
+        if self.itens_total and self.itens_s:
+            return max(0.0, (self.itens_total - self.itens) / self.itens_s)
+        return None
+
+
+def formatar_duracao(segundos):
+    """Formata uma duração em segundos como H:MM:SS"""
+    segundos = int(segundos)
+    return f"{segundos // 3600}:{segundos // 60 % 60:02d}:{segundos % 60:02d}"
+
+
+class MetricasProgresso:
+    """
+    Métricas de um trabalho longo, atualizadas pelas threads de trabalho e
+    lidas periodicamente pela interface (ou pelo terminal).
+
+    Para cada fase (varredura, hash parcial, hash completo, confirmação,
+    movimentação) guarda os itens e bytes agendados e concluídos, e calcula
+    arquivos/s e bytes/s suavizados por média móvel exponencial e o tempo
+    restante do trabalho já agendado. Guarda também a fila de leituras do
+    executor e os arquivos sendo processados no momento: um arquivo enorme
+    aparece como o "atual" há muito tempo, enquanto a vazão cai.
+
+    Todos os métodos podem ser chamados de qualquer thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fases = {}
+        self.fase_atual = None
+        self.fila = 0
+        # caminho -> (início, tamanho) dos arquivos sendo lidos ou copiados
+        self._em_andamento = {}
+
+    def _fase(self, fase):
+        if fase not in self._fases:
+            self._fases[fase] = _Fase()
+        self.fase_atual = fase
+        return self._fases[fase]
+
+    def agendar(self, fase, itens=1, bytes_=0):
+        """Soma trabalho ao total previsto da fase"""
+        with self._lock:
+            dados = self._fase(fase)
+            dados.itens_total += itens
+            dados.bytes_total += bytes_
+
+    def concluir(self, fase, itens=1, bytes_=0):
+        """Registra trabalho concluído na fase (bytes efetivamente lidos ou copiados)"""
+        with self._lock:
+            dados = self._fase(fase)
+            dados.itens += itens
+            dados.bytes += bytes_
+
+    def encerrar(self, fase):
+        """Fase sem total conhecido chegou ao fim: o total passa a ser o concluído"""
+        with self._lock:
+            dados = self._fase(fase)
+            dados.itens_total = dados.itens
+            dados.bytes_total = dados.bytes
+
+    def definir_fila(self, fila):
+        """Quantidade de tarefas aguardando ou em execução no executor"""
+        self.fila = fila
+
+    def medir(self, caminho, tamanho, funcao, *args):
+        """
+        Executa funcao(*args) registrando o caminho como em processamento.
+        Usado nas tarefas enviadas ao executor, para que a thread de leitura
+        marque o início e o fim de cada arquivo.
+        """
+        with self._lock:
+            self._em_andamento[caminho] = (time.monotonic(), tamanho)
+        try:
+            return funcao(*args)
+        finally:
+            with self._lock:
+                self._em_andamento.pop(caminho, None)
+
+    def amostrar(self):
+        """
+        Atualiza as taxas suavizadas e retorna (lista de AmostraFase das
+        fases iniciadas, (caminho, tamanho, segundos) do arquivo em
+        processamento há mais tempo ou None).
+        """
+        agora = time.monotonic()
+        with self._lock:
+            amostras = []
+            for fase, dados in self._fases.items():
+                dados.atualizar_taxas(agora)
+                amostras.append(AmostraFase(fase, dados.itens, dados.itens_total, dados.bytes,
+                                            dados.bytes_total, dados.itens_s or 0.0,
+                                            dados.bytes_s or 0.0, dados.eta()))
+            atual = None
+            if self._em_andamento:
+                caminho, (inicio, tamanho) = min(self._em_andamento.items(), key=lambda item: item[1][0])
+                atual = (caminho, tamanho, agora - inicio)
+        return amostras, atual
+
+    def texto(self):
+        """
+        Texto com a situação das fases em andamento (e da última iniciada),
+        a fila de leituras e o arquivo atual; uma linha por informação.
+        """
+        amostras, atual = self.amostrar()
+        linhas = []
+        for amostra in amostras:
+            terminada = amostra.itens_total and amostra.itens >= amostra.itens_total
+            if terminada and amostra.fase != self.fase_atual:
+                continue
+            nome, unidade = FASES.get(amostra.fase, (amostra.fase, "itens"))
+            partes = [f"{amostra.itens}/{amostra.itens_total} {unidade}" if amostra.itens_total
+                      else f"{amostra.itens} {unidade}"]
+            if amostra.bytes_total:
+                partes.append(f"{formatar_bytes(amostra.bytes)} de {formatar_bytes(amostra.bytes_total)}")
+            taxas = f"{amostra.itens_s:.1f} {unidade}/s"
+            if amostra.bytes_total:
+                taxas = f"{formatar_bytes(amostra.bytes_s)}/s, {taxas}"
+            partes.append(taxas)
+            if amostra.eta is not None:
+                partes.append(f"ETA {formatar_duracao(amostra.eta)}")
+            linhas.append(f"{nome}: " + " | ".join(partes))
+        if self.fila:
+            linhas.append(f"Fila de leitura: {self.fila}")
+        if atual is not None:
+            caminho, tamanho, segundos = atual
+            linhas.append(f"Atual: {os.path.basename(caminho)} ({formatar_bytes(tamanho)}, há "
+                          f"{formatar_duracao(segundos)})")
+        return "\n".join(linhas)
+
+
+class ProgressoLimitado:
+    """
+    Repassa atualizações (valor, máximo) a um callback no máximo
+    quadros_por_segundo vezes por segundo, ou quando o valor avança pelo
+    menos passo do máximo. Chamadas no meio do caminho são agrupadas: só a
+    mais recente é guardada, e finalizar() entrega a que ficou pendente.
+
+    A primeira atualização, a que muda o máximo e a que chega ao máximo
+    sempre passam, para que a barra nunca pare antes do fim de uma etapa.
+    Sem isso, um sinal por arquivo ou por pasta enche a fila de eventos da
+    interface e deixa a janela e a própria varredura lentas.
+    """
+
+    def __init__(self, callback, quadros_por_segundo=QUADROS_POR_SEGUNDO, passo=PASSO_PROGRESSO):
+        self.callback = callback
+        self.intervalo = 1.0 / quadros_por_segundo
+        self.passo = passo
+        self._lock = threading.Lock()
+        self._repassado = None
+        self._momento = 0.0
+        self._pendente = None
+
+    def __call__(self, valor, maximo):
+        agora = time.monotonic()
+        with self._lock:
+            anterior = self._repassado
+            if not (anterior is None
+                    or maximo != anterior[1]
+                    or (maximo and valor >= maximo)
+                    or agora - self._momento >= self.intervalo
+                    or (maximo and valor - anterior[0] >= self.passo * maximo)):
+                self._pendente = (valor, maximo)
+                return
+            self._repassado = (valor, maximo)
+            self._momento = agora
+            self._pendente = None
+        self.callback(valor, maximo)
+
+    def finalizar(self):
+        """Entrega a última atualização que ficou retida"""
+        with self._lock:
+            pendente, self._pendente = self._pendente, None
+            if pendente is not None:
+                self._repassado = pendente
+                self._momento = time.monotonic()
+        if pendente is not None:
+            self.callback(*pendente)
+
+
+class ProgressoTerminal(ProgressoLimitado):
+    """ProgressoLimitado que mostra o andamento em uma única linha do terminal"""
+
+    def __init__(self, rotulo, saida=None, **opcoes):
+        super().__init__(self._mostrar, **opcoes)
+        self.rotulo = rotulo
+        self.saida = saida or sys.stdout
+        self._linha_aberta = False
+
+    def _mostrar(self, valor, maximo):
+        texto = f"{valor}/{maximo} ({valor / maximo:.0%})" if maximo else str(valor)
+        self.saida.write(f"\r{self.rotulo}: {texto}")
+        self._linha_aberta = not (maximo and valor >= maximo)
+        if not self._linha_aberta:
+            self.saida.write("\n")
+        self.saida.flush()
+
+    def finalizar(self):
+        super().finalizar()
+        if self._linha_aberta:
+            self.saida.write("\n")
+            self.saida.flush()
+            self._linha_aberta = False
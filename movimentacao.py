@@ -0,0 +1,560 @@
+import errno
+import json
+import os
+import shutil
+import time
+from collections import defaultdict, namedtuple
+
+from constantes import NOME_ARQUIVO_PLANO, NOME_ARQUIVO_DIARIO  # noqa: F401
+from formatacao import formatar_bytes
+from copia_arquivos import CopiadorArquivos, mover_arquivo, vincular_arquivo
+from varredura import EntradaInventario
+
+# Incrementar sempre que o formato do arquivo de plano mudar
+VERSAO_PLANO = 1
+
+# Ações possíveis em um plano
+ACOES = ('mover', 'copiar', 'remover_pasta', 'vincular')
+
+# O diário de execução é gravado a cada TAMANHO_LOTE_DIARIO operações
+# concluídas ou a cada INTERVALO_DIARIO segundos, o que vier primeiro
+TAMANHO_LOTE_DIARIO = 200
+INTERVALO_DIARIO = 2.0
+
+
+class Operacao(namedtuple('Operacao', ['acao', 'origem', 'destino', 'tamanho',
+                                       'entre_dispositivos', 'recuperado', 'mensagem', 'identidade'],
+                          defaults=(None,))):
+    """
+    Uma operação do plano. tamanho é o volume de dados envolvido,
+    entre_dispositivos indica se origem e destino estão em dispositivos
+    diferentes (a movimentação vira cópia) e recuperado é o espaço liberado
+    no HD quando a operação é aplicada. Em 'vincular', origem é o duplicado
+    trocado, no mesmo caminho, por um reflink ou hardlink do destino, e
+    identidade guarda [inode, mtime_ns] dos dois arquivos quando foram
+    comparados: se algum mudou até a execução, o vínculo não é feito.
+    """
+    __slots__ = ()
+
+
+def tamanho_pasta(pasta):
+    """Soma o tamanho de todos os arquivos dentro da pasta (sem seguir links)"""
+    total = 0
+    pilha = [pasta]
+    while pilha:
+        try:
+            with os.scandir(pilha.pop()) as entradas:
+                for entrada in entradas:
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            pilha.append(entrada.path)
+                        else:
+                            total += entrada.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+class _Diario:
+    """
+    Acrescenta ao arquivo do plano, em lotes, os índices das operações
+    concluídas ({"feitas": [...]}), para que uma execução interrompida
+    possa ser retomada com carregar() + executar().
+    """
+
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, 'a+', encoding='utf-8')
+        # Uma linha cortada por uma interrupção anterior não pode emendar na próxima
+        if self._arquivo.tell():
+            self._arquivo.seek(self._arquivo.tell() - 1)
+            if self._arquivo.read(1) != "\n":
+                self._arquivo.write("\n")
+        self._pendentes = []
+        self._ultima_gravacao = time.monotonic()
+
+    def marcar(self, indice):
+        self._pendentes.append(indice)
+        if (len(self._pendentes) >= TAMANHO_LOTE_DIARIO
+                or time.monotonic() - self._ultima_gravacao >= INTERVALO_DIARIO):
+            self.gravar()
+
+    def gravar(self):
+        if self._pendentes:
+            self._arquivo.write(json.dumps({"feitas": self._pendentes}) + "\n")
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            self._pendentes = []
+        self._ultima_gravacao = time.monotonic()
+
+    def fechar(self):
+        self.gravar()
+        self._arquivo.close()
+
+
+class PlanoMovimentacao:
+    """
+    Planeja e executa em lote movimentações, cópias e remoções de pastas.
+
+    Cada pasta de destino é listada uma única vez; a partir daí os nomes
+    ocupados ficam em memória, e os conflitos são resolvidos com o sufixo
+    _N (arquivo_1.jpg, arquivo_2.jpg, ...) sem consultar o disco de novo.
+    Os nomes são comparados sem diferenciar maiúsculas e minúsculas, já que
+    muitos HDs externos usam sistemas de arquivos que não diferenciam.
+
+    O plano pode ser executado várias vezes (por exemplo, a cada grupo de
+    duplicados); as listagens e reservas continuam valendo entre execuções.
+    Também pode ser salvo sem executar (simulação), revisado pelos totais e
+    aplicado depois com carregar() + executar(). Executado com diario, o
+    próprio arquivo do plano registra as operações concluídas, e uma
+    execução interrompida continua de onde parou.
+    """
+
+    def __init__(self):
+        self._nomes = {}        # pasta -> (nomes existentes no disco, nomes ocupados em minúsculas)
+        self._contadores = {}   # (pasta, nome em minúsculas) -> próximo sufixo a testar
+        self._dispositivos = {}  # pasta -> st_dev
+        self._pastas_prontas = set()
+        self._verificar_destinos = False
+        # pasta -> bytes que as operações agendadas já tiram dela (movidos ou
+        # vinculados), descontados do espaço liberado ao remover a pasta
+        self._liberados = defaultdict(int)
+        self.operacoes = []
+        self.erros = 0
+        # Índices das operações já concluídas em uma execução anterior
+        self.concluidas_anteriores = set()
+        # Parâmetros do trabalho que gerou o plano (ex.: origem e destino da mesclagem)
+        self.trabalho = None
+
+    def __len__(self):
+        return len(self.operacoes)
+
+    def _listar(self, pasta):
+        nomes = self._nomes.get(pasta)
+        if nomes is None:
+            try:
+                with os.scandir(pasta) as entradas:
+                    existentes = frozenset(entrada.name for entrada in entradas)
+                self._pastas_prontas.add(pasta)
+            except OSError:
+                existentes = frozenset()  # a pasta ainda não existe; é criada na execução
+            nomes = (existentes, {nome.casefold() for nome in existentes})
+            self._nomes[pasta] = nomes
+        return nomes
+
+    def _dispositivo(self, pasta):
+        """st_dev da pasta, ou da primeira pasta acima dela que já existe"""
+        if pasta not in self._dispositivos:
+            atual = pasta
+            while True:
+                try:
+                    self._dispositivos[pasta] = os.stat(atual).st_dev
+                    break
+                except OSError:
+                    acima = os.path.dirname(atual)
+                    if acima == atual:
+                        self._dispositivos[pasta] = None
+                        break
+                    atual = acima
+        return self._dispositivos[pasta]
+
+    def usar_inventario(self, inventario):
+        """
+        Aproveita o inventário de uma varredura do destino: os nomes de cada
+        pasta listada passam a vir dele, sem listar o disco de novo.
+        """
+        nomes = defaultdict(list)
+        for entrada in inventario.pastas:
+            nomes[entrada.pasta].append(entrada.nome)
+            self._dispositivos.setdefault(entrada.caminho, entrada.dispositivo)
+        for entrada in inventario.arquivos:
+            nomes[entrada.pasta].append(entrada.nome)
+        for pasta in inventario.pastas_listadas:
+            existentes = frozenset(nomes.get(pasta, ()))
+            self._nomes[pasta] = (existentes, {nome.casefold() for nome in existentes})
+            self._pastas_prontas.add(pasta)
+
+    def existe(self, pasta, nome):
+        """Informa se o nome existia na pasta quando ela foi listada"""
+        return nome in self._listar(os.path.abspath(pasta))[0]
+
+    def reservar(self, pasta, nome):
+        """Reserva um nome livre na pasta e retorna o caminho (absoluto) de destino"""
+        pasta = os.path.abspath(pasta)
+        ocupados = self._listar(pasta)[1]
+        chave = nome.casefold()
+        if chave in ocupados:
+            nome_base, ext = os.path.splitext(nome)
+            contador = self._contadores.get((pasta, chave), 1)
+            while f"{nome_base}_{contador}{ext}".casefold() in ocupados:
+                contador += 1
+            self._contadores[(pasta, chave)] = contador + 1
+            nome = f"{nome_base}_{contador}{ext}"
+        ocupados.add(nome.casefold())
+        return os.path.join(pasta, nome)
+
+    def _agendar(self, acao, origem, pasta, nome, tamanho, dispositivo, recupera, mensagem):
+        # O plano pode ser aplicado a partir de outra pasta de trabalho
+        origem, pasta = os.path.abspath(origem), os.path.abspath(pasta)
+        destino = self.reservar(pasta, nome or os.path.basename(origem))
+        if tamanho is None or dispositivo is None:
+            try:
+                st = os.lstat(origem)
+                tamanho = st.st_size if tamanho is None else tamanho
+                dispositivo = st.st_dev if dispositivo is None else dispositivo
+            except OSError:
+                tamanho = tamanho or 0
+        destino_dispositivo = self._dispositivo(pasta)
+        entre_dispositivos = bool(dispositivo and destino_dispositivo and dispositivo != destino_dispositivo)
+        if acao == 'mover':
+            self._liberados[os.path.dirname(origem)] += tamanho
+            # No mesmo dispositivo o arquivo só muda de pasta: nada é liberado
+            recupera = recupera and entre_dispositivos
+        self.operacoes.append(Operacao(acao, origem, destino, tamanho, entre_dispositivos,
+                                       tamanho if recupera else 0, mensagem))
+        return destino
+
+    def mover(self, origem, pasta, nome=None, mensagem="Arquivo movido",
+              tamanho=None, dispositivo=None, recupera=False):
+        """
+        Agenda a movimentação para a pasta e retorna o caminho de destino reservado.
+        tamanho e dispositivo podem vir do inventário para evitar um stat;
+        recupera=True conta o tamanho como espaço recuperável (cópia duplicada)
+        quando o arquivo sai do dispositivo; no mesmo dispositivo ele só muda
+        de pasta e nada é liberado.
+        """
+        return self._agendar('mover', origem, pasta, nome, tamanho, dispositivo, recupera, mensagem)
+
+    def copiar(self, origem, pasta, nome=None, mensagem="Arquivo copiado", tamanho=None, dispositivo=None):
+        """Agenda a cópia para a pasta e retorna o caminho de destino reservado"""
+        return self._agendar('copiar', origem, pasta, nome, tamanho, dispositivo, False, mensagem)
+
+    def vincular(self, duplicado, original, mensagem="Duplicado vinculado ao original",
+                 tamanho=None, dispositivo=None, dispositivo_original=None, identidade=None):
+        """
+        Agenda a troca do duplicado por um reflink (ou hardlink) do original,
+        sem mover nada: o caminho continua existindo e o espaço da cópia é
+        recuperado. Só é possível no mesmo dispositivo; retorna False (e não
+        agenda) quando os dois estão em dispositivos diferentes ou, se
+        consultados no disco, já são o mesmo arquivo.
+
+        identidade é ((inode, mtime_ns) do duplicado, (inode, mtime_ns) do
+        original) de quando o conteúdo foi comparado (do inventário); sem
+        ela, vem do disco agora. Na execução, o vínculo só é feito se os
+        dois arquivos continuarem os mesmos.
+        """
+        duplicado, original = os.path.abspath(duplicado), os.path.abspath(original)
+        st = st_original = None
+        try:
+            if tamanho is None or dispositivo is None or identidade is None:
+                st = os.lstat(duplicado)
+                tamanho = st.st_size if tamanho is None else tamanho
+                dispositivo = st.st_dev if dispositivo is None else dispositivo
+            if dispositivo_original is None or identidade is None:
+                st_original = os.stat(original)
+                dispositivo_original = st_original.st_dev if dispositivo_original is None else dispositivo_original
+        except OSError:
+            return False
+        if identidade is None:
+            identidade = ((st.st_ino, st.st_mtime_ns), (st_original.st_ino, st_original.st_mtime_ns))
+        if dispositivo != dispositivo_original:
+            return False
+        if st is not None and st_original is not None and os.path.samestat(st, st_original):
+            return False
+        self._liberados[os.path.dirname(duplicado)] += tamanho
+        self.operacoes.append(Operacao('vincular', duplicado, original, tamanho, False, tamanho, mensagem,
+                                       [list(identidade[0]), list(identidade[1])]))
+        return True
+
+    def remover_pasta(self, pasta, mensagem="Pasta removida", tamanho=None):
+        """
+        Agenda a remoção da pasta com todo o conteúdo. Sem tamanho, o
+        conteúdo é medido agora e o espaço recuperado desconta o que as
+        operações já agendadas tiram da pasta (e que já foi contado nelas);
+        com tamanho, quem chama informa o que a remoção libera.
+        """
+        pasta = os.path.abspath(pasta)
+        recuperado = tamanho
+        if tamanho is None:
+            tamanho = tamanho_pasta(pasta)
+            prefixo = os.path.join(pasta, '')
+            liberados = sum(bytes_ for origem, bytes_ in self._liberados.items()
+                            if origem == pasta or origem.startswith(prefixo))
+            recuperado = max(0, tamanho - liberados)
+        self.operacoes.append(Operacao('remover_pasta', pasta, None, tamanho, False, recuperado, mensagem))
+
+    def totais(self):
+        """Resumo do que o plano fará, sem tocar no disco"""
+        totais = {
+            "operacoes": len(self.operacoes),
+            "mover": 0,
+            "copiar": 0,
+            "remover_pasta": 0,
+            "vincular": 0,
+            "bytes_transferidos": 0,
+            "bytes_recuperados": 0,
+            "copias_entre_dispositivos": 0,
+            "bytes_entre_dispositivos": 0,
+        }
+        for operacao in self.operacoes:
+            totais[operacao.acao] += 1
+            totais["bytes_recuperados"] += operacao.recuperado
+            if operacao.acao in ('remover_pasta', 'vincular'):
+                continue
+            if operacao.acao == 'copiar' or operacao.entre_dispositivos:
+                totais["bytes_transferidos"] += operacao.tamanho
+            if operacao.entre_dispositivos:
+                totais["copias_entre_dispositivos"] += 1
+                totais["bytes_entre_dispositivos"] += operacao.tamanho
+        return totais
+
+    def resumo(self):
+        """Texto com os totais do plano para o log"""
+        totais = self.totais()
+        return (f"Plano: {totais['mover']} movimentações, {totais['copiar']} cópias, "
+                f"{totais['remover_pasta']} pastas removidas, "
+                f"{totais['vincular']} duplicados vinculados; "
+                f"{formatar_bytes(totais['bytes_transferidos'])} a copiar "
+                f"({totais['copias_entre_dispositivos']} entre dispositivos, "
+                f"{formatar_bytes(totais['bytes_entre_dispositivos'])}); "
+                f"{formatar_bytes(totais['bytes_recuperados'])} recuperáveis")
+
+    def salvar(self, caminho, trabalho=None):
+        """
+        Grava o plano em JSON Lines: a primeira linha tem a versão, os
+        totais e os parâmetros do trabalho (se informados), e cada linha
+        seguinte é uma operação. Durante a execução com diario, linhas
+        {"feitas": [...]} são acrescentadas ao final.
+        """
+        with open(caminho, 'w', encoding='utf-8') as f:
+            cabecalho = {"plano": VERSAO_PLANO, "criado_em": int(time.time()), "totais": self.totais()}
+            if trabalho is not None:
+                cabecalho["trabalho"] = trabalho
+            f.write(json.dumps(cabecalho, ensure_ascii=False) + "\n")
+            for operacao in self.operacoes:
+                f.write(json.dumps(operacao._asdict(), ensure_ascii=False) + "\n")
+
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Lê um plano salvo, junto com as operações já concluídas por uma
+        execução anterior. Como o disco pode ter mudado desde a simulação,
+        a execução de um plano carregado confere se cada destino ainda está
+        livre antes de mover ou copiar.
+        """
+        plano = cls()
+        plano._verificar_destinos = True
+        with open(caminho, encoding='utf-8') as f:
+            cabecalho = json.loads(f.readline() or "{}")
+            if cabecalho.get("plano") != VERSAO_PLANO:
+                raise ValueError(f"Arquivo de plano inválido ou de versão diferente: {caminho}")
+            plano.trabalho = cabecalho.get("trabalho")
+            linhas = [linha for linha in f if linha.strip()]
+        for numero, linha in enumerate(linhas, 1):
+            try:
+                dados = json.loads(linha)
+            except ValueError:
+                # A última linha pode ter sido cortada por uma interrupção
+                if numero == len(linhas):
+                    break
+                raise
+            if "feitas" in dados:
+                plano.concluidas_anteriores.update(dados["feitas"])
+                continue
+            if dados.get("acao") not in ACOES:
+                raise ValueError(f"Ação desconhecida no plano: {dados.get('acao')}")
+            plano.operacoes.append(Operacao(**dados))
+        return plano
+
+    @staticmethod
+    def _ja_aplicada(operacao):
+        """
+        Reconhece uma operação concluída por uma execução interrompida antes
+        de registrá-la no diário.
+        """
+        if operacao.acao == 'remover_pasta':
+            # Uma pasta ausente não prova que a remoção foi feita (o plano
+            # pode apontar para outro lugar); só o diário conta como prova
+            return False
+        if operacao.acao == 'vincular':
+            # Um reflink já feito não é reconhecido, mas refazê-lo não muda nada
+            try:
+                return os.path.samefile(operacao.origem, operacao.destino)
+            except OSError:
+                return False
+        if operacao.acao == 'mover':
+            return not os.path.lexists(operacao.origem) and os.path.lexists(operacao.destino)
+        try:
+            return os.lstat(operacao.destino).st_size == operacao.tamanho
+        except OSError:
+            return False
+
+    def executar(self, log_callback=None, progress_callback=None, diario=None, cache=None, algoritmo=None,
+                 metricas=None):
+        """
+        Executa as operações agendadas, na ordem, criando cada pasta de
+        destino uma única vez. Um erro em uma operação é registrado e não
+        interrompe as demais.
+
+        Cópias e movimentações entre dispositivos passam pelo
+        CopiadorArquivos: vários arquivos ao mesmo tempo, leitura e gravação
+        sobrepostas e, com algoritmo, o hash calculado durante a cópia e
+        gravado no cache (CacheHash do destino) para que o arquivo não
+        precise ser lido de novo. Qualquer outra operação (como a remoção de
+        uma pasta) espera as cópias agendadas antes dela terminarem.
+
+        diario é o arquivo em que o plano foi salvo (ou de onde foi
+        carregado); as operações concluídas são registradas nele em lotes,
+        e as que já constavam como concluídas são puladas.
+
+        metricas (MetricasProgresso opcional) recebe a fase 'movimentacao':
+        operações e bytes copiados entre dispositivos.
+
+        Retorna um dicionário origem -> destino das operações concluídas.
+        """
+        operacoes, self.operacoes = self.operacoes, []
+        anteriores, self.concluidas_anteriores = self.concluidas_anteriores, set()
+        registro = _Diario(diario) if diario else None
+        copiador = CopiadorArquivos(algoritmo if cache is not None else None, metricas=metricas)
+        if metricas is not None:
+            pendentes = [operacao for indice, operacao in enumerate(operacoes) if indice not in anteriores]
+            metricas.agendar('movimentacao', itens=len(pendentes),
+                             bytes_=sum(operacao.tamanho for operacao in pendentes if self._transferencia(operacao)))
+        try:
+            return self._executar(operacoes, anteriores, registro, copiador, cache,
+                                  log_callback, progress_callback, metricas)
+        finally:
+            copiador.fechar()
+            if registro is not None:
+                registro.fechar()
+
+    @staticmethod
+    def _transferencia(operacao):
+        return operacao.acao == 'copiar' or (operacao.acao == 'mover' and operacao.entre_dispositivos)
+
+    def _preparar_destino(self, destino):
+        pasta = os.path.dirname(destino)
+        if pasta not in self._pastas_prontas:
+            os.makedirs(pasta, exist_ok=True)
+            self._pastas_prontas.add(pasta)
+        if self._verificar_destinos and os.path.lexists(destino):
+            raise FileExistsError(errno.EEXIST, "O destino já existe", destino)
+
+    def _executar(self, operacoes, anteriores, registro, copiador, cache, log_callback, progress_callback,
+                  metricas):
+        concluidas = {}
+        total = len(operacoes)
+        feitas = 0
+
+        def concluir(indice, operacao, erro=None):
+            nonlocal feitas
+            feitas += 1
+            if metricas is not None:
+                metricas.concluir('movimentacao',
+                                  bytes_=operacao.tamanho if self._transferencia(operacao) else 0)
+            if erro is None:
+                concluidas[operacao.origem] = operacao.destino
+                if registro is not None:
+                    registro.marcar(indice)
+            else:
+                self.erros += 1
+                if log_callback:
+                    log_callback(f"Erro ao {operacao.acao.replace('_', ' ')} {operacao.origem}: {erro}")
+            if progress_callback:
+                progress_callback(feitas, total)
+
+        def transferir(lote):
+            for indice, operacao in lote:
+                try:
+                    if self._verificar_destinos and self._ja_aplicada(operacao):
+                        if log_callback:
+                            log_callback(f"Operação já aplicada anteriormente: {operacao.origem}")
+                        concluir(indice, operacao)
+                        continue
+                    self._preparar_destino(operacao.destino)
+                except OSError as e:
+                    concluir(indice, operacao, e)
+                    continue
+                copiador.enviar(operacao.origem, operacao.destino, mover=operacao.acao == 'mover',
+                                dispositivo=self._dispositivo(os.path.dirname(operacao.origem)),
+                                contexto=(indice, operacao), tamanho=operacao.tamanho)
+            for (indice, operacao), resultado, erro in copiador.resultados():
+                if erro is None:
+                    if cache is not None and resultado.hash is not None:
+                        cache.gravar(EntradaInventario(
+                            os.path.dirname(operacao.destino), os.path.basename(operacao.destino),
+                            resultado.tamanho, resultado.mtime_ns, resultado.inode, resultado.dispositivo, False
+                        ), resultado.hash, algoritmo=copiador.algoritmo)
+                    if log_callback:
+                        log_callback(f"{operacao.mensagem}: {operacao.origem} -> {operacao.destino}")
+                concluir(indice, operacao, erro)
+            if log_callback and copiador.arquivos:
+                log_callback(copiador.resumo())
+
+        lote = []
+        for indice, operacao in enumerate(operacoes):
+            if indice in anteriores:
+                feitas += 1
+                if progress_callback:
+                    progress_callback(feitas, total)
+                continue
+            if self._transferencia(operacao):
+                lote.append((indice, operacao))
+                continue
+            # As demais operações esperam as cópias agendadas antes delas
+            # (ex.: a pasta removida depois de ter o conteúdo movido)
+            if lote:
+                transferir(lote)
+                lote = []
+            origem, destino = operacao.origem, operacao.destino
+            try:
+                if self._verificar_destinos and self._ja_aplicada(operacao):
+                    if log_callback:
+                        log_callback(f"Operação já aplicada anteriormente: {origem}")
+                elif operacao.acao == 'remover_pasta':
+                    shutil.rmtree(origem)
+                    if log_callback:
+                        log_callback(f"{operacao.mensagem}: {origem}")
+                elif operacao.acao == 'vincular':
+                    metodo = vincular_arquivo(destino, origem, operacao.identidade)
+                    if log_callback:
+                        log_callback(f"{operacao.mensagem} ({metodo or 'já vinculado'}): {origem} -> {destino}")
+                else:
+                    self._preparar_destino(destino)
+                    mover_arquivo(origem, destino)
+                    if log_callback:
+                        log_callback(f"{operacao.mensagem}: {origem} -> {destino}")
+            except OSError as e:
+                concluir(indice, operacao, e)
+                continue
+            concluir(indice, operacao)
+        if lote:
+            transferir(lote)
+        return concluidas
+
+
+def main():
+    print("=== Aplicar Plano de Reorganização ===")
+    caminho = input("Digite o caminho do arquivo de plano (.jsonl): ").strip()
+    if not os.path.exists(caminho):
+        print("Arquivo não encontrado!")
+        return
+
+    plano = PlanoMovimentacao.carregar(caminho)
+    print(plano.resumo())
+    if plano.concluidas_anteriores:
+        print(f"{len(plano.concluidas_anteriores)} operações já aplicadas anteriormente serão puladas.")
+    if input("\nDeseja aplicar o plano agora? (s/n): ").strip().lower() != 's':
+        print("\nOperação cancelada pelo usuário.")
+        return
+
+    log_file = os.path.join(os.path.dirname(os.path.abspath(caminho)), "reorganizacao_log.txt")
+    with open(log_file, 'a', encoding='utf-8') as log:
+        log.write(f"\n=== Aplicando plano: {caminho} ===\n")
+        plano.executar(lambda msg: (print(msg), log.write(f"{msg}\n")), diario=caminho)
+    print(f"\nPlano aplicado com {plano.erros} erros. Log salvo em {log_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from varredura import varrer
+from snapshot_varredura import abrir_snapshot
+from cache_hash import abrir_cache
+from hash_arquivos import gerar_grupos_duplicados, algoritmos_disponiveis, ALGORITMO_PADRAO, VERIFICACOES
+from movimentacao import PlanoMovimentacao, NOME_ARQUIVO_PLANO
+from pastas_identicas import encontrar_pastas_identicas
+from pastas_semelhantes import encontrar_pastas_semelhantes
+from acoes_duplicados import (processar_arquivos_duplicados, processar_pastas_identicas, espaco_recuperado,
+                              relatorio_grupo, retirar_agendados, MANTER_TODOS, MANTER_PRIMEIRO, COPIAR_TODOS, DEDUPLICAR)
+from mesclar_hds import mesclar_hds
+from metricas import ProgressoTerminal
+from perfilamento import Perfil, etapa
+from agrupamento_externo import HashesPorCaminho
+
+# Ações sem interação para os arquivos duplicados (modo_acao de processar_arquivos_duplicados)
+ACOES_DUPLICADOS = {
+    'keep-all': MANTER_TODOS,
+    'keep-first': MANTER_PRIMEIRO,   # move os demais para "Arquivos Duplicados"
+    'copy': COPIAR_TODOS,            # copia todos para "Arquivos Duplicados" (mantém os originais)
+    'link': DEDUPLICAR,              # troca as cópias por reflinks ou hardlinks do primeiro, no lugar
+}
+
+# Ações sem interação para as pastas idênticas (modo_acao de processar_pastas_identicas)
+ACOES_PASTAS = {
+    'keep-both': 0,     # manter ambas
+    'keep-first': 1,    # manter a primeira e remover a outra
+    'keep-second': 2,   # manter a segunda e remover a primeira
+    'merge': 3,         # mover o que for único para a primeira e remover a outra
+}
+
+# Opção --verification -> modo de confirmação de hash_arquivos
+VERIFICACOES_CLI = {
+    'none': 'nenhuma',
+    'sha256': 'sha256',
+    'bytes': 'bytes',
+}
+
+# Sufixos aceitos em --memory-limit
+UNIDADES_MEMORIA = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# Códigos de saída
+SAIDA_OK = 0
+SAIDA_ERROS = 1
+
+
+class Saida:
+    """
+    Destino das mensagens e do resultado de um comando.
+
+    Com --json -, o JSON vai para a saída padrão e as mensagens para a saída
+    de erros, para que o resultado possa ser encadeado com outras
+    ferramentas; com --quiet, as mensagens são descartadas. O que as funções
+    do organizador imprimem com print segue o mesmo destino.
+
+    Com --profile (ou --profile-dir), perfil mede as etapas do comando; a
+    tabela vai para as mensagens e para o log, e o JSON ganha a chave "perfil".
+    """
+
+    def __init__(self, args):
+        self.json = args.json
+        self.quiet = args.quiet
+        self.progresso = args.progress and not args.quiet
+        self.perfil = Perfil(args.profile_dir) if args.profile or args.profile_dir else None
+        if self.quiet:
+            self.mensagens = open(os.devnull, 'w', encoding='utf-8')
+        elif self.json == '-':
+            self.mensagens = sys.stderr
+        else:
+            self.mensagens = sys.stdout
+
+    def __call__(self, mensagem):
+        print(mensagem, file=self.mensagens)
+
+    def barra(self, rotulo):
+        """Callback de progresso (valor, máximo) na saída de erros, ou None"""
+        return ProgressoTerminal(rotulo, saida=sys.stderr) if self.progresso else None
+
+    def registrar_perfil(self, log_file=None):
+        """Mostra a tabela do perfil e, se informado, a acrescenta ao log"""
+        if self.perfil is None or not self.perfil.medidas:
+            return
+        self(f"Perfil da execução:\n{self.perfil.tabela()}")
+        if log_file:
+            self.perfil.registrar(log_file)
+
+    def resultado(self, dados):
+        if not self.json:
+            return
+        if self.perfil is not None:
+            dados = dict(dados, perfil=self.perfil.como_lista())
+        texto = json.dumps(dados, ensure_ascii=False, indent=2)
+        if self.json == '-':
+            print(texto)
+        else:
+            with open(self.json, 'w', encoding='utf-8') as f:
+                f.write(texto + "\n")
+
+    def fechar(self):
+        if self.quiet:
+            self.mensagens.close()
+
+
+def _varrer(hd, saida, completa=False):
+    """Varre o HD com o snapshot incremental (exceto com completa=True)"""
+    snapshot = None if completa else abrir_snapshot(hd)
+    progresso = saida.barra("Pastas varridas")
+    try:
+        with etapa(saida.perfil, 'varredura'):
+            inventario = varrer(hd, progresso, snapshot=snapshot)
+    finally:
+        if progresso is not None:
+            progresso.finalizar()
+        if snapshot is not None:
+            snapshot.fechar()
+            saida(snapshot.resumo())
+    saida(f"{inventario.total_pastas} pastas e {inventario.total_arquivos} arquivos encontrados.")
+    return inventario
+
+
+def comando_scan(args, saida):
+    inventario = _varrer(args.hd, saida, args.full)
+    with etapa(saida.perfil, 'pastas_repetidas'):
+        repetidas = {nome: caminhos for nome, caminhos in inventario.pastas_por_nome(minimo=2).items()
+                     if len(caminhos) > 1}
+    saida(f"{len(repetidas)} nomes de pasta repetidos.")
+    saida.registrar_perfil()
+    saida.resultado({
+        "hd": os.path.abspath(args.hd),
+        "pastas": inventario.total_pastas,
+        "arquivos": inventario.total_arquivos,
+        "bytes": inventario.total_bytes,
+        "pastas_reaproveitadas": inventario.total_reaproveitadas,
+        "pastas_com_nome_repetido": repetidas,
+    })
+    return SAIDA_OK
+
+
+def comando_dupes(args, saida):
+    # O plano salvo guarda caminhos absolutos, aplicáveis de qualquer pasta
+    hd = os.path.abspath(args.hd)
+    inventario = _varrer(hd, saida, args.full)
+    log_file = os.path.join(hd, "reorganizacao_log.txt")
+
+    cache = abrir_cache(hd)
+    if cache is not None:
+        cache.remover_ausentes(inventario)
+    grupos = []
+    duplicados = {}
+    progresso = saida.barra("Grupos de tamanho analisados")
+    try:
+        with etapa(saida.perfil, 'duplicados'):
+            grupos_tamanho = inventario.arquivos_por_tamanho(minimo=2, memoria_maxima=args.memory_limit)
+            try:
+                for hash_arquivo, tamanho, entradas in gerar_grupos_duplicados(
+                        grupos_tamanho, cache=cache, callback=progresso, log_callback=saida,
+                        algoritmo=args.algorithm, verificacao=VERIFICACOES_CLI[args.verification],
+                        memoria_maxima=args.memory_limit):
+                    caminhos = [entrada.caminho for entrada in entradas]
+                    duplicados[hash_arquivo] = entradas
+                    grupos.append({"hash": hash_arquivo, "tamanho": tamanho, "arquivos": caminhos})
+            finally:
+                grupos_tamanho.fechar()
+    finally:
+        if progresso is not None:
+            progresso.finalizar()
+        if cache is not None:
+            cache.fechar()
+            saida(cache.resumo())
+    saida(f"{len(grupos)} grupos de arquivos duplicados.")
+
+    hashes = HashesPorCaminho(args.memory_limit)
+    try:
+        for hash_arquivo, entradas in duplicados.items():
+            for entrada in entradas:
+                hashes[entrada.caminho] = hash_arquivo
+        if hashes.em_disco:
+            saida("Limite de memória atingido: os hashes da comparação de pastas foram para o disco.")
+        with etapa(saida.perfil, 'pastas_identicas'):
+            identicas = encontrar_pastas_identicas(inventario, hashes)
+        with etapa(saida.perfil, 'pastas_semelhantes'):
+            semelhantes = encontrar_pastas_semelhantes(inventario, hashes)
+    finally:
+        hashes.fechar()
+    saida(f"{len(identicas)} grupos de pastas idênticas e {len(semelhantes)} pares de pastas semelhantes.")
+
+    # As ações são só agendadas; o plano é salvo (simulação) ou aplicado no fim
+    plano = PlanoMovimentacao()
+    operacoes_por_grupo = {}
+    concluidas = None
+    with open(log_file, 'a', encoding='utf-8') as log:
+        def registrar(mensagem):
+            log.write(f"{mensagem}\n")
+            saida(mensagem)
+
+        with etapa(saida.perfil, 'planejamento'):
+            # As pastas idênticas vêm primeiro; os duplicados só tratam o que elas deixam no lugar
+            modo_pastas = ACOES_PASTAS[args.folders]
+            for grupo in identicas:
+                for pasta in grupo.pastas[1:]:
+                    processar_pastas_identicas((grupo.pastas[0], pasta), modo_acao=modo_pastas,
+                                               log_callback=registrar if modo_pastas else None, plano=plano)
+            processar_arquivos_duplicados(retirar_agendados(duplicados, plano),
+                                          os.path.join(hd, "Arquivos Duplicados"),
+                                          modo_acao=ACOES_DUPLICADOS[args.duplicates],
+                                          log_callback=registrar, plano=plano,
+                                          operacoes_por_grupo=operacoes_por_grupo)
+
+        totais = plano.totais()
+        arquivo_plano = None
+        if args.dry_run:
+            arquivo_plano = args.plan or os.path.join(hd, NOME_ARQUIVO_PLANO)
+            plano.salvar(arquivo_plano)
+            registrar(f"Simulação: {plano.resumo()}\nPlano salvo em {arquivo_plano}")
+        elif plano:
+            registrar(plano.resumo())
+            progresso = saida.barra("Operações")
+            with etapa(saida.perfil, 'movimentacao'):
+                concluidas = plano.executar(registrar, progresso)
+            if progresso is not None:
+                progresso.finalizar()
+            registrar(f"Operações concluídas com {plano.erros} erros")
+            for hash_arquivo, operacoes in operacoes_por_grupo.items():
+                if operacoes:
+                    registrar(relatorio_grupo(hash_arquivo, operacoes, concluidas))
+    saida.registrar_perfil(log_file)
+
+    # Espaço recuperado por grupo: o previsto na simulação, o obtido na execução
+    for grupo in grupos:
+        grupo["recuperado"] = espaco_recuperado(operacoes_por_grupo.get(grupo["hash"], ()), concluidas)
+
+    saida.resultado({
+        "hd": os.path.abspath(hd),
+        "algoritmo": args.algorithm,
+        "verificacao": VERIFICACOES_CLI[args.verification],
+        "pastas": inventario.total_pastas,
+        "arquivos": inventario.total_arquivos,
+        "grupos_duplicados": grupos,
+        "pastas_identicas": [grupo._asdict() for grupo in identicas],
+        "pastas_semelhantes": [par._asdict() for par in semelhantes],
+        "plano": totais,
+        "plano_salvo": arquivo_plano,
+        "erros": plano.erros,
+    })
+    return SAIDA_ERROS if plano.erros else SAIDA_OK
+
+
+def comando_merge(args, saida):
+    estatisticas = {}
+    arquivo_plano = None
+    if args.dry_run:
+        arquivo_plano = args.plan or os.path.join(args.destination, NOME_ARQUIVO_PLANO)
+    progresso = saida.barra("Progresso")
+    with contextlib.redirect_stdout(saida.mensagens):
+        sucesso = mesclar_hds(args.destination, args.source, not args.standard_mode, progresso,
+                              arquivo_plano=arquivo_plano, estatisticas=estatisticas, perfil=saida.perfil,
+                              memoria_maxima=args.memory_limit)
+    if progresso is not None:
+        progresso.finalizar()
+    saida.resultado({
+        "destino": os.path.abspath(args.destination),
+        "origem": os.path.abspath(args.source),
+        "sucesso": bool(sucesso),
+        "plano_salvo": arquivo_plano,
+        "estatisticas": estatisticas,
+    })
+    return SAIDA_OK if sucesso and not estatisticas.get("erros") else SAIDA_ERROS
+
+
+def comando_apply_plan(args, saida):
+    caminho = args.plan
+    plano = PlanoMovimentacao.carregar(caminho)
+    saida(plano.resumo())
+    ja_aplicadas = len(plano.concluidas_anteriores)
+    if ja_aplicadas:
+        saida(f"{ja_aplicadas} operações já aplicadas anteriormente serão puladas.")
+    totais = plano.totais()
+
+    log_file = os.path.join(os.path.dirname(os.path.abspath(caminho)), "reorganizacao_log.txt")
+    progresso = saida.barra("Operações")
+    with open(log_file, 'a', encoding='utf-8') as log:
+        log.write(f"\n=== Aplicando plano: {caminho} ===\n")
+        with etapa(saida.perfil, 'movimentacao'):
+            plano.executar(lambda msg: (saida(msg), log.write(f"{msg}\n")), progresso, diario=caminho)
+    if progresso is not None:
+        progresso.finalizar()
+    saida(f"Plano aplicado com {plano.erros} erros. Log salvo em {log_file}")
+    saida.registrar_perfil(log_file)
+    saida.resultado({
+        "plano": os.path.abspath(caminho),
+        "totais": totais,
+        "ja_aplicadas": ja_aplicadas,
+        "erros": plano.erros,
+    })
+    return SAIDA_ERROS if plano.erros else SAIDA_OK
+
+
+AJUDA_LIMITE_MEMORIA = ("memória máxima do agrupamento e da comparação dos arquivos (ex.: 512M, 2G); acima "
+                        "dela os dados vão para tabelas SQLite temporárias em TMPDIR e a análise fica mais lenta, "
+                        "sem estourar a memória (padrão: sem limite)")
+
+
+def _limite_memoria(texto):
+    """Converte "512M", "2G" ou um número de bytes no limite de memória"""
+    numero = texto.strip().upper().rstrip('B')
+    multiplicador = UNIDADES_MEMORIA.get(numero[-1:], 1)
+    if numero[-1:] in UNIDADES_MEMORIA:
+        numero = numero[:-1]
+    try:
+        valor = int(float(numero) * multiplicador)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {texto!r} (use, por exemplo, 512M ou 2G)")
+    if valor <= 0:
+        raise argparse.ArgumentTypeError("o limite de memória precisa ser maior que zero")
+    return valor
+
+
+def criar_parser():
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument('--json', metavar='ARQUIVO',
+                       help="grava o resultado em JSON no arquivo (- para a saída padrão)")
+    modo = comum.add_mutually_exclusive_group()
+    modo.add_argument('-q', '--quiet', action='store_true', help="não mostra mensagens, só o resultado")
+    modo.add_argument('--progress', action='store_true', help="mostra o andamento de cada etapa na saída de erros")
+    comum.add_argument('--profile', action='store_true',
+                       help="mede cada etapa (tempo, CPU, bytes lidos, open/stat e pico de memória) e acrescenta "
+                            "a tabela ao log; deixa a execução mais lenta")
+    comum.add_argument('--profile-dir', metavar='PASTA',
+                       help="grava também a saída do cProfile de cada etapa nesta pasta (implica --profile)")
+
+    parser = argparse.ArgumentParser(
+        prog='organizador_cli.py',
+        description="Organizador de HDs sem interface gráfica e sem perguntas, para uso em scripts e no cron."
+    )
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    scan = comandos.add_parser('scan', parents=[comum], help="varre o HD e informa os totais")
+    scan.add_argument('hd', help="pasta raiz do HD")
+    scan.add_argument('--full', action='store_true', help="ignora o snapshot e lista todas as pastas")
+    scan.set_defaults(funcao=comando_scan)
+
+    dupes = comandos.add_parser('dupes', parents=[comum],
+                                help="encontra arquivos e pastas duplicados e aplica as ações escolhidas")
+    dupes.add_argument('hd', help="pasta raiz do HD")
+    dupes.add_argument('--full', action='store_true', help="ignora o snapshot e lista todas as pastas")
+    dupes.add_argument('--algorithm', choices=algoritmos_disponiveis(), default=ALGORITMO_PADRAO,
+                       help=f"hash usado para agrupar os arquivos (padrão: {ALGORITMO_PADRAO})")
+    dupes.add_argument('--verification', choices=list(VERIFICACOES_CLI), default='none',
+                       help="confirmação dos grupos antes de mover qualquer arquivo: "
+                            + ", ".join(f"{opcao} ({VERIFICACOES[modo]})" for opcao, modo in VERIFICACOES_CLI.items()))
+    dupes.add_argument('--duplicates', choices=list(ACOES_DUPLICADOS), default='keep-all',
+                       help="ação para os arquivos duplicados: manter todos, manter o primeiro e mover os "
+                            "demais para \"Arquivos Duplicados\", copiar todos para lá, ou trocar as cópias por "
+                            "reflinks/hardlinks do primeiro sem mover nada (padrão: keep-all)")
+    dupes.add_argument('--folders', choices=list(ACOES_PASTAS), default='keep-both',
+                       help="ação para as pastas idênticas: manter ambas, manter só a primeira ou só a "
+                            "segunda, ou mesclar na primeira (padrão: keep-both)")
+    dupes.add_argument('--dry-run', action='store_true', help="apenas salva o plano, sem alterar o HD")
+    dupes.add_argument('--plan', metavar='ARQUIVO',
+                       help=f"arquivo do plano na simulação (padrão: {NOME_ARQUIVO_PLANO} na raiz do HD)")
+    dupes.add_argument('--memory-limit', metavar='TAMANHO', type=_limite_memoria, help=AJUDA_LIMITE_MEMORIA)
+    dupes.set_defaults(funcao=comando_dupes)
+
+    merge = comandos.add_parser('merge', parents=[comum], help="move o conteúdo do HD de origem para o de destino")
+    merge.add_argument('destination', help="HD de destino")
+    merge.add_argument('source', help="HD de origem")
+    merge.add_argument('--standard-mode', action='store_true',
+                       help="modo padrão, em vez de manter o primeiro arquivo e mover as duplicatas")
+    merge.add_argument('--dry-run', action='store_true', help="apenas salva o plano, sem alterar os HDs")
+    merge.add_argument('--plan', metavar='ARQUIVO',
+                       help=f"arquivo do plano na simulação (padrão: {NOME_ARQUIVO_PLANO} no destino)")
+    merge.add_argument('--memory-limit', metavar='TAMANHO', type=_limite_memoria, help=AJUDA_LIMITE_MEMORIA)
+    merge.set_defaults(funcao=comando_merge)
+
+    aplicar = comandos.add_parser('apply-plan', parents=[comum],
+                                  help="aplica (ou retoma) um plano salvo por uma simulação")
+    aplicar.add_argument('plan', help="arquivo do plano (.jsonl)")
+    aplicar.set_defaults(funcao=comando_apply_plan)
+
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.funcao is comando_apply_plan:
+        if not os.path.isfile(args.plan):
+            parser.error(f"plano não encontrado: {args.plan}")
+    elif args.funcao is comando_merge:
+        for pasta in (args.destination, args.source):
+            if not os.path.isdir(pasta):
+                parser.error(f"pasta não encontrada: {pasta}")
+        if os.path.abspath(args.destination) == os.path.abspath(args.source):
+            parser.error("os HDs de origem e destino não podem ser iguais")
+    elif not os.path.isdir(args.hd):
+        parser.error(f"pasta não encontrada: {args.hd}")
+
+    saida = Saida(args)
+    try:
+        return args.funcao(args, saida)
+    finally:
+        saida.fechar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
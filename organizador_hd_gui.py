@@ -1,232 +1,47 @@
 import sys
 import os
-import shutil
-import filecmp
-import hashlib
+import tempfile
+import threading
+import time
 from collections import defaultdict
+from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout, 
                            QHBoxLayout, QWidget, QLabel, QFileDialog, QTextEdit,
-                           QMessageBox, QProgressBar, QDialog, QRadioButton, 
-                           QButtonGroup, QTabWidget, QListWidget, QFrame,
-                           QSplitter, QScrollArea, QCheckBox, QGroupBox)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QFont, QIcon, QPalette, QColor, QPixmap
-from mesclar_hds import mesclar_hds, obter_pasta_tipo_arquivo
-
-# Definição de estilos
-STYLE = """
-QMainWindow, QDialog {
-    background-color: #2b2b2b;
-}
-
-QTabWidget::pane {
-    border: 1px solid #3d3d3d;
-    background-color: #2b2b2b;
-    border-radius: 5px;
-}
-
-QTabBar::tab {
-    background-color: #3d3d3d;
-    color: #ffffff;
-    padding: 8px 20px;
-    border-top-left-radius: 5px;
-    border-top-right-radius: 5px;
-    margin-right: 2px;
-}
-
-QTabBar::tab:selected {
-    background-color: #0d47a1;
-}
-
-QPushButton {
-    background-color: #0d47a1;
-    color: white;
-    border: none;
-    padding: 8px 15px;
-    border-radius: 4px;
-    font-weight: bold;
-    min-height: 30px;
-}
-
-QPushButton:hover {
-    background-color: #1565c0;
-}
-
-QPushButton:pressed {
-    background-color: #0a3d87;
-}
-
-QPushButton:disabled {
-    background-color: #666666;
-}
-
-QTextEdit {
-    background-color: #1e1e1e;
-    color: #ffffff;
-    border: 1px solid #3d3d3d;
-    border-radius: 4px;
-    padding: 5px;
-    selection-background-color: #0d47a1;
-}
-
-QProgressBar {
-    border: 2px solid #3d3d3d;
-    border-radius: 5px;
-    text-align: center;
-    height: 25px;
-    background-color: #1e1e1e;
-    color: white;
-}
-
-QProgressBar::chunk {
-    background-color: #0d47a1;
-    border-radius: 3px;
-}
-
-QLabel {
-    color: #ffffff;
-    font-size: 12px;
-}
-
-QRadioButton, QCheckBox {
-    color: #ffffff;
-    spacing: 8px;
-    padding: 2px;
-}
-
-QRadioButton::indicator, QCheckBox::indicator {
-    width: 18px;
-    height: 18px;
-}
-
-QRadioButton::indicator:unchecked, QCheckBox::indicator:unchecked {
-    background-color: #1e1e1e;
-    border: 2px solid #3d3d3d;
-    border-radius: 9px;
-}
-
-QRadioButton::indicator:checked, QCheckBox::indicator:checked {
-    background-color: #0d47a1;
-    border: 2px solid #3d3d3d;
-    border-radius: 9px;
-}
-
-QListWidget {
-    background-color: #1e1e1e;
-    color: #ffffff;
-    border: 1px solid #3d3d3d;
-    border-radius: 4px;
-    padding: 5px;
-}
-
-QListWidget::item {
-    padding: 5px;
-    border-radius: 3px;
-}
-
-QListWidget::item:selected {
-    background-color: #0d47a1;
-}
-
-QListWidget::item:hover {
-    background-color: #3d3d3d;
-}
-
-QScrollBar:vertical {
-    border: none;
-    background-color: #1e1e1e;
-    width: 12px;
-    margin: 0px;
-}
-
-QScrollBar::handle:vertical {
-    background-color: #3d3d3d;
-    border-radius: 6px;
-    min-height: 20px;
-}
-
-QScrollBar::handle:vertical:hover {
-    background-color: #4d4d4d;
-}
-
-QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-    height: 0px;
-}
-
-QFrame#card {
-    background-color: #3d3d3d;
-    border-radius: 8px;
-    padding: 10px;
-    margin: 5px;
-}
-
-QGroupBox {
-    color: #ffffff;
-    border: 1px solid #3d3d3d;
-    border-radius: 5px;
-    margin-top: 1.5ex;
-    padding-top: 1.5ex;
-    font-weight: bold;
-}
-
-QGroupBox::title {
-    subcontrol-origin: margin;
-    subcontrol-position: top center;
-    padding: 0 5px;
-}
-
-QWidget {
-    font-family: 'Segoe UI', Arial, sans-serif;
-}
-"""
-
-def calcular_hash_arquivo(caminho_arquivo, block_size=65536):
-    """Calcula o hash SHA-256 de um arquivo"""
-    sha256 = hashlib.sha256()
-    with open(caminho_arquivo, 'rb') as f:
-        for block in iter(lambda: f.read(block_size), b''):
-            sha256.update(block)
-    return sha256.hexdigest()
-
-def mover_para_duplicados(arquivo, pasta_duplicados):
+                           QMessageBox, QProgressBar, QDialog, QTabWidget,
+                           QFrame, QCheckBox,
+                           QTableView, QHeaderView, QAbstractItemView,
+                           QLineEdit, QComboBox)
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from constantes import ALGORITMO_PADRAO, NOME_ARQUIVO_PLANO
+from estilo_gui import STYLE, AnimatedButton
+from formatacao import formatar_bytes
+from revisao_duplicados import DuplicadosModel, REGRAS
+from metricas import MetricasProgresso, ProgressoLimitado
+
+# Intervalos (ms) de atualização das métricas na tela e no arquivo de log
+INTERVALO_METRICAS = 1000
+INTERVALO_LOG_METRICAS = 60000
+
+def novo_perfil():
     """
-    Move um arquivo para a pasta de duplicados, organizando por tipo de arquivo.
+    Perfil de um trabalho iniciado pela interface. A saída do cProfile vai
+    para uma pasta temporária, fora do HD analisado, informada no log.
     """
-    # Obter nome e extensão do arquivo
-    nome_arquivo = os.path.basename(arquivo)
-    _, extensao = os.path.splitext(nome_arquivo)
-    
-    # Determinar a pasta de destino baseada no tipo de arquivo
-    tipo_pasta = obter_pasta_tipo_arquivo(extensao)
-    pasta_tipo = os.path.join(pasta_duplicados, tipo_pasta)
-    
-    # Criar a pasta do tipo se não existir
-    os.makedirs(pasta_tipo, exist_ok=True)
-    
-    # Definir o caminho de destino
-    destino = os.path.join(pasta_tipo, nome_arquivo)
-    
-    # Se já existe um arquivo com mesmo nome na pasta de destino
-    contador = 1
-    while os.path.exists(destino):
-        nome_base, ext = os.path.splitext(nome_arquivo)
-        destino = os.path.join(pasta_tipo, f"{nome_base}_{contador}{ext}")
-        contador += 1
-    
-    # Mover o arquivo
-    shutil.move(arquivo, destino)
-    return destino
+    from perfilamento import Perfil
+    return Perfil(os.path.join(tempfile.gettempdir(), f"organizador_perfil_{datetime.now():%Y%m%d_%H%M%S}"))
 
 class OrganizadorThread(QThread):
     progress_signal = pyqtSignal(str)
     finished_signal = pyqtSignal()
     question_signal = pyqtSignal(str, list)
-    duplicates_signal = pyqtSignal(dict)
+    duplicate_group_signal = pyqtSignal(str, object, list)  # hash, tamanho, entradas do inventário
     progress_update = pyqtSignal(int, int)  # valor atual, valor máximo
     
-    def __init__(self, hd_path, batch_mode=False, duplicate_action=0):
+    def __init__(self, hd_path, batch_mode=False, duplicate_action=0, plano=None,
+                 hash_algorithm=ALGORITMO_PADRAO, verification='nenhuma', profile=False, memory_limit=None):
         super().__init__()
-        self.hd_path = hd_path
+        # O plano (simulação ou lote) guarda caminhos absolutos
+        self.hd_path = os.path.abspath(hd_path)
         self.folders_by_name = defaultdict(list)
         self.identical_groups = []
         self.user_response = None
@@ -236,25 +51,87 @@ class OrganizadorThread(QThread):
         # 1: Manter todos os arquivos
         # 2: Manter apenas o primeiro arquivo
         # 3: Mover todos os duplicados para pasta específica
+        self.hash_algorithm = hash_algorithm
+        self.verification = verification
+        # Memória máxima (bytes) do agrupamento e da comparação; acima dela, disco
+        self.memory_limit = memory_limit
+        self.hashes = None
+        # Grupos de duplicados do modo lote, tratados só depois das pastas idênticas
+        self.pending_groups = []
+        # Liberado pela janela principal a cada par de pastas idênticas respondido
+        self.folders_answered = threading.Semaphore(0)
+        from movimentacao import PlanoMovimentacao
+        # Na simulação as ações vão para o plano recebido, sem alterar o HD
+        self.simulacao = plano is not None
+        self.plano = plano if plano is not None else PlanoMovimentacao()
+        # Vazão, fila de leitura e ETA de cada fase, lidos pela janela principal
+        self.metricas = MetricasProgresso()
+        # Agrupa as atualizações da barra para não inundar a fila de eventos da interface
+        self.progresso = ProgressoLimitado(self.progress_update.emit)
+        # Modo de perfilamento: tempos, leituras e memória de cada etapa no log
+        self.perfil = novo_perfil() if profile else None
         
     def run(self):
-        self.analyze_folders()
-        self.identify_duplicates()
-        self.compare_folders()
-        self.find_duplicate_files()
+        # O motor (SQLite, hashes, comparação de pastas) só é carregado quando
+        # a análise começa, e não na abertura da janela
+        from cache_hash import abrir_cache
+        from perfilamento import etapa
+        with etapa(self.perfil, 'varredura'):
+            self.scan_drive()
+        # O cache precisa ser aberto na própria thread que o utiliza (SQLite)
+        self.cache = abrir_cache(self.hd_path)
+        if self.cache is not None:
+            self.cache.remover_ausentes(self.inventario)
+        try:
+            with etapa(self.perfil, 'analise_pastas'):
+                self.analyze_folders()
+            with etapa(self.perfil, 'pastas_repetidas'):
+                self.identify_duplicates()
+            with etapa(self.perfil, 'arquivos_duplicados'):
+                self.find_duplicate_files()
+            with etapa(self.perfil, 'pastas_identicas'):
+                self.compare_folders()
+            if self.pending_groups:
+                with etapa(self.perfil, 'duplicados_lote'):
+                    self.process_pending_duplicates()
+            with etapa(self.perfil, 'pastas_semelhantes'):
+                self.find_similar_folders()
+        finally:
+            if self.cache is not None:
+                self.cache.fechar()
+                self.progress_signal.emit(self.cache.resumo())
+            if self.hashes is not None:
+                self.hashes.fechar()
+            if self.perfil is not None and self.perfil.medidas:
+                self.progress_signal.emit(f"Perfil da execução:\n{self.perfil.tabela()}")
+                self.perfil.registrar(os.path.join(self.hd_path, "reorganizacao_log.txt"))
         self.finished_signal.emit()
     
+    def scan_drive(self):
+        """
+        Percorre o HD uma única vez; as etapas seguintes usam o inventário.
+        Pastas que não mudaram desde a execução anterior vêm do snapshot.
+        """
+        from varredura import varrer
+        from snapshot_varredura import abrir_snapshot
+        self.progress_signal.emit("Varrendo o HD...")
+        snapshot = abrir_snapshot(self.hd_path)
+        try:
+            self.inventario = varrer(self.hd_path, self.progresso, snapshot=snapshot,
+                                     metricas=self.metricas)
+        finally:
+            self.progresso.finalizar()
+            if snapshot is not None:
+                snapshot.fechar()
+                self.progress_signal.emit(snapshot.resumo())
+        self.progress_signal.emit(
+            f"{self.inventario.total_pastas} pastas e {self.inventario.total_arquivos} arquivos encontrados."
+        )
+    
     def analyze_folders(self):
         self.progress_signal.emit("Analisando estrutura de pastas...")
-        total_dirs = sum([len(dirs) for _, dirs, _ in os.walk(self.hd_path)])
-        processed_dirs = 0
-        
-        for root, dirs, files in os.walk(self.hd_path):
-            for dir_name in dirs:
-                full_path = os.path.join(root, dir_name)
-                self.folders_by_name[dir_name.lower()].append(full_path)
-                processed_dirs += 1
-                self.progress_update.emit(processed_dirs, total_dirs)
+        self.folders_by_name = self.inventario.pastas_por_nome(minimo=2)
+        self.progresso(self.inventario.total_pastas, self.inventario.total_pastas)
                 
     def identify_duplicates(self):
         self.progress_signal.emit("Identificando pastas duplicadas...")
@@ -264,364 +141,192 @@ class OrganizadorThread(QThread):
         }
         
     def compare_folders(self):
+        """
+        Compara o conteúdo das pastas pelos digests (árvore de Merkle)
+        calculados a partir dos hashes de find_duplicate_files; pastas
+        idênticas são encontradas mesmo com nomes diferentes.
+        """
+        from pastas_identicas import encontrar_pastas_identicas
         self.progress_signal.emit("Comparando conteúdo de pastas...")
-        total_comparisons = sum([len(paths) * (len(paths) - 1) // 2 for paths in self.duplicate_folders.values()])
-        processed_comparisons = 0
-        
-        for name, paths in self.duplicate_folders.items():
-            compared = set()
-            for i in range(len(paths)):
-                for j in range(i+1, len(paths)):
-                    path1, path2 = paths[i], paths[j]
-                    if (path1, path2) not in compared:
-                        comparison = filecmp.dircmp(path1, path2)
-                        if not comparison.left_only and not comparison.right_only and not comparison.diff_files:
-                            self.identical_groups.append((path1, path2))
-                        compared.add((path1, path2))
-                        processed_comparisons += 1
-                        self.progress_update.emit(processed_comparisons, total_comparisons)
+        perguntas = 0
+        for grupo in encontrar_pastas_identicas(self.inventario, self.hashes):
+            self.progress_signal.emit(
+                f"{len(grupo.pastas)} pastas idênticas ({grupo.arquivos} arquivos, "
+                f"{formatar_bytes(grupo.tamanho)} cada): " + ", ".join(grupo.pastas)
+            )
+            for pasta in grupo.pastas[1:]:
+                self.identical_groups.append((grupo.pastas[0], pasta))
+                self.question_signal.emit("Pastas com conteúdo idêntico encontradas", [grupo.pastas[0], pasta])
+                perguntas += 1
+        # Os duplicados do modo lote só são tratados depois que todas as
+        # ações de pastas foram decididas sobre o HD ainda intacto
+        if self.pending_groups:
+            for _ in range(perguntas):
+                self.folders_answered.acquire()
+
+    def folder_answered(self):
+        """Chamado pela janela principal quando um par de pastas idênticas foi tratado"""
+        self.folders_answered.release()
+
+    def find_similar_folders(self):
+        """
+        Informa os pares de pastas quase idênticas (MinHash + LSH sobre os
+        mesmos hashes), do maior volume em comum para o menor. São apenas
+        candidatos a mesclagem: nada é movido.
+        """
+        from pastas_semelhantes import encontrar_pastas_semelhantes
+        self.progress_signal.emit("Procurando pastas semelhantes...")
+        for par in encontrar_pastas_semelhantes(self.inventario, self.hashes):
+            self.progress_signal.emit(
+                f"Pastas semelhantes: {par.pasta1} <-> {par.pasta2} (Jaccard {par.jaccard:.0%}, "
+                f"contenção {par.contencao:.0%}, {par.compartilhados} arquivos, "
+                f"{formatar_bytes(par.bytes_compartilhados)} em comum)"
+            )
 
     def find_duplicate_files(self):
-        """Encontra todos os arquivos duplicados em todas as pastas"""
+        """
+        Encontra todos os arquivos duplicados em todas as pastas.
+        Cada grupo é enviado para a interface assim que é confirmado, sem
+        esperar o fim da análise. No modo lote, os grupos ficam guardados e
+        só são tratados depois das pastas idênticas (process_pending_duplicates),
+        que são comparadas com o inventário de antes de qualquer movimentação.
+        """
+        from hash_arquivos import gerar_grupos_duplicados
+        from agrupamento_externo import HashesPorCaminho
         self.progress_signal.emit("Procurando arquivos duplicados em todas as pastas...")
+        self.pasta_duplicados = os.path.join(self.hd_path, "Arquivos Duplicados")
+        
+        # Com limite de memória, os grupos de tamanho podem ficar em disco
+        grupos_tamanho = self.inventario.arquivos_por_tamanho(minimo=2, memoria_maxima=self.memory_limit)
+        # Filtro em etapas: tamanho -> hash parcial -> hash completo
+        grupos = gerar_grupos_duplicados(
+            grupos_tamanho,
+            cache=self.cache,
+            callback=self.progresso,
+            log_callback=self.progress_signal.emit,
+            algoritmo=self.hash_algorithm,
+            verificacao=self.verification,
+            metricas=self.metricas,
+            memoria_maxima=self.memory_limit
+        )
         
-        # Dicionário para armazenar arquivos por tamanho
-        arquivos_por_tamanho = defaultdict(list)
-        
-        # Primeiro, agrupa arquivos por tamanho
-        total_files = sum([len(files) for _, _, files in os.walk(self.hd_path)])
-        processed_files = 0
-        
-        for raiz, _, arquivos in os.walk(self.hd_path):
-            for arquivo in arquivos:
-                caminho_completo = os.path.join(raiz, arquivo)
-                try:
-                    tamanho = os.path.getsize(caminho_completo)
-                    arquivos_por_tamanho[tamanho].append(caminho_completo)
-                except (OSError, IOError):
-                    continue
-                processed_files += 1
-                self.progress_update.emit(processed_files, total_files)
-        
-        # Para arquivos com mesmo tamanho, calcula o hash
-        arquivos_por_hash = defaultdict(list)
-        total_grupos = len([g for g in arquivos_por_tamanho.values() if len(g) > 1])
-        grupos_processados = 0
-        
-        for tamanho, arquivos in arquivos_por_tamanho.items():
-            if len(arquivos) > 1:
-                grupos_processados += 1
-                self.progress_signal.emit(f"Analisando grupo {grupos_processados}/{total_grupos} de arquivos com mesmo tamanho...")
-                for arquivo in arquivos:
-                    try:
-                        hash_arquivo = calcular_hash_arquivo(arquivo)
-                        arquivos_por_hash[hash_arquivo].append(arquivo)
-                    except (OSError, IOError):
-                        continue
-                self.progress_update.emit(grupos_processados, total_grupos)
-        
-        # Emite sinal apenas com grupos que têm duplicados
-        duplicados = {hash_: arquivos for hash_, arquivos in arquivos_por_hash.items() 
-                     if len(arquivos) > 1}
-        
-        # Se estiver em modo de lote, processa automaticamente os duplicados
-        if self.batch_mode and duplicados:
-            pasta_duplicados = os.path.join(self.hd_path, "Arquivos Duplicados")
-            os.makedirs(pasta_duplicados, exist_ok=True)
-            
-            if self.duplicate_action == 2:  # Manter apenas o primeiro arquivo
-                for hash_arquivo, arquivos in duplicados.items():
-                    for arquivo in arquivos[1:]:
-                        novo_caminho = mover_para_duplicados(arquivo, pasta_duplicados)
-                        self.progress_signal.emit(f"Arquivo duplicado movido: {arquivo} -> {novo_caminho}")
-            elif self.duplicate_action == 3:  # Mover todos os duplicados para pasta específica
-                for hash_arquivo, arquivos in duplicados.items():
-                    for arquivo in arquivos:
-                        # Obter nome e extensão do arquivo
-                        nome_arquivo = os.path.basename(arquivo)
-                        _, extensao = os.path.splitext(nome_arquivo)
-                        
-                        # Determinar a pasta de destino baseada no tipo de arquivo
-                        tipo_pasta = obter_pasta_tipo_arquivo(extensao)
-                        pasta_tipo = os.path.join(pasta_duplicados, tipo_pasta)
-                        
-                        # Criar a pasta do tipo se não existir
-                        os.makedirs(pasta_tipo, exist_ok=True)
-                        
-                        # Definir o caminho de destino
-                        destino = os.path.join(pasta_tipo, nome_arquivo)
-                        
-                        # Se já existe um arquivo com mesmo nome na pasta de destino
-                        contador = 1
-                        while os.path.exists(destino):
-                            nome_base, ext = os.path.splitext(nome_arquivo)
-                            destino = os.path.join(pasta_tipo, f"{nome_base}_{contador}{ext}")
-                            contador += 1
-                        
-                        # Copiar o arquivo (mantém o original)
-                        shutil.copy2(arquivo, destino)
-                        self.progress_signal.emit(f"Arquivo duplicado copiado: {arquivo} -> {destino}")
-        elif duplicados:
-            self.duplicates_signal.emit(duplicados)
-
-class AnimatedButton(QPushButton):
-    def __init__(self, text, parent=None):
-        super().__init__(text, parent)
-        self.setMinimumHeight(40)
-        self._animation = QPropertyAnimation(self, b"size")
-        self._animation.setDuration(100)
-        self._animation.setEasingCurve(QEasingCurve.Type.OutQuad)
-        self.original_size = None
-    
-    def enterEvent(self, event):
-        if not self.original_size:
-            self.original_size = self.size()
-        target_size = QSize(int(self.width() * 1.05), int(self.height() * 1.05))
-        self._animation.setStartValue(self.size())
-        self._animation.setEndValue(target_size)
-        self._animation.start()
-        super().enterEvent(event)
-    
-    def leaveEvent(self, event):
-        if self.original_size:
-            self._animation.setStartValue(self.size())
-            self._animation.setEndValue(self.original_size)
-            self._animation.start()
-        super().leaveEvent(event)
-
-class StyledDialog(QDialog):
-    def __init__(self, title, parent=None):
-        super().__init__(parent)
-        self.setWindowTitle(title)
-        self.setModal(True)
-        self.setStyleSheet(STYLE)
-        self.setMinimumSize(700, 500)
-
-class DuplicateFilesDialog(StyledDialog):
-    def __init__(self, arquivos, parent=None):
-        super().__init__("Arquivos Duplicados Encontrados", parent)
-        
-        layout = QVBoxLayout()
-        
-        # Título
-        title_label = QLabel("Arquivos Duplicados Encontrados")
-        title_label.setStyleSheet("font-size: 18px; font-weight: bold; margin-bottom: 10px;")
-        layout.addWidget(title_label)
-        
-        # Container principal
-        main_container = QFrame()
-        main_container.setObjectName("card")
-        main_layout = QVBoxLayout(main_container)
-        
-        # Lista de arquivos com scroll
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        list_container = QWidget()
-        list_layout = QVBoxLayout(list_container)
-        
-        self.list_widget = QListWidget()
-        for arquivo in arquivos:
-            self.list_widget.addItem(arquivo)
-        list_layout.addWidget(self.list_widget)
-        
-        scroll.setWidget(list_container)
-        main_layout.addWidget(scroll)
-        
-        # Opções
-        options_frame = QFrame()
-        options_frame.setObjectName("card")
-        options_layout = QVBoxLayout(options_frame)
-        
-        self.radio_group = QButtonGroup()
-        options = [
-            "Manter todos os arquivos",
-            "Manter apenas o primeiro arquivo",
-            "Escolher manualmente qual manter"
-        ]
-        
-        for i, text in enumerate(options):
-            radio = QRadioButton(text)
-            radio.setStyleSheet("font-size: 14px;")
-            self.radio_group.addButton(radio, i)
-            options_layout.addWidget(radio)
-        
-        main_layout.addWidget(options_frame)
-        layout.addWidget(main_container)
-        
-        # Informação sobre organização por tipo
-        info_label = QLabel("Os arquivos duplicados serão organizados em subpastas por tipo (PDFs, Imagens, etc.)")
-        info_label.setStyleSheet("font-size: 14px; color: #aaaaaa; margin-top: 10px;")
-        layout.addWidget(info_label)
-        
-        # Botão de confirmação
-        confirm_btn = AnimatedButton("Confirmar")
-        confirm_btn.clicked.connect(self.accept)
-        layout.addWidget(confirm_btn)
-        
-        self.setLayout(layout)
-
-class BatchSettingsDialog(StyledDialog):
-    def __init__(self, parent=None):
-        super().__init__("Configurações de Processamento em Lote", parent)
-        
-        layout = QVBoxLayout()
-        
-        # Título
-        title_label = QLabel("Configurações de Processamento em Lote")
-        title_label.setStyleSheet("font-size: 18px; font-weight: bold; margin-bottom: 10px;")
-        layout.addWidget(title_label)
-        
-        # Container principal
-        main_container = QFrame()
-        main_container.setObjectName("card")
-        main_layout = QVBoxLayout(main_container)
-        
-        # Opções para arquivos duplicados
-        duplicate_group = QGroupBox("Tratamento de Arquivos Duplicados")
-        duplicate_layout = QVBoxLayout(duplicate_group)
-        
-        self.duplicate_radio_group = QButtonGroup()
-        duplicate_options = [
-            "Perguntar para cada arquivo",
-            "Manter todos os arquivos",
-            "Manter apenas o primeiro arquivo (mover outros para pasta de duplicados)",
-            "Mover todos os duplicados para pasta específica (mantém originais)"
-        ]
-        
-        for i, text in enumerate(duplicate_options):
-            radio = QRadioButton(text)
-            radio.setStyleSheet("font-size: 14px;")
-            self.duplicate_radio_group.addButton(radio, i)
-            duplicate_layout.addWidget(radio)
-        
-        # Seleciona a opção padrão
-        self.duplicate_radio_group.button(2).setChecked(True)
-        
-        main_layout.addWidget(duplicate_group)
-        
-        # Opções para pastas duplicadas
-        folder_group = QGroupBox("Tratamento de Pastas Duplicadas")
-        folder_layout = QVBoxLayout(folder_group)
-        
-        self.folder_radio_group = QButtonGroup()
-        folder_options = [
-            "Perguntar para cada pasta",
-            "Manter todas as pastas",
-            "Manter apenas a primeira pasta",
-            "Mesclar conteúdo das pastas"
-        ]
-        
-        for i, text in enumerate(folder_options):
-            radio = QRadioButton(text)
-            radio.setStyleSheet("font-size: 14px;")
-            self.folder_radio_group.addButton(radio, i)
-            folder_layout.addWidget(radio)
-        
-        # Seleciona a opção padrão
-        self.folder_radio_group.button(3).setChecked(True)
-        
-        main_layout.addWidget(folder_group)
-        
-        # Informação sobre organização por tipo
-        info_label = QLabel("Os arquivos duplicados serão organizados em subpastas por tipo (PDFs, Imagens, etc.)")
-        info_label.setStyleSheet("font-size: 14px; color: #aaaaaa; margin-top: 10px;")
-        main_layout.addWidget(info_label)
-        
-        layout.addWidget(main_container)
-        
-        # Botões
-        buttons_layout = QHBoxLayout()
-        
-        cancel_btn = AnimatedButton("Cancelar")
-        cancel_btn.clicked.connect(self.reject)
-        
-        confirm_btn = AnimatedButton("Confirmar")
-        confirm_btn.clicked.connect(self.accept)
-        
-        buttons_layout.addWidget(cancel_btn)
-        buttons_layout.addWidget(confirm_btn)
-        
-        layout.addLayout(buttons_layout)
-        
-        self.setLayout(layout)
-
-class FolderActionDialog(StyledDialog):
-    def __init__(self, folder1, folder2):
-        super().__init__("Ação para Pastas Duplicadas")
-        
-        layout = QVBoxLayout()
-        
-        # Título
-        title_label = QLabel("Pastas Idênticas Encontradas")
-        title_label.setStyleSheet("font-size: 18px; font-weight: bold; margin-bottom: 10px;")
-        layout.addWidget(title_label)
-        
-        # Container principal
-        main_container = QFrame()
-        main_container.setObjectName("card")
-        main_layout = QVBoxLayout(main_container)
-        
-        # Informação das pastas
-        paths_frame = QFrame()
-        paths_frame.setObjectName("card")
-        paths_layout = QVBoxLayout(paths_frame)
-        paths_layout.addWidget(QLabel(f"1: {folder1}"))
-        paths_layout.addWidget(QLabel(f"2: {folder2}"))
-        main_layout.addWidget(paths_frame)
-        
-        # Opções
-        options_frame = QFrame()
-        options_frame.setObjectName("card")
-        options_layout = QVBoxLayout(options_frame)
-        
-        self.radio_group = QButtonGroup()
-        options = [
-            "Manter ambas",
-            "Manter apenas a primeira",
-            "Manter apenas a segunda",
-            "Mesclar conteúdo"
-        ]
-        
-        for i, text in enumerate(options):
-            radio = QRadioButton(text)
-            radio.setStyleSheet("font-size: 14px;")
-            self.radio_group.addButton(radio, i)
-            options_layout.addWidget(radio)
-        
-        main_layout.addWidget(options_frame)
-        layout.addWidget(main_container)
-        
-        # Botão de confirmação
-        confirm_btn = AnimatedButton("Confirmar")
-        confirm_btn.clicked.connect(self.accept)
-        layout.addWidget(confirm_btn)
-        
-        self.setLayout(layout)
+        self.hashes = HashesPorCaminho(self.memory_limit)
+        try:
+            for hash_arquivo, tamanho, entradas in grupos:
+                # Os hashes alimentam a comparação de pastas (compare_folders)
+                for entrada in entradas:
+                    self.hashes[entrada.caminho] = hash_arquivo
+                
+                # Em modo de lote, os duplicados são tratados depois das pastas idênticas
+                if self.batch_mode and self.duplicate_action in (2, 3, 4):
+                    self.pending_groups.append((hash_arquivo, entradas))
+                elif not self.batch_mode or self.duplicate_action == 0:
+                    self.duplicate_group_signal.emit(hash_arquivo, tamanho, entradas)
+        finally:
+            grupos_tamanho.fechar()
+        if self.hashes.em_disco:
+            self.progress_signal.emit("Limite de memória atingido: os hashes da comparação de pastas foram para o disco.")
+        self.progresso.finalizar()
+    
+    def process_pending_duplicates(self):
+        """
+        Trata os grupos guardados no modo lote. Arquivos de pastas removidas
+        ou mescladas pelas ações de pastas idênticas ficam de fora.
+        """
+        from acoes_duplicados import retirar_agendados
+        # Na simulação as ações de pastas estão no plano; fora dela, já no disco
+        for hash_arquivo, entradas in retirar_agendados(dict(self.pending_groups), self.plano).items():
+            entradas = [entrada for entrada in entradas if os.path.lexists(entrada.caminho)]
+            if len(entradas) > 1:
+                self.process_duplicate_group(hash_arquivo, entradas)
+        self.pending_groups = []
+    
+    def process_duplicate_group(self, hash_arquivo, entradas):
+        """Aplica a ação do modo lote a um grupo de arquivos duplicados (entradas do inventário)"""
+        from acoes_duplicados import (agendar_grupo_duplicado, relatorio_grupo, MANTER_PRIMEIRO,
+                                      COPIAR_TODOS, DEDUPLICAR)
+        # 2: manter apenas o primeiro arquivo; 3: copiar todos para a subpasta do tipo;
+        # 4: trocar as cópias por reflinks/hardlinks do primeiro
+        modo = {2: MANTER_PRIMEIRO, 3: COPIAR_TODOS, 4: DEDUPLICAR}[self.duplicate_action]
+        operacoes = agendar_grupo_duplicado(entradas, self.pasta_duplicados, self.plano, modo)
+        
+        # O plano guarda as listagens das pastas de destino entre um grupo e
+        # outro; na simulação as operações só se acumulam nele
+        if not self.simulacao:
+            concluidas = self.plano.executar(self.progress_signal.emit, metricas=self.metricas)
+            if modo == DEDUPLICAR and operacoes:
+                self.progress_signal.emit(relatorio_grupo(hash_arquivo, operacoes, concluidas))
 
 class MesclarThread(QThread):
     progress_signal = pyqtSignal(str)
     finished_signal = pyqtSignal()
     progress_update = pyqtSignal(int, int)  # valor atual, valor máximo
     
-    def __init__(self, hd_destino, hd_origem, manter_primeiro=True):
+    def __init__(self, hd_destino, hd_origem, manter_primeiro=True, arquivo_plano=None, profile=False,
+                 memory_limit=None):
         super().__init__()
         self.hd_destino = hd_destino
         self.hd_origem = hd_origem
         self.manter_primeiro = manter_primeiro
+        self.arquivo_plano = arquivo_plano
+        self.metricas = MetricasProgresso()
+        self.progresso = ProgressoLimitado(self.progress_update.emit)
+        self.perfil = novo_perfil() if profile else None
+        self.memory_limit = memory_limit
         
     def run(self):
+        from mesclar_hds import mesclar_hds
         try:
-            if mesclar_hds(self.hd_destino, self.hd_origem, self.manter_primeiro, self.update_progress):
-                self.progress_signal.emit("Mesclagem concluída com sucesso!")
+            # mesclar_hds acrescenta a tabela do perfil ao log da mesclagem
+            sucesso = mesclar_hds(self.hd_destino, self.hd_origem, self.manter_primeiro, self.progresso,
+                                  arquivo_plano=self.arquivo_plano, metricas=self.metricas, perfil=self.perfil,
+                                  memoria_maxima=self.memory_limit)
+            if self.perfil is not None and self.perfil.medidas:
+                self.progress_signal.emit(f"Perfil da execução:\n{self.perfil.tabela()}")
+            if sucesso:
+                if self.arquivo_plano:
+                    self.progress_signal.emit(f"Simulação concluída. Plano salvo em: {self.arquivo_plano}")
+                else:
+                    self.progress_signal.emit("Mesclagem concluída com sucesso!")
             else:
                 self.progress_signal.emit("Erro durante a mesclagem!")
         except Exception as e:
             self.progress_signal.emit(f"Erro: {str(e)}")
+        finally:
+            self.progresso.finalizar()
+            self.finished_signal.emit()
+
+class AplicarPlanoThread(QThread):
+    progress_signal = pyqtSignal(str)
+    finished_signal = pyqtSignal()
+    progress_update = pyqtSignal(int, int)  # valor atual, valor máximo
+    
+    def __init__(self, plano, log_file, arquivo_plano=None):
+        super().__init__()
+        self.plano = plano
+        self.log_file = log_file
+        # As operações concluídas são registradas no próprio arquivo do plano,
+        # então aplicar de novo um plano interrompido continua de onde parou
+        self.arquivo_plano = arquivo_plano
+        # Origens das operações que deram certo, lidas ao fim para os relatórios
+        self.concluidas = set()
+        self.metricas = MetricasProgresso()
+        self.progresso = ProgressoLimitado(self.progress_update.emit)
+    
+    def run(self):
+        try:
+            with open(self.log_file, 'a', encoding='utf-8') as log:
+                def registrar(mensagem):
+                    log.write(f"{mensagem}\n")
+                    self.progress_signal.emit(mensagem)
+                self.concluidas = self.plano.executar(registrar, self.progresso, diario=self.arquivo_plano,
+                                                      metricas=self.metricas)
+            self.progresso.finalizar()
+            self.progress_signal.emit(f"Plano aplicado com {self.plano.erros} erros.")
+        except Exception as e:
+            self.progress_signal.emit(f"Erro: {str(e)}")
         finally:
             self.finished_signal.emit()
-            
-    def update_progress(self, value, maximum):
-        self.progress_update.emit(value, maximum)
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -648,8 +353,20 @@ class MainWindow(QMainWindow):
         self.batch_mode = False
         self.duplicate_action = 0
         self.folder_action = 0
+        self.hash_algorithm = ALGORITMO_PADRAO
+        self.verification = 'nenhuma'
+        self.memory_limit = None
+        self.hd_path = None  # definido ao selecionar o HD
+        self.plano_simulacao = None
+        # Grupos da tabela (e operações) cujo plano está sendo executado
+        self.duplicates_in_progress = None
         self.manter_primeiro = True  # Opção padrão para mesclagem
         
+        # Métricas dos trabalhos em andamento: rótulo -> (métricas, arquivo de log, último registro no log)
+        self.metrics_jobs = {}
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        
     def setup_tab_organizacao(self):
         layout = QVBoxLayout()
         
@@ -698,6 +415,20 @@ class MainWindow(QMainWindow):
         self.batch_settings_btn.setEnabled(False)
         options_layout.addWidget(self.batch_settings_btn)
         
+        # Simulação: as ações viram um plano salvo no HD, aplicado depois
+        self.dry_run_checkbox = QCheckBox("Apenas simular (gerar um plano sem alterar o HD)")
+        self.dry_run_checkbox.setStyleSheet("font-size: 14px;")
+        options_layout.addWidget(self.dry_run_checkbox)
+        
+        # Modo de perfilamento: para descobrir onde o tempo de uma análise longa foi gasto
+        self.profile_checkbox = QCheckBox("Medir o desempenho de cada etapa (tempos, leituras e memória no log)")
+        self.profile_checkbox.setStyleSheet("font-size: 14px;")
+        options_layout.addWidget(self.profile_checkbox)
+        
+        self.apply_plan_btn = AnimatedButton("Aplicar Plano Salvo")
+        self.apply_plan_btn.clicked.connect(self.apply_saved_plan)
+        options_layout.addWidget(self.apply_plan_btn)
+        
         # Informação sobre organização por tipo
         info_label = QLabel("Os arquivos duplicados serão organizados em subpastas por tipo (PDFs, Imagens, etc.)")
         info_label.setStyleSheet("font-size: 14px; color: #aaaaaa; margin-top: 10px;")
@@ -720,6 +451,61 @@ class MainWindow(QMainWindow):
         
         main_layout.addWidget(log_frame)
         
+        # Lista de duplicados, preenchida enquanto a análise continua
+        duplicates_frame = QFrame()
+        duplicates_frame.setObjectName("card")
+        duplicates_layout = QVBoxLayout(duplicates_frame)
+        
+        self.duplicates_title = QLabel("Arquivos Duplicados")
+        self.duplicates_title.setStyleSheet("font-size: 16px; font-weight: bold;")
+        duplicates_layout.addWidget(self.duplicates_title)
+        
+        # Filtros por pasta e extensão
+        filter_layout = QHBoxLayout()
+        self.folder_filter = QLineEdit()
+        self.folder_filter.setPlaceholderText("Filtrar por pasta (ex.: Fotos)")
+        self.folder_filter.returnPressed.connect(self.apply_duplicates_filter)
+        filter_layout.addWidget(self.folder_filter)
+        self.extension_filter = QLineEdit()
+        self.extension_filter.setPlaceholderText("Extensões (ex.: jpg, png)")
+        self.extension_filter.returnPressed.connect(self.apply_duplicates_filter)
+        filter_layout.addWidget(self.extension_filter)
+        filter_btn = QPushButton("Filtrar")
+        filter_btn.clicked.connect(self.apply_duplicates_filter)
+        filter_layout.addWidget(filter_btn)
+        duplicates_layout.addLayout(filter_layout)
+        
+        # Regras de seleção em massa e ação sobre os marcados
+        rules_layout = QHBoxLayout()
+        self.rule_combo = QComboBox()
+        for regra, descricao in REGRAS.items():
+            self.rule_combo.addItem(descricao, regra)
+        rules_layout.addWidget(self.rule_combo)
+        rule_btn = QPushButton("Aplicar Regra")
+        rule_btn.clicked.connect(self.apply_duplicates_rule)
+        rules_layout.addWidget(rule_btn)
+        self.move_duplicates_btn = QPushButton("Mover Duplicados dos Grupos Marcados")
+        self.move_duplicates_btn.clicked.connect(self.move_marked_duplicates)
+        rules_layout.addWidget(self.move_duplicates_btn)
+        self.link_duplicates_btn = QPushButton("Deduplicar no Lugar (reflink/hardlink)")
+        self.link_duplicates_btn.clicked.connect(self.link_marked_duplicates)
+        rules_layout.addWidget(self.link_duplicates_btn)
+        duplicates_layout.addLayout(rules_layout)
+        
+        self.duplicates_model = DuplicadosModel(self)
+        self.duplicates_view = QTableView()
+        self.duplicates_view.setModel(self.duplicates_model)
+        self.duplicates_view.setSortingEnabled(True)
+        self.duplicates_view.sortByColumn(1, Qt.SortOrder.DescendingOrder)
+        self.duplicates_view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.duplicates_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.duplicates_view.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeMode.Stretch)
+        self.duplicates_view.verticalHeader().setDefaultSectionSize(24)
+        self.duplicates_view.verticalHeader().hide()
+        duplicates_layout.addWidget(self.duplicates_view)
+        
+        main_layout.addWidget(duplicates_frame)
+        
         # Barra de progresso
         progress_frame = QFrame()
         progress_frame.setObjectName("card")
@@ -730,6 +516,10 @@ class MainWindow(QMainWindow):
         self.progress_bar.setFormat("%p%")
         progress_layout.addWidget(self.progress_bar)
         
+        self.metrics_label = QLabel()
+        self.metrics_label.setStyleSheet("font-size: 11px; color: #aaaaaa;")
+        progress_layout.addWidget(self.metrics_label)
+        
         main_layout.addWidget(progress_frame)
         
         # Botão de início
@@ -796,6 +586,14 @@ class MainWindow(QMainWindow):
         self.manter_primeiro_checkbox.toggled.connect(self.toggle_manter_primeiro)
         options_layout.addWidget(self.manter_primeiro_checkbox)
         
+        self.dry_run_mesclagem_checkbox = QCheckBox("Apenas simular (gerar um plano sem mover nada)")
+        self.dry_run_mesclagem_checkbox.setStyleSheet("font-size: 14px;")
+        options_layout.addWidget(self.dry_run_mesclagem_checkbox)
+        
+        self.profile_mesclagem_checkbox = QCheckBox("Medir o desempenho de cada etapa (tempos, leituras e memória no log)")
+        self.profile_mesclagem_checkbox.setStyleSheet("font-size: 14px;")
+        options_layout.addWidget(self.profile_mesclagem_checkbox)
+        
         # Informação sobre organização por tipo
         info_label = QLabel("Os arquivos duplicados serão organizados em subpastas por tipo (PDFs, Imagens, etc.)")
         info_label.setStyleSheet("font-size: 14px; color: #aaaaaa; margin-top: 10px;")
@@ -828,6 +626,10 @@ class MainWindow(QMainWindow):
         self.progress_mesclagem.setFormat("%p%")
         progress_layout.addWidget(self.progress_mesclagem)
         
+        self.metrics_mesclagem_label = QLabel()
+        self.metrics_mesclagem_label.setStyleSheet("font-size: 11px; color: #aaaaaa;")
+        progress_layout.addWidget(self.metrics_mesclagem_label)
+        
         main_layout.addWidget(progress_frame)
         
         # Botão de início
@@ -847,11 +649,17 @@ class MainWindow(QMainWindow):
         self.manter_primeiro = checked
         
     def show_batch_settings(self):
+        from dialogos_gui import BatchSettingsDialog
         dialog = BatchSettingsDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.duplicate_action = dialog.duplicate_radio_group.checkedId()
             self.folder_action = dialog.folder_radio_group.checkedId()
-            self.log_message(f"Configurações de lote atualizadas: Duplicados={self.duplicate_action}, Pastas={self.folder_action}")
+            self.hash_algorithm = dialog.algorithms[dialog.hash_radio_group.checkedId()]
+            self.verification = dialog.verifications[dialog.verification_radio_group.checkedId()]
+            self.memory_limit = dialog.memory_limits[dialog.memory_radio_group.checkedId()]
+            memoria = formatar_bytes(self.memory_limit) if self.memory_limit else "sem limite"
+            self.log_message(f"Configurações de lote atualizadas: Duplicados={self.duplicate_action}, Pastas={self.folder_action}, "
+                             f"Hash={self.hash_algorithm}, Confirmação={self.verification}, Memória={memoria}")
     
     def select_hd(self):
         folder = QFileDialog.getExistingDirectory(self, "Selecionar HD")
@@ -893,10 +701,17 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            self.worker_mesclar = MesclarThread(self.hd_destino, self.hd_origem, self.manter_primeiro)
+            arquivo_plano = None
+            if self.dry_run_mesclagem_checkbox.isChecked():
+                arquivo_plano = os.path.join(self.hd_destino, NOME_ARQUIVO_PLANO)
+            self.worker_mesclar = MesclarThread(self.hd_destino, self.hd_origem, self.manter_primeiro, arquivo_plano,
+                                                profile=self.profile_mesclagem_checkbox.isChecked(),
+                                                memory_limit=self.memory_limit)
             self.worker_mesclar.progress_signal.connect(self.log_mesclagem_message)
             self.worker_mesclar.finished_signal.connect(self.mesclagem_finished)
             self.worker_mesclar.progress_update.connect(self.update_mesclagem_progress)
+            self.watch_metrics(self.metrics_mesclagem_label, self.worker_mesclar.metricas,
+                               os.path.join(self.hd_destino, "mesclagem_log.txt"))
             self.worker_mesclar.start()
             self.start_mesclar_btn.setEnabled(False)
     
@@ -908,21 +723,33 @@ class MainWindow(QMainWindow):
         self.progress_mesclagem.setValue(value)
     
     def mesclagem_finished(self):
+        self.unwatch_metrics(self.metrics_mesclagem_label)
         QMessageBox.information(self, "Concluído", 
                               "Mesclagem dos HDs finalizada!")
         self.start_mesclar_btn.setEnabled(True)
         
     def start_organization(self):
+        from movimentacao import PlanoMovimentacao
+        self.plano_simulacao = PlanoMovimentacao() if self.dry_run_checkbox.isChecked() else None
         self.worker = OrganizadorThread(
             self.hd_path, 
             batch_mode=self.batch_mode,
-            duplicate_action=self.duplicate_action
+            duplicate_action=self.duplicate_action,
+            plano=self.plano_simulacao,
+            hash_algorithm=self.hash_algorithm,
+            verification=self.verification,
+            profile=self.profile_checkbox.isChecked(),
+            memory_limit=self.memory_limit
         )
         self.worker.progress_signal.connect(self.log_message)
         self.worker.finished_signal.connect(self.organization_finished)
         self.worker.question_signal.connect(self.show_folder_dialog)
-        self.worker.duplicates_signal.connect(self.handle_duplicate_files)
+        self.worker.duplicate_group_signal.connect(self.add_duplicate_group)
         self.worker.progress_update.connect(self.update_progress)
+        self.duplicates_model.limpar()
+        self.update_duplicates_title()
+        self.watch_metrics(self.metrics_label, self.worker.metricas,
+                           os.path.join(self.hd_path, "reorganizacao_log.txt"))
         self.worker.start()
         self.start_btn.setEnabled(False)
     
@@ -931,76 +758,253 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(value)
         
     def organization_finished(self):
+        self.unwatch_metrics(self.metrics_label)
+        if self.plano_simulacao is not None:
+            self.save_simulation_plan()
         QMessageBox.information(self, "Concluído", 
                               "Organização do HD finalizada com sucesso!")
         self.start_btn.setEnabled(True)
+    
+    def save_simulation_plan(self):
+        """Grava o plano da simulação na raiz do HD e mostra os totais"""
+        arquivo_plano = os.path.join(self.hd_path, NOME_ARQUIVO_PLANO)
+        self.plano_simulacao.salvar(arquivo_plano)
+        self.log_message(self.plano_simulacao.resumo())
+        self.log_message(f"Plano salvo em: {arquivo_plano}")
+    
+    def apply_saved_plan(self):
+        """Carrega um plano gerado por simulação e o aplica depois de confirmar"""
+        arquivo_plano, _ = QFileDialog.getOpenFileName(self, "Selecionar Plano", self.hd_path or "",
+                                                       "Planos (*.jsonl)")
+        if not arquivo_plano:
+            return
+        from movimentacao import PlanoMovimentacao
+        try:
+            plano = PlanoMovimentacao.carregar(arquivo_plano)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível ler o plano: {e}")
+            return
+        
+        retomada = ""
+        if plano.concluidas_anteriores:
+            retomada = (f"\n\n{len(plano.concluidas_anteriores)} operações já aplicadas "
+                        f"anteriormente serão puladas.")
+        reply = QMessageBox.question(
+            self, 'Confirmação',
+            f'Aplicar o plano {arquivo_plano}?\n\n{plano.resumo()}{retomada}',
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
         
+        log_file = os.path.join(os.path.dirname(arquivo_plano), "reorganizacao_log.txt")
+        self.worker_plano = AplicarPlanoThread(plano, log_file, arquivo_plano)
+        self.worker_plano.progress_signal.connect(self.log_message)
+        self.worker_plano.progress_update.connect(self.update_progress)
+        self.worker_plano.finished_signal.connect(self.plan_applied)
+        self.watch_metrics(self.metrics_label, self.worker_plano.metricas, log_file)
+        self.worker_plano.start()
+        self.set_duplicate_actions_enabled(False)
+        
+    def plan_applied(self):
+        self.unwatch_metrics(self.metrics_label)
+        self.set_duplicate_actions_enabled(True)
+    
+    def watch_metrics(self, label, metricas, log_file):
+        """Passa a mostrar as métricas de um trabalho no rótulo e a registrá-las no log"""
+        self.metrics_jobs[label] = (metricas, log_file, time.monotonic())
+        label.clear()
+        if not self.metrics_timer.isActive():
+            self.metrics_timer.start(INTERVALO_METRICAS)
+    
+    def unwatch_metrics(self, label):
+        """Encerra o acompanhamento, registrando no log a situação final"""
+        job = self.metrics_jobs.pop(label, None)
+        if job is not None:
+            texto = job[0].texto()
+            label.setText(texto)
+            self.append_metrics_log(job[1], texto)
+        if not self.metrics_jobs:
+            self.metrics_timer.stop()
+    
+    def refresh_metrics(self):
+        """
+        Atualiza os rótulos de métricas (chamado pelo timer, na thread da
+        interface) e, a cada INTERVALO_LOG_METRICAS, grava-as no log do trabalho.
+        """
+        agora = time.monotonic()
+        for label, (metricas, log_file, ultimo_log) in list(self.metrics_jobs.items()):
+            texto = metricas.texto()
+            label.setText(texto)
+            if texto and (agora - ultimo_log) * 1000 >= INTERVALO_LOG_METRICAS:
+                self.append_metrics_log(log_file, texto)
+                self.metrics_jobs[label] = (metricas, log_file, agora)
+    
+    def append_metrics_log(self, log_file, texto):
+        if not texto:
+            return
+        try:
+            with open(log_file, 'a', encoding='utf-8') as log:
+                log.write(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Métricas:\n{texto}\n")
+        except OSError:
+            pass
+    
     def log_message(self, message):
         """Adiciona mensagem à área de log da aba de organização"""
         self.log_area.append(message)
         
     def process_folder_action(self, folder1, folder2, action):
         """Processa a ação escolhida para pastas duplicadas"""
-        try:
-            if action == 1:  # Manter apenas a primeira
-                shutil.rmtree(folder2)
-                self.log_message(f"Pasta removida: {folder2}")
-            elif action == 2:  # Manter apenas a segunda
-                shutil.rmtree(folder1)
-                self.log_message(f"Pasta removida: {folder1}")
-            elif action == 3:  # Mesclar conteúdo
-                # Mover arquivos únicos da segunda pasta para a primeira
-                for item in os.listdir(folder2):
-                    src = os.path.join(folder2, item)
-                    dst = os.path.join(folder1, item)
-                    if not os.path.exists(dst):
-                        shutil.move(src, dst)
-                        self.log_message(f"Arquivo movido: {src} -> {dst}")
-                
-                # Remover a segunda pasta após a mesclagem
-                shutil.rmtree(folder2)
-                self.log_message(f"Pastas mescladas em: {folder1}")
-            else:  # Manter ambas (action == 0)
-                self.log_message("Ambas as pastas mantidas")
-        except Exception as e:
-            self.log_message(f"Erro ao processar pastas: {str(e)}")
+        from acoes_duplicados import processar_pastas_identicas
+        processar_pastas_identicas((folder1, folder2), modo_acao=action,
+                                   log_callback=self.log_message, plano=self.plano_simulacao)
         
     def show_folder_dialog(self, message, folders):
-        # Se estiver em modo de lote, usa a ação configurada
-        if self.batch_mode and self.folder_action > 0:
-            self.process_folder_action(folders[0], folders[1], self.folder_action - 1)
-            return
-            
-        # Caso contrário, mostra o diálogo
-        dialog = FolderActionDialog(folders[0], folders[1])
-        result = dialog.exec()
-        if result == QDialog.DialogCode.Accepted:
-            action = dialog.radio_group.checkedId()
-            self.process_folder_action(folders[0], folders[1], action)
+        try:
+            # Se estiver em modo de lote, usa a ação configurada
+            if self.batch_mode and self.folder_action > 0:
+                self.process_folder_action(folders[0], folders[1], self.folder_action - 1)
+                return
+                
+            # Caso contrário, mostra o diálogo
+            from dialogos_gui import FolderActionDialog
+            dialog = FolderActionDialog(folders[0], folders[1], self)
+            result = dialog.exec()
+            if result == QDialog.DialogCode.Accepted:
+                action = dialog.radio_group.checkedId()
+                self.process_folder_action(folders[0], folders[1], action)
+        finally:
+            # O worker espera cada resposta antes de tratar os duplicados do lote
+            self.worker.folder_answered()
 
-    def handle_duplicate_files(self, duplicados):
+    def add_duplicate_group(self, hash_arquivo, tamanho, entradas):
+        """Recebe um grupo de duplicados assim que a análise o confirma"""
+        self.duplicates_model.adicionar_grupo(hash_arquivo, tamanho, entradas)
+        self.update_duplicates_title()
+    
+    def update_duplicates_title(self):
+        self.duplicates_title.setText(
+            f"Arquivos Duplicados: {self.duplicates_model.total_grupos} grupos, "
+            f"{formatar_bytes(self.duplicates_model.total_recuperavel)} recuperáveis "
+            "(marque o arquivo a manter em cada grupo)"
+        )
+    
+    def apply_duplicates_filter(self):
+        self.duplicates_model.filtrar(self.folder_filter.text(), self.extension_filter.text())
+    
+    def apply_duplicates_rule(self):
+        """Aplica a regra escolhida a todos os grupos exibidos"""
+        regra = self.rule_combo.currentData()
+        pasta = None
+        if regra == 'pasta':
+            pasta = QFileDialog.getExistingDirectory(self, "Selecione a pasta cujos arquivos devem ser mantidos",
+                                                     self.hd_path or "")
+            if not pasta:
+                return
+        aplicados = self.duplicates_model.aplicar_regra(regra, pasta)
+        self.log_message(f"Regra \"{REGRAS[regra]}\" aplicada a {aplicados} grupos de duplicados")
+    
+    def move_marked_duplicates(self):
+        """Move para "Arquivos Duplicados" todas as cópias não marcadas dos grupos decididos"""
+        if not self.hd_path:
+            QMessageBox.warning(self, "Duplicados", "Selecione o HD antes de tratar os duplicados.")
+            return
+        grupos = self.duplicates_model.grupos_marcados()
+        if not grupos:
+            QMessageBox.information(self, "Duplicados", "Nenhum grupo tem um arquivo marcado para manter.")
+            return
+        total = sum(len(grupo.entradas) - 1 for grupo in grupos)
+        resposta = QMessageBox.question(
+            self, "Duplicados",
+            f"Mover {total} arquivos duplicados de {len(grupos)} grupos para \"Arquivos Duplicados\"?"
+        )
+        if resposta != QMessageBox.StandardButton.Yes:
+            return
+        
+        from acoes_duplicados import agendar_grupo_duplicado, ESCOLHA_MANUAL
+        from movimentacao import PlanoMovimentacao
         pasta_duplicados = os.path.join(self.hd_path, "Arquivos Duplicados")
-        os.makedirs(pasta_duplicados, exist_ok=True)
+        plano = self.plano_simulacao if self.plano_simulacao is not None else PlanoMovimentacao()
+        for grupo in grupos:
+            agendar_grupo_duplicado(grupo.entradas, pasta_duplicados, plano, ESCOLHA_MANUAL, grupo.manter)
+        if self.plano_simulacao is not None:
+            self.save_simulation_plan()
+            self.duplicates_model.remover_grupos(grupos)
+            self.update_duplicates_title()
+        else:
+            self.start_duplicates_plan(plano, grupos)
+    
+    def link_marked_duplicates(self):
+        """
+        Troca as cópias não marcadas dos grupos decididos por reflinks (ou
+        hardlinks) do arquivo marcado: nenhum caminho some e o espaço é
+        recuperado sem copiar dados. Informa no log o espaço de cada grupo.
+        """
+        if not self.hd_path:
+            QMessageBox.warning(self, "Duplicados", "Selecione o HD antes de tratar os duplicados.")
+            return
+        grupos = self.duplicates_model.grupos_marcados()
+        if not grupos:
+            QMessageBox.information(self, "Duplicados", "Nenhum grupo tem um arquivo marcado para manter.")
+            return
+        total = sum(len(grupo.entradas) - 1 for grupo in grupos)
+        resposta = QMessageBox.question(
+            self, "Duplicados",
+            f"Trocar {total} arquivos duplicados de {len(grupos)} grupos por vínculos (reflink ou "
+            "hardlink) do arquivo marcado? Os caminhos continuam existindo."
+        )
+        if resposta != QMessageBox.StandardButton.Yes:
+            return
         
-        for hash_arquivo, arquivos in duplicados.items():
-            dialog = DuplicateFilesDialog(arquivos, self)
-            if dialog.exec() == QDialog.DialogCode.Accepted:
-                action = dialog.radio_group.checkedId()
-                
-                if action == 1:  # Manter apenas o primeiro
-                    primeiro = arquivos[0]
-                    for arquivo in arquivos[1:]:
-                        novo_caminho = mover_para_duplicados(arquivo, pasta_duplicados)
-                        self.log_message(f"Arquivo duplicado movido: {arquivo} -> {novo_caminho}")
-                
-                elif action == 2:  # Escolher manualmente
-                    selecionado = dialog.list_widget.currentRow()
-                    if selecionado >= 0:
-                        arquivo_manter = arquivos[selecionado]
-                        for i, arquivo in enumerate(arquivos):
-                            if i != selecionado:
-                                novo_caminho = mover_para_duplicados(arquivo, pasta_duplicados)
-                                self.log_message(f"Arquivo duplicado movido: {arquivo} -> {novo_caminho}")
+        from acoes_duplicados import agendar_grupo_duplicado, relatorio_grupo, DEDUPLICAR
+        from movimentacao import PlanoMovimentacao
+        pasta_duplicados = os.path.join(self.hd_path, "Arquivos Duplicados")
+        plano = self.plano_simulacao if self.plano_simulacao is not None else PlanoMovimentacao()
+        operacoes = [(grupo.hash, agendar_grupo_duplicado(grupo.entradas, pasta_duplicados, plano,
+                                                          DEDUPLICAR, grupo.manter))
+                     for grupo in grupos]
+        if self.plano_simulacao is not None:
+            self.save_simulation_plan()
+            for hash_arquivo, operacoes_grupo in operacoes:
+                if operacoes_grupo:
+                    self.log_message(relatorio_grupo(hash_arquivo, operacoes_grupo))
+            self.duplicates_model.remover_grupos(grupos)
+            self.update_duplicates_title()
+        else:
+            self.start_duplicates_plan(plano, grupos, operacoes)
+    
+    def start_duplicates_plan(self, plano, grupos, operacoes=()):
+        """
+        Executa em segundo plano o plano dos grupos decididos na tabela; os
+        grupos saem da tabela quando ele termina (duplicates_plan_applied).
+        """
+        log_file = os.path.join(self.hd_path, "reorganizacao_log.txt")
+        self.duplicates_in_progress = (grupos, operacoes)
+        self.worker_plano = AplicarPlanoThread(plano, log_file)
+        self.worker_plano.progress_signal.connect(self.log_message)
+        self.worker_plano.progress_update.connect(self.update_progress)
+        self.worker_plano.finished_signal.connect(self.duplicates_plan_applied)
+        self.watch_metrics(self.metrics_label, self.worker_plano.metricas, log_file)
+        self.worker_plano.start()
+        self.set_duplicate_actions_enabled(False)
+    
+    def duplicates_plan_applied(self):
+        from acoes_duplicados import relatorio_grupo
+        self.unwatch_metrics(self.metrics_label)
+        grupos, operacoes = self.duplicates_in_progress
+        self.duplicates_in_progress = None
+        for hash_arquivo, operacoes_grupo in operacoes:
+            if operacoes_grupo:
+                self.log_message(relatorio_grupo(hash_arquivo, operacoes_grupo, self.worker_plano.concluidas))
+        self.duplicates_model.remover_grupos(grupos)
+        self.update_duplicates_title()
+        self.set_duplicate_actions_enabled(True)
+    
+    def set_duplicate_actions_enabled(self, enabled):
+        # Um plano por vez: o de um lote da tabela ou um plano salvo
+        self.move_duplicates_btn.setEnabled(enabled)
+        self.link_duplicates_btn.setEnabled(enabled)
+        self.apply_plan_btn.setEnabled(enabled)
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
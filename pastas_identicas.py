@@ -0,0 +1,113 @@
+import hashlib
+from collections import defaultdict, namedtuple
+
+
+class GrupoPastas(namedtuple('GrupoPastas', ['pastas', 'arquivos', 'tamanho'])):
+    """
+    Pastas com o mesmo conteúdo (mesmos nomes, mesma estrutura e mesmos
+    arquivos), na ordem da varredura. arquivos e tamanho se referem a
+    uma única cópia.
+    """
+    __slots__ = ()
+
+    @property
+    def recuperavel(self):
+        return self.tamanho * (len(self.pastas) - 1)
+
+
+def hashes_por_caminho(grupos_duplicados):
+    """
+    Converte os grupos de duplicados ("algoritmo:hash" -> lista de caminhos)
+    em um dicionário caminho -> "algoritmo:hash".
+    """
+    return {caminho: hash_ for hash_, caminhos in grupos_duplicados.items() for caminho in caminhos}
+
+
+def calcular_digests(inventario, hashes):
+    """
+    Calcula o digest de conteúdo de cada pasta do inventário, das mais
+    profundas para a raiz (árvore de Merkle): o digest de uma pasta é o hash
+    da lista ordenada de (nome, hash do arquivo) e (nome, digest da subpasta)
+    dos seus filhos.
+
+    hashes associa cada caminho de arquivo ao hash do seu conteúdo; só
+    precisa conter os arquivos que têm alguma cópia no HD. Uma pasta com
+    algum arquivo de conteúdo único (fora de hashes), ou com uma subpasta que
+    não foi listada, não pode ter uma cópia idêntica e recebe digest None, o
+    que dispensa ler qualquer arquivo além dos que o filtro de duplicados
+    já leu.
+
+    Retorna um dicionário pasta -> (digest, quantidade de arquivos, bytes).
+    """
+    subpastas = defaultdict(list)
+    for entrada in inventario.pastas:
+        subpastas[entrada.pasta].append(entrada)
+
+    digests = {}
+    for pasta in reversed(inventario.pastas_listadas):
+        itens = []
+        arquivos = 0
+        tamanho = 0
+        unica = False
+        for entrada in inventario.arquivos_da_pasta(pasta):
+            hash_arquivo = hashes.get(entrada.caminho)
+            if hash_arquivo is None:
+                unica = True
+                break
+            itens.append(('F', entrada.nome, hash_arquivo))
+            arquivos += 1
+            tamanho += entrada.tamanho
+        if not unica:
+            for entrada in subpastas.get(pasta, ()):
+                digest, sub_arquivos, sub_tamanho = digests.get(entrada.caminho, (None, 0, 0))
+                if digest is None:
+                    unica = True
+                    break
+                itens.append(('D', entrada.nome, digest))
+                arquivos += sub_arquivos
+                tamanho += sub_tamanho
+        if unica:
+            digests[pasta] = (None, 0, 0)
+            continue
+
+        h = hashlib.sha256()
+        for tipo, nome, valor in sorted(itens, key=lambda item: (item[1], item[0])):
+            h.update(f"{tipo}\0{nome}\0{valor}\0".encode('utf-8', 'surrogateescape'))
+        digests[pasta] = (h.hexdigest(), arquivos, tamanho)
+    return digests
+
+
+def encontrar_pastas_identicas(inventario, hashes):
+    """
+    Agrupa as pastas com conteúdo idêntico por uma simples consulta ao
+    digest, inclusive pastas com nomes diferentes.
+
+    Pastas vazias são ignoradas, e um grupo só é informado se não estiver
+    inteiramente contido em outro (se A e B são idênticas, as subpastas
+    A/x e B/x não aparecem de novo). Retorna uma lista de GrupoPastas,
+    do maior espaço recuperável para o menor.
+    """
+    digests = calcular_digests(inventario, hashes)
+
+    por_digest = defaultdict(list)
+    for pasta in inventario.pastas_listadas:
+        if pasta == inventario.raiz:
+            continue
+        digest, arquivos, _ = digests[pasta]
+        if digest is not None and arquivos:
+            por_digest[digest].append(pasta)
+
+    pai = {entrada.caminho: entrada.pasta for entrada in inventario.pastas}
+    grupos = []
+    for digest, pastas in por_digest.items():
+        if len(pastas) < 2:
+            continue
+        # Se todas as pastas do grupo estão dentro de pastas repetidas, o
+        # grupo já aparece em um nível acima
+        if all(len(por_digest.get(digests.get(pai.get(pasta), (None,))[0], ())) > 1 for pasta in pastas):
+            continue
+        _, arquivos, tamanho = digests[pastas[0]]
+        grupos.append(GrupoPastas(pastas, arquivos, tamanho))
+
+    grupos.sort(key=lambda grupo: grupo.recuperavel, reverse=True)
+    return grupos
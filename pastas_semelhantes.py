@@ -0,0 +1,194 @@
+import os
+import random
+from array import array
+from collections import defaultdict, namedtuple
+
+from pastas_identicas import calcular_digests
+
+# Tamanho da assinatura MinHash de cada pasta
+NUM_PERMUTACOES = 32
+
+# Bandas do LSH (NUM_PERMUTACOES / BANDAS valores por banda). Com 8 bandas de
+# 4 valores, pares com similaridade acima de ~0,6 quase sempre viram candidatos.
+BANDAS = 8
+
+# Similaridade mínima (Jaccard ou contenção) para um par ser informado
+LIMIAR_PADRAO = 0.5
+
+# Pastas com menos arquivos repetidos que isso não são comparadas
+MIN_ARQUIVOS = 3
+
+# Baldes do LSH maiores que isso são ignorados (costumam ser cadeias de
+# pastas-mãe com o mesmo conteúdo dominante e gerariam pares demais)
+MAX_BALDE = 50
+
+# Primo de Mersenne usado nas permutações (a * x + b) mod P
+_PRIMO = (1 << 61) - 1
+
+_aleatorio = random.Random(20190101)
+_PERMUTACOES = [(_aleatorio.randrange(1, _PRIMO), _aleatorio.randrange(0, _PRIMO))
+                for _ in range(NUM_PERMUTACOES)]
+
+
+class ParSemelhante(namedtuple('ParSemelhante', ['pasta1', 'pasta2', 'jaccard', 'contencao',
+                                                 'compartilhados', 'bytes_compartilhados'])):
+    """
+    Duas pastas com boa parte do conteúdo em comum. jaccard é a fração
+    comum do conteúdo das duas juntas; contencao é a fração da menor que
+    também está na maior.
+    """
+    __slots__ = ()
+
+
+def _assinatura_hash(hash_arquivo):
+    """Assinatura MinHash de um único conteúdo ("algoritmo:hash")"""
+    x = int(hash_arquivo.rsplit(':', 1)[-1][:16], 16)
+    return array('Q', [(a * x + b) % _PRIMO for a, b in _PERMUTACOES])
+
+
+def _combinar(assinatura, outra):
+    """A assinatura da união de dois conjuntos é o mínimo elemento a elemento"""
+    if assinatura is None:
+        return outra
+    return array('Q', map(min, assinatura, outra))
+
+
+def calcular_assinaturas(inventario, hashes):
+    """
+    Calcula, das pastas mais profundas para a raiz, a assinatura MinHash
+    do conjunto de conteúdos repetidos de cada pasta (recursivamente).
+    Arquivos de conteúdo único não entram: não podem ser compartilhados.
+
+    Retorna dois dicionários: pasta -> assinatura (só pastas com
+    conteúdo repetido) e pasta -> quantidade de arquivos repetidos.
+    """
+    subpastas = defaultdict(list)
+    for entrada in inventario.pastas:
+        subpastas[entrada.pasta].append(entrada.caminho)
+
+    por_hash = {}
+    assinaturas = {}
+    repetidos = {}
+    for pasta in reversed(inventario.pastas_listadas):
+        assinatura = None
+        quantidade = 0
+        for entrada in inventario.arquivos_da_pasta(pasta):
+            hash_arquivo = hashes.get(entrada.caminho)
+            if hash_arquivo is None:
+                continue
+            if hash_arquivo not in por_hash:
+                por_hash[hash_arquivo] = _assinatura_hash(hash_arquivo)
+            assinatura = _combinar(assinatura, por_hash[hash_arquivo])
+            quantidade += 1
+        for subpasta in subpastas.get(pasta, ()):
+            if subpasta in assinaturas:
+                assinatura = _combinar(assinatura, assinaturas[subpasta])
+                quantidade += repetidos[subpasta]
+        if assinatura is not None:
+            assinaturas[pasta] = assinatura
+            repetidos[pasta] = quantidade
+    return assinaturas, repetidos
+
+
+def _candidatos(assinaturas):
+    """Pares de pastas que caem no mesmo balde em alguma banda do LSH"""
+    linhas = NUM_PERMUTACOES // BANDAS
+    pares = set()
+    for banda in range(BANDAS):
+        inicio = banda * linhas
+        baldes = defaultdict(list)
+        for pasta, assinatura in assinaturas.items():
+            baldes[tuple(assinatura[inicio:inicio + linhas])].append(pasta)
+        for pastas in baldes.values():
+            if len(pastas) < 2 or len(pastas) > MAX_BALDE:
+                continue
+            for i in range(len(pastas)):
+                for j in range(i + 1, len(pastas)):
+                    pares.add((pastas[i], pastas[j]) if pastas[i] < pastas[j] else (pastas[j], pastas[i]))
+    return pares
+
+
+def encontrar_pastas_semelhantes(inventario, hashes, limiar=LIMIAR_PADRAO, max_resultados=200):
+    """
+    Encontra pares de pastas quase idênticas (ex.: "Backup 2019" e
+    "Backup 2019 (2)" diferindo em poucos arquivos) sem comparar todas as
+    pastas entre si: as assinaturas MinHash passam por um LSH, e só os pares
+    candidatos têm a similaridade calculada de forma exata.
+
+    Parâmetros:
+    - inventario: Inventario da varredura
+    - hashes: dicionário caminho -> "algoritmo:hash" dos arquivos repetidos
+    - limiar: similaridade mínima (maior entre Jaccard e contenção)
+    - max_resultados: quantidade máxima de pares retornados
+
+    Pares de pastas idênticas (já tratados por pastas_identicas), pares em
+    que uma pasta está dentro da outra e pares cujas pastas-mãe já formam
+    um par semelhante não são informados. Retorna uma lista de
+    ParSemelhante, do maior volume compartilhado para o menor.
+    """
+    assinaturas, repetidos = calcular_assinaturas(inventario, hashes)
+    assinaturas = {pasta: assinatura for pasta, assinatura in assinaturas.items()
+                   if repetidos[pasta] >= MIN_ARQUIVOS and pasta != inventario.raiz}
+    pares = _candidatos(assinaturas)
+    if not pares:
+        return []
+
+    digests = calcular_digests(inventario, hashes)
+    subpastas = defaultdict(list)
+    for entrada in inventario.pastas:
+        subpastas[entrada.pasta].append(entrada.caminho)
+    tamanhos = {}
+    conteudos = {}
+
+    def conteudo(pasta):
+        """(conjunto de hashes repetidos, quantidade de arquivos únicos) da subárvore"""
+        if pasta not in conteudos:
+            conjunto = set()
+            unicos = 0
+            pendentes = [pasta]
+            while pendentes:
+                atual = pendentes.pop()
+                for entrada in inventario.arquivos_da_pasta(atual):
+                    hash_arquivo = hashes.get(entrada.caminho)
+                    if hash_arquivo is None:
+                        unicos += 1
+                    else:
+                        conjunto.add(hash_arquivo)
+                        tamanhos[hash_arquivo] = entrada.tamanho
+                pendentes.extend(subpastas.get(atual, ()))
+            conteudos[pasta] = (conjunto, unicos)
+        return conteudos[pasta]
+
+    aceitos = {}
+    for pasta1, pasta2 in pares:
+        if pasta2.startswith(os.path.join(pasta1, '')) or pasta1.startswith(os.path.join(pasta2, '')):
+            continue
+        digest1 = digests.get(pasta1, (None,))[0]
+        if digest1 is not None and digest1 == digests.get(pasta2, (None,))[0]:
+            continue
+        conjunto1, unicos1 = conteudo(pasta1)
+        conjunto2, unicos2 = conteudo(pasta2)
+        comuns = conjunto1 & conjunto2
+        if not comuns:
+            continue
+        total1 = len(conjunto1) + unicos1
+        total2 = len(conjunto2) + unicos2
+        jaccard = len(comuns) / (total1 + total2 - len(comuns))
+        contencao = len(comuns) / min(total1, total2)
+        if max(jaccard, contencao) < limiar:
+            continue
+        aceitos[(pasta1, pasta2)] = ParSemelhante(
+            pasta1, pasta2, jaccard, contencao, len(comuns),
+            sum(tamanhos[hash_arquivo] for hash_arquivo in comuns)
+        )
+
+    # Se as pastas-mãe já são semelhantes, o par de subpastas não acrescenta nada
+    resultado = []
+    for (pasta1, pasta2), par in aceitos.items():
+        pais = tuple(sorted((os.path.dirname(pasta1), os.path.dirname(pasta2))))
+        if pais in aceitos:
+            continue
+        resultado.append(par)
+
+    resultado.sort(key=lambda par: par.bytes_compartilhados, reverse=True)
+    return resultado[:max_resultados]
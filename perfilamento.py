@@ -0,0 +1,234 @@
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# Contadores do processo inteiro, atualizados só enquanto algum perfil está ativo
+CONTADORES = ('aberturas', 'stats', 'listagens')
+
+# Eventos de auditoria (sys.addaudithook) contados em cada contador
+EVENTOS = {
+    'open': 'aberturas',
+    'os.scandir': 'listagens',
+    'os.listdir': 'listagens',
+}
+
+_lock = threading.Lock()
+_contagens = dict.fromkeys(CONTADORES, 0)
+_ativos = 0
+_gancho_instalado = False
+_originais = {}
+_tracemalloc_proprio = False
+
+
+class MedidaEtapa(namedtuple('MedidaEtapa', ['etapa', 'segundos', 'cpu', 'bytes_lidos', 'bytes_disco',
+                                             'aberturas', 'stats', 'listagens', 'memoria_pico'])):
+    """
+    O que foi medido em uma etapa: tempo total e de CPU (do processo, com
+    as threads de trabalho), bytes lidos pelo processo (bytes_lidos inclui
+    o que veio do cache de páginas; bytes_disco só o que foi lido do
+    dispositivo; None onde o sistema não informa), arquivos abertos, stats,
+    listagens de pasta e pico da memória alocada pelo Python durante a
+    etapa.
+    """
+    __slots__ = ()
+
+
+def contar(contador, quantidade=1):
+    """
+    Soma quantidade ao contador enquanto algum perfil está ativo. Usado
+    onde a chamada não passa pelos pontos observados (como DirEntry.stat
+    na varredura); sem perfil ativo, não faz nada.
+    """
+    if _ativos:
+        with _lock:
+            _contagens[contador] += quantidade
+
+
+def _gancho(evento, argumentos):
+    contador = EVENTOS.get(evento)
+    if contador is not None and _ativos:
+        with _lock:
+            _contagens[contador] += 1
+
+
+def _contar_stat(funcao):
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        contar('stats')
+        return funcao(*args, **kwargs)
+    return envolvida
+
+
+def _ativar():
+    """Liga a contagem na primeira etapa ativa do processo"""
+    global _ativos, _gancho_instalado, _tracemalloc_proprio
+    with _lock:
+        _ativos += 1
+        if _ativos > 1:
+            return
+        # Não há como remover um gancho de auditoria; sem perfil ativo ele só
+        # consulta um dicionário
+        if not _gancho_instalado:
+            sys.addaudithook(_gancho)
+            _gancho_instalado = True
+        # os.stat e os.lstat não têm evento de auditoria; são trocados
+        # enquanto houver etapa ativa (inclusive os usados por os.path)
+        for nome in ('stat', 'lstat'):
+            _originais[nome] = getattr(os, nome)
+            setattr(os, nome, _contar_stat(_originais[nome]))
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_proprio = True
+
+
+def _desativar():
+    global _ativos, _tracemalloc_proprio
+    with _lock:
+        _ativos -= 1
+        if _ativos:
+            return
+        for nome, funcao in _originais.items():
+            setattr(os, nome, funcao)
+        _originais.clear()
+        if _tracemalloc_proprio:
+            tracemalloc.stop()
+            _tracemalloc_proprio = False
+
+
+def _io_processo():
+    """(bytes lidos, bytes lidos do dispositivo) de /proc/self/io, ou (None, None)"""
+    try:
+        with open('/proc/self/io', encoding='ascii') as f:
+            campos = dict(linha.split(': ', 1) for linha in f.read().splitlines() if ': ' in linha)
+        return int(campos['rchar']), int(campos['read_bytes'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def _diferenca(fim, inicio):
+    return fim - inicio if fim is not None and inicio is not None else None
+
+
+class Perfil:
+    """
+    Modo de perfilamento (opcional) de um trabalho longo: cada etapa, em um
+    bloco "with perfil.etapa(nome)", registra tempo total e de CPU, bytes
+    lidos, arquivos abertos, stats, listagens de pasta e pico de memória
+    (tracemalloc), e, com pasta_cprofile, grava a saída do cProfile da
+    etapa em pasta_cprofile/NN_etapa.prof (abra com pstats ou snakeviz).
+
+    As contagens, os bytes lidos e a memória são do processo inteiro: o
+    que as threads de trabalho fazem entra na etapa, mas o mesmo vale para
+    outro trabalho rodando ao mesmo tempo. O cProfile acompanha só a thread
+    que executa a etapa; a leitura feita no executor de hashes aparece
+    como espera. Tudo isso deixa o trabalho mais lento, por isso o modo só
+    é ligado quando pedido.
+    """
+
+    def __init__(self, pasta_cprofile=None):
+        self.pasta_cprofile = pasta_cprofile
+        self.medidas = []
+
+    @contextmanager
+    def etapa(self, nome):
+        _ativar()
+        perfilador = self._iniciar_cprofile()
+        # A leitura de /proc/self/io fica fora das contagens da etapa
+        inicio_io = _io_processo()
+        with _lock:
+            inicio_contagens = dict(_contagens)
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+        memoria_inicial = tracemalloc.get_traced_memory()[0]
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            segundos, cpu = time.perf_counter() - inicio, time.process_time() - inicio_cpu
+            memoria_pico = max(0, tracemalloc.get_traced_memory()[1] - memoria_inicial)
+            with _lock:
+                contagens = {contador: _contagens[contador] - inicio_contagens[contador]
+                             for contador in CONTADORES}
+            fim_io = _io_processo()
+            if perfilador is not None:
+                perfilador.disable()
+                self._gravar_cprofile(perfilador, nome)
+            _desativar()
+            self.medidas.append(MedidaEtapa(
+                nome, segundos, cpu, _diferenca(fim_io[0], inicio_io[0]), _diferenca(fim_io[1], inicio_io[1]),
+                memoria_pico=memoria_pico, **contagens
+            ))
+
+    def _iniciar_cprofile(self):
+        if not self.pasta_cprofile:
+            return None
+        import cProfile
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            # Outro perfilador (um depurador, por exemplo) já está ativo
+            return None
+        return perfilador
+
+    def _gravar_cprofile(self, perfilador, nome):
+        try:
+            os.makedirs(self.pasta_cprofile, exist_ok=True)
+            perfilador.dump_stats(os.path.join(self.pasta_cprofile, f"{len(self.medidas) + 1:02d}_{nome}.prof"))
+        except OSError:
+            pass
+
+    def como_lista(self):
+        """Medidas de cada etapa como dicionários (para JSON)"""
+        return [medida._asdict() for medida in self.medidas]
+
+    def tabela(self):
+        """Resumo de todas as etapas, uma linha por etapa e o total no fim"""
+        from formatacao import formatar_bytes
+
+        def valor_bytes(valor):
+            return formatar_bytes(valor) if valor is not None else "-"
+
+        linhas = [f"{'Etapa':<24}{'Tempo':>10}{'CPU':>10}{'Lidos':>12}{'Do disco':>12}"
+                  f"{'open':>9}{'stat':>10}{'Listagens':>11}{'Memória':>12}"]
+        for medida in self.medidas:
+            linhas.append(
+                f"{medida.etapa:<24}{medida.segundos:>9.2f}s{medida.cpu:>9.2f}s"
+                f"{valor_bytes(medida.bytes_lidos):>12}{valor_bytes(medida.bytes_disco):>12}"
+                f"{medida.aberturas:>9}{medida.stats:>10}{medida.listagens:>11}"
+                f"{formatar_bytes(medida.memoria_pico):>12}"
+            )
+        if len(self.medidas) > 1:
+            def somar(campo):
+                valores = [getattr(medida, campo) for medida in self.medidas]
+                return None if None in valores else sum(valores)
+            linhas.append(
+                f"{'Total':<24}{somar('segundos'):>9.2f}s{somar('cpu'):>9.2f}s"
+                f"{valor_bytes(somar('bytes_lidos')):>12}{valor_bytes(somar('bytes_disco')):>12}"
+                f"{somar('aberturas'):>9}{somar('stats'):>10}{somar('listagens'):>11}"
+                f"{formatar_bytes(max(medida.memoria_pico for medida in self.medidas)):>12}"
+            )
+        if self.pasta_cprofile:
+            linhas.append(f"Saída do cProfile de cada etapa em: {self.pasta_cprofile}")
+        return "\n".join(linhas)
+
+    def registrar(self, log_file):
+        """Acrescenta a tabela ao arquivo de log do trabalho"""
+        if not self.medidas:
+            return
+        try:
+            with open(log_file, 'a', encoding='utf-8') as log:
+                log.write(f"\n=== Perfil da execução ({datetime.now():%Y-%m-%d %H:%M:%S}) ===\n{self.tabela()}\n")
+        except OSError:
+            pass
+
+
+def etapa(perfil, nome):
+    """perfil.etapa(nome), ou um bloco que não mede nada quando perfil é None"""
+    return perfil.etapa(nome) if perfil is not None else nullcontext()
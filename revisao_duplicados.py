@@ -0,0 +1,317 @@
+import os
+from datetime import datetime
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QFont
+from formatacao import formatar_bytes
+
+# Quantidade de linhas entregues à tabela de cada vez (carregamento sob demanda)
+TAMANHO_PAGINA = 1000
+
+# Regras de seleção em massa: identificador -> descrição exibida na interface
+REGRAS = {
+    'primeiro': "Manter o primeiro encontrado",
+    'mais_antigo': "Manter o mais antigo",
+    'mais_recente': "Manter o mais recente",
+    'pasta': "Manter o que está na pasta...",
+    'nenhum': "Desmarcar todos",
+}
+
+
+def converter_extensoes(texto):
+    """Converte "jpg, .PNG" em {'.jpg', '.png'}"""
+    extensoes = set()
+    for parte in texto.replace(';', ',').split(','):
+        parte = parte.strip().lower()
+        if parte:
+            extensoes.add(parte if parte.startswith('.') else '.' + parte)
+    return extensoes
+
+
+class GrupoDuplicado:
+    """
+    Grupo de arquivos com conteúdo idêntico.
+    manter é o índice da entrada que será mantida, ou None se o grupo
+    ainda não foi decidido.
+    """
+    __slots__ = ('hash', 'tamanho', 'entradas', 'manter')
+
+    def __init__(self, hash_, tamanho, entradas):
+        self.hash = hash_
+        self.tamanho = tamanho
+        self.entradas = entradas
+        self.manter = None
+
+    @property
+    def recuperavel(self):
+        """Espaço liberado mantendo apenas uma cópia"""
+        return self.tamanho * (len(self.entradas) - 1)
+
+    @property
+    def arquivos(self):
+        return [entrada.caminho for entrada in self.entradas]
+
+    def escolher(self, regra, pasta=None):
+        """
+        Define qual arquivo manter de acordo com a regra (ver REGRAS).
+        Retorna False se a regra não se aplica ao grupo.
+        """
+        if regra == 'nenhum':
+            self.manter = None
+        elif regra == 'primeiro':
+            self.manter = 0
+        elif regra == 'mais_antigo':
+            self.manter = min(range(len(self.entradas)), key=lambda i: self.entradas[i].mtime_ns)
+        elif regra == 'mais_recente':
+            self.manter = max(range(len(self.entradas)), key=lambda i: self.entradas[i].mtime_ns)
+        elif regra == 'pasta':
+            prefixo = os.path.join(os.path.normpath(pasta), '')
+            for i, entrada in enumerate(self.entradas):
+                if entrada.caminho.startswith(prefixo):
+                    self.manter = i
+                    return True
+            return False
+        else:
+            raise ValueError(f"Regra desconhecida: {regra}")
+        return True
+
+
+class DuplicadosModel(QAbstractTableModel):
+    """
+    Tabela de revisão dos duplicados, com uma linha por arquivo e os
+    arquivos de cada grupo sempre em linhas consecutivas.
+
+    Os grupos chegam enquanto a análise continua e são inseridos direto na
+    posição correta da ordenação atual (por padrão, maior espaço
+    recuperável primeiro). A ordenação e os filtros valem para o grupo
+    inteiro. As linhas são entregues à tabela em páginas (canFetchMore /
+    fetchMore), então a interface continua leve mesmo com centenas de
+    milhares de arquivos.
+    """
+
+    COLUNAS = ["Manter", "Espaço recuperável", "Cópias", "Tamanho", "Modificado", "Pasta", "Arquivo"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._grupos = []
+        self._linhas = []  # (grupo, índice da entrada) na ordem de exibição
+        self._carregadas = 0
+        self._limite = TAMANHO_PAGINA  # linhas pedidas pela tabela até agora
+        self._coluna = 1
+        self._ordem = Qt.SortOrder.DescendingOrder
+        self._filtro_pasta = ""
+        self._filtro_extensoes = set()
+        self._fonte_manter = QFont()
+        self._fonte_manter.setBold(True)
+        self.total_recuperavel = 0
+
+    # Ordenação e filtros
+
+    def _chave(self, grupo):
+        if self._coluna == 0:
+            return grupo.manter is not None
+        if self._coluna == 1:
+            return grupo.recuperavel
+        if self._coluna == 2:
+            return len(grupo.entradas)
+        if self._coluna == 3:
+            return grupo.tamanho
+        if self._coluna == 4:
+            return min(entrada.mtime_ns for entrada in grupo.entradas)
+        if self._coluna == 5:
+            return grupo.entradas[0].pasta.lower()
+        return grupo.entradas[0].nome.lower()
+
+    def _visivel(self, grupo):
+        if not self._filtro_pasta and not self._filtro_extensoes:
+            return True
+        for entrada in grupo.entradas:
+            if self._filtro_pasta and self._filtro_pasta not in entrada.pasta.lower():
+                continue
+            if self._filtro_extensoes and os.path.splitext(entrada.nome)[1].lower() not in self._filtro_extensoes:
+                continue
+            return True
+        return False
+
+    def _posicao(self, grupo):
+        """
+        Busca binária da linha onde o grupo entra na ordenação atual.
+        Empates vão para depois, então a posição sempre cai entre dois grupos.
+        """
+        chave = self._chave(grupo)
+        decrescente = self._ordem == Qt.SortOrder.DescendingOrder
+        inicio, fim = 0, len(self._linhas)
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            outra = self._chave(self._linhas[meio][0])
+            if (outra >= chave) if decrescente else (outra <= chave):
+                inicio = meio + 1
+            else:
+                fim = meio
+        return inicio
+
+    def _reconstruir(self):
+        self.beginResetModel()
+        grupos = [grupo for grupo in self._grupos if self._visivel(grupo)]
+        grupos.sort(key=self._chave, reverse=self._ordem == Qt.SortOrder.DescendingOrder)
+        self._linhas = [(grupo, i) for grupo in grupos for i in range(len(grupo.entradas))]
+        self._limite = TAMANHO_PAGINA
+        self._carregadas = min(self._limite, len(self._linhas))
+        self.endResetModel()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self._coluna = column
+        self._ordem = order
+        self._reconstruir()
+
+    def filtrar(self, pasta="", extensoes=""):
+        """Exibe apenas os grupos com alguma cópia na pasta e com a extensão informadas"""
+        self._filtro_pasta = pasta.strip().lower()
+        self._filtro_extensoes = converter_extensoes(extensoes)
+        self._reconstruir()
+
+    # Carregamento sob demanda
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._carregadas < len(self._linhas)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        quantidade = min(TAMANHO_PAGINA, len(self._linhas) - self._carregadas)
+        if quantidade <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._carregadas, self._carregadas + quantidade - 1)
+        self._carregadas += quantidade
+        self._limite = max(self._limite, self._carregadas)
+        self.endInsertRows()
+
+    # Interface do QAbstractTableModel
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._carregadas
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUNAS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUNAS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() == 0:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        grupo, i = self._linhas[index.row()]
+        entrada = grupo.entradas[i]
+        coluna = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            # Os dados do grupo aparecem só na primeira linha dele
+            if coluna == 1:
+                return formatar_bytes(grupo.recuperavel) if i == 0 else None
+            if coluna == 2:
+                return str(len(grupo.entradas)) if i == 0 else None
+            if coluna == 3:
+                return formatar_bytes(grupo.tamanho) if i == 0 else None
+            if coluna == 4:
+                return datetime.fromtimestamp(entrada.mtime_ns / 1e9).strftime("%d/%m/%Y %H:%M")
+            if coluna == 5:
+                return entrada.pasta
+            if coluna == 6:
+                return entrada.nome
+            return None
+        if role == Qt.ItemDataRole.CheckStateRole and coluna == 0:
+            return Qt.CheckState.Checked if grupo.manter == i else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.FontRole and grupo.manter == i:
+            return self._fonte_manter
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return entrada.caminho
+        if role == Qt.ItemDataRole.TextAlignmentRole and coluna in (1, 2, 3):
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() != 0 or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        grupo, i = self._linhas[index.row()]
+        if Qt.CheckState(value) == Qt.CheckState.Checked:
+            grupo.manter = i
+        elif grupo.manter == i:
+            grupo.manter = None
+        # Marcar um arquivo desmarca os outros do mesmo grupo
+        primeira = index.row() - i
+        ultima = min(primeira + len(grupo.entradas), self._carregadas) - 1
+        self.dataChanged.emit(self.index(primeira, 0), self.index(ultima, self.columnCount() - 1))
+        return True
+
+    # Manipulação dos grupos
+
+    @property
+    def total_grupos(self):
+        return len(self._grupos)
+
+    def grupos_marcados(self):
+        """Grupos (inclusive os escondidos pelo filtro) com um arquivo escolhido para manter"""
+        return [grupo for grupo in self._grupos if grupo.manter is not None]
+
+    def adicionar_grupo(self, hash_, tamanho, entradas):
+        grupo = GrupoDuplicado(hash_, tamanho, entradas)
+        self._grupos.append(grupo)
+        self.total_recuperavel += grupo.recuperavel
+        if not self._visivel(grupo):
+            return grupo
+
+        posicao = self._posicao(grupo)
+        novas = [(grupo, i) for i in range(len(entradas))]
+        if posicao < self._carregadas or self._carregadas < self._limite:
+            self.beginInsertRows(QModelIndex(), posicao, posicao + len(novas) - 1)
+            self._linhas[posicao:posicao] = novas
+            self._carregadas += len(novas)
+            self.endInsertRows()
+            # Linhas inseridas no meio empurram as do fim para fora da parte carregada
+            excedente = self._carregadas - max(self._limite, posicao + len(novas))
+            if excedente > 0:
+                self.beginRemoveRows(QModelIndex(), self._carregadas - excedente, self._carregadas - 1)
+                self._carregadas -= excedente
+                self.endRemoveRows()
+        else:
+            # Fora da parte já carregada: aparece quando a tabela pedir mais linhas
+            self._linhas[posicao:posicao] = novas
+        return grupo
+
+    def aplicar_regra(self, regra, pasta=None):
+        """
+        Aplica a regra de seleção aos grupos visíveis (respeitando o filtro).
+        Retorna a quantidade de grupos em que a regra foi aplicada.
+        """
+        aplicados = 0
+        anterior = None
+        for grupo, _ in self._linhas:
+            if grupo is not anterior:
+                anterior = grupo
+                if grupo.escolher(regra, pasta):
+                    aplicados += 1
+        if self._carregadas:
+            self.dataChanged.emit(self.index(0, 0), self.index(self._carregadas - 1, self.columnCount() - 1))
+        return aplicados
+
+    def remover_grupos(self, grupos):
+        """Remove os grupos (já tratados) da tabela"""
+        removidos = {id(grupo) for grupo in grupos}
+        self._grupos = [grupo for grupo in self._grupos if id(grupo) not in removidos]
+        self.total_recuperavel = sum(grupo.recuperavel for grupo in self._grupos)
+        self._reconstruir()
+
+    def limpar(self):
+        self.beginResetModel()
+        self._grupos = []
+        self._linhas = []
+        self._carregadas = 0
+        self._limite = TAMANHO_PAGINA
+        self.total_recuperavel = 0
+        self.endResetModel()
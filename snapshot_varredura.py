@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import time
+
+from varredura import EntradaInventario
+
+# Arquivo do snapshot, salvo na raiz do HD junto com o cache de hashes
+NOME_ARQUIVO_SNAPSHOT = "snapshot_varredura.sqlite"
+
+# Incrementar sempre que o esquema mudar; o snapshot antigo é descartado
+VERSAO_ESQUEMA = 2
+
+# As pastas listadas são gravadas a cada TAMANHO_LOTE pastas ou a cada
+# INTERVALO_GRAVACAO segundos, o que vier primeiro
+TAMANHO_LOTE = 500
+INTERVALO_GRAVACAO = 5.0
+
+# Uma pasta modificada até MARGEM_NS antes de ser listada não é
+# reaproveitada: em sistemas de arquivos com datas de baixa resolução
+# (FAT guarda 2 segundos), uma mudança logo depois da listagem poderia
+# manter o mesmo mtime
+MARGEM_NS = 2_000_000_000
+
+
+class SnapshotVarredura:
+    """
+    Snapshot persistente da última varredura em SQLite: o estado (mtime,
+    inode, dispositivo) de cada pasta listada e as entradas encontradas
+    nela, na ordem da listagem.
+
+    Criar, remover ou renomear algo dentro de uma pasta altera o mtime dela.
+    Se o estado de uma pasta não mudou, as entradas gravadas são
+    reaproveitadas e a pasta não é listada de novo; só as subárvores que
+    mudaram são percorridas no disco.
+
+    As pastas são gravadas em lotes à medida que são listadas, então uma
+    varredura interrompida (HD desconectado, falha) também serve de ponto de
+    partida: na próxima, tudo o que já foi listado é reaproveitado.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.reaproveitadas = 0
+        self.listadas = 0
+        self._pendentes = []
+        self._ultima_gravacao = time.monotonic()
+        self._visitadas = set()
+
+        self.conexao = sqlite3.connect(caminho)
+        self.conexao.execute("PRAGMA journal_mode=TRUNCATE")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self._criar_esquema()
+
+        # pasta -> ((mtime_ns, inode, dispositivo), momento da listagem)
+        self._pastas = {
+            caminho: ((mtime_ns, inode, dispositivo), listada_em)
+            for caminho, mtime_ns, inode, dispositivo, listada_em in self.conexao.execute("SELECT * FROM pastas")
+        }
+
+    def _criar_esquema(self):
+        versao = self.conexao.execute("PRAGMA user_version").fetchone()[0]
+        if versao != VERSAO_ESQUEMA:
+            self.conexao.execute("DROP TABLE IF EXISTS pastas")
+            self.conexao.execute("DROP TABLE IF EXISTS entradas")
+            self.conexao.execute("DROP TABLE IF EXISTS meta")  # versão 1
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS pastas (
+                caminho TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                dispositivo INTEGER NOT NULL,
+                listada_em INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conexao.execute("""
+            CREATE TABLE IF NOT EXISTS entradas (
+                pasta TEXT NOT NULL,
+                ordem INTEGER NOT NULL,
+                nome TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                dispositivo INTEGER NOT NULL,
+                is_dir INTEGER NOT NULL,
+                listar INTEGER NOT NULL,
+                PRIMARY KEY (pasta, ordem)
+            ) WITHOUT ROWID
+        """)
+        self.conexao.execute(f"PRAGMA user_version = {VERSAO_ESQUEMA}")
+        self.conexao.commit()
+
+    @property
+    def total_pastas(self):
+        """Quantidade de pastas registradas pela varredura anterior"""
+        return len(self._pastas)
+
+    @staticmethod
+    def estado(pasta):
+        """(mtime_ns, inode, dispositivo) atuais da pasta; levanta OSError"""
+        st = os.stat(pasta)
+        return (st.st_mtime_ns, st.st_ino, st.st_dev)
+
+    def entradas(self, pasta, estado):
+        """
+        Entradas gravadas da pasta, como tuplas (EntradaInventario, listar),
+        se ela não mudou desde a varredura anterior; caso contrário, None.
+        listar indica as subpastas que devem ser percorridas (não são links).
+        """
+        anterior, listada_em = self._pastas.get(pasta, (None, 0))
+        if anterior != estado or estado[0] >= listada_em - MARGEM_NS:
+            return None
+        self._visitadas.add(pasta)
+        self.reaproveitadas += 1
+        return [
+            (EntradaInventario(pasta, nome, tamanho, mtime_ns, inode, dispositivo, bool(is_dir)), bool(listar))
+            for nome, tamanho, mtime_ns, inode, dispositivo, is_dir, listar in self.conexao.execute(
+                "SELECT nome, tamanho, mtime_ns, inode, dispositivo, is_dir, listar "
+                "FROM entradas WHERE pasta = ? ORDER BY ordem", (pasta,)
+            )
+        ]
+
+    def registrar(self, pasta, estado, itens):
+        """
+        Registra a listagem de uma pasta que precisou ser lida do disco.
+        itens é a lista de tuplas (EntradaInventario, listar) na ordem da listagem.
+        """
+        self._visitadas.add(pasta)
+        self.listadas += 1
+        try:
+            # Nomes que não são UTF-8 válido não podem ir para o SQLite;
+            # a pasta simplesmente será listada de novo na próxima vez
+            pasta.encode('utf-8')
+            for entrada, _ in itens:
+                entrada.nome.encode('utf-8')
+        except UnicodeEncodeError:
+            self._pastas.pop(pasta, None)
+            self._pendentes.append((pasta, None, ()))
+        else:
+            listada_em = time.time_ns()
+            self._pastas[pasta] = (estado, listada_em)
+            self._pendentes.append((pasta, estado + (listada_em,), itens))
+        if (len(self._pendentes) >= TAMANHO_LOTE
+                or time.monotonic() - self._ultima_gravacao >= INTERVALO_GRAVACAO):
+            self._gravar_pendentes()
+
+    def _gravar_pendentes(self):
+        self._ultima_gravacao = time.monotonic()
+        if not self._pendentes:
+            return
+        self.conexao.executemany(
+            "DELETE FROM entradas WHERE pasta = ?",
+            ((pasta,) for pasta, _, _ in self._pendentes)
+        )
+        self.conexao.executemany(
+            "DELETE FROM pastas WHERE caminho = ?",
+            ((pasta,) for pasta, estado, _ in self._pendentes if estado is None)
+        )
+        self.conexao.executemany(
+            "INSERT OR REPLACE INTO pastas VALUES (?, ?, ?, ?, ?)",
+            ((pasta,) + estado for pasta, estado, _ in self._pendentes if estado is not None)
+        )
+        self.conexao.executemany(
+            "INSERT INTO entradas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((pasta, ordem, entrada.nome, entrada.tamanho, entrada.mtime_ns, entrada.inode,
+              entrada.dispositivo, int(entrada.is_dir), int(listar))
+             for pasta, estado, itens in self._pendentes if estado is not None
+             for ordem, (entrada, listar) in enumerate(itens))
+        )
+        self._pendentes = []
+        self.conexao.commit()
+
+    def concluir(self):
+        """
+        Chamado ao fim de uma varredura completa: descarta as pastas que
+        não existem mais.
+        """
+        self._gravar_pendentes()
+        ausentes = [(pasta,) for pasta in self._pastas if pasta not in self._visitadas]
+        self.conexao.executemany("DELETE FROM entradas WHERE pasta = ?", ausentes)
+        self.conexao.executemany("DELETE FROM pastas WHERE caminho = ?", ausentes)
+        for (pasta,) in ausentes:
+            del self._pastas[pasta]
+        self.conexao.commit()
+
+    def resumo(self):
+        """Texto com as estatísticas da varredura incremental para o log"""
+        return (f"Varredura incremental: {self.reaproveitadas} pastas sem alteração reaproveitadas, "
+                f"{self.listadas} listadas no disco")
+
+    def fechar(self):
+        self._gravar_pendentes()
+        self.conexao.close()
+
+
+def abrir_snapshot(pasta):
+    """
+    Abre (ou cria) o snapshot da varredura na raiz da pasta.
+    Retorna None se não for possível gravar no HD (ex.: somente leitura).
+    """
+    try:
+        return SnapshotVarredura(os.path.join(pasta, NOME_ARQUIVO_SNAPSHOT))
+    except sqlite3.Error:
+        return None
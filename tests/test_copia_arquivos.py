@@ -0,0 +1,94 @@
+import errno
+import os
+import sys
+
+import pytest
+
+from copia_arquivos import copiar_arquivo, vincular_arquivo
+from movimentacao import PlanoMovimentacao
+
+
+@pytest.fixture
+def copias(tmp_path):
+    original = tmp_path / "original.bin"
+    duplicado = tmp_path / "duplicado.bin"
+    original.write_bytes(b"x" * 4096)
+    duplicado.write_bytes(b"x" * 4096)
+    return str(original), str(duplicado)
+
+
+def _editar_mantendo_tamanho(caminho):
+    st = os.stat(caminho)
+    with open(caminho, 'r+b') as f:
+        f.write(b"y")
+    # Garante uma data diferente mesmo em sistemas de arquivos com pouca resolução
+    os.utime(caminho, ns=(st.st_atime_ns, st.st_mtime_ns + 2_000_000_000))
+
+
+def test_vincular_iguais(copias):
+    original, duplicado = copias
+    plano = PlanoMovimentacao()
+    assert plano.vincular(duplicado, original)
+    plano.executar()
+    assert plano.erros == 0
+    with open(duplicado, 'rb') as f:
+        assert f.read() == b"x" * 4096
+
+
+def test_plano_nao_vincula_duplicado_alterado_com_mesmo_tamanho(copias, tmp_path):
+    original, duplicado = copias
+    plano = PlanoMovimentacao()
+    assert plano.vincular(duplicado, original)
+    arquivo_plano = str(tmp_path / "plano.jsonl")
+    plano.salvar(arquivo_plano)
+
+    _editar_mantendo_tamanho(duplicado)
+    carregado = PlanoMovimentacao.carregar(arquivo_plano)
+    carregado.executar(diario=arquivo_plano)
+
+    assert carregado.erros == 1
+    assert not os.path.samefile(original, duplicado)
+    with open(duplicado, 'rb') as f:
+        assert f.read() == b"y" + b"x" * 4095
+
+
+def test_plano_nao_vincula_original_alterado_com_mesmo_tamanho(copias):
+    original, duplicado = copias
+    plano = PlanoMovimentacao()
+    assert plano.vincular(duplicado, original)
+
+    _editar_mantendo_tamanho(original)
+    plano.executar()
+
+    assert plano.erros == 1
+    with open(duplicado, 'rb') as f:
+        assert f.read() == b"x" * 4096
+
+
+def test_vincular_sem_identidade_compara_o_conteudo(copias):
+    original, duplicado = copias
+    with open(duplicado, 'r+b') as f:
+        f.write(b"y")
+    with pytest.raises(OSError):
+        vincular_arquivo(original, duplicado)
+    with open(duplicado, 'rb') as f:
+        assert f.read() == b"y" + b"x" * 4095
+
+
+def _sendfile_sem_suporte(*args):
+    raise OSError(errno.ENOTSOCK, "Socket operation on non-socket")
+
+
+@pytest.mark.parametrize("plataforma", ["linux", "darwin"])
+def test_copia_sem_sendfile_para_arquivo(tmp_path, monkeypatch, plataforma):
+    # Como no macOS e nos BSDs: sem copy_file_range e sendfile só para sockets
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    monkeypatch.setattr(os, "sendfile", _sendfile_sem_suporte, raising=False)
+    monkeypatch.setattr(sys, "platform", plataforma)
+    origem = tmp_path / "origem.bin"
+    origem.write_bytes(b"z" * 10000)
+
+    resultado = copiar_arquivo(str(origem), str(tmp_path / "destino.bin"))
+
+    assert resultado.tamanho == 10000
+    assert (tmp_path / "destino.bin").read_bytes() == b"z" * 10000
@@ -0,0 +1,32 @@
+from cache_hash import CacheHash
+from hash_arquivos import ALGORITMO_PADRAO, TAMANHO_AMOSTRA, gerar_grupos_duplicados
+from varredura import varrer
+
+
+def _estatisticas(inventario, cache):
+    mensagens = []
+    grupos = list(gerar_grupos_duplicados(inventario.arquivos_por_tamanho(minimo=2), cache=cache,
+                                          log_callback=mensagens.append))
+    return grupos, mensagens
+
+
+def test_acertos_do_cache_nao_contam_como_leitura(tmp_path):
+    pasta = tmp_path / "hd"
+    pasta.mkdir()
+    grande = b"g" * (4 * TAMANHO_AMOSTRA)
+    for nome in ("a.bin", "b.bin", "c.bin"):
+        (pasta / nome).write_bytes(grande)
+    (pasta / "x.txt").write_bytes(b"pequeno")
+    (pasta / "y.txt").write_bytes(b"pequeno")
+
+    inventario = varrer(str(pasta))
+    etapa_3 = f"Etapa 3 (hash completo, {ALGORITMO_PADRAO}): "
+    # Cada execução abre o cache de novo, como nas análises seguidas do mesmo HD
+    for lidos, do_cache in ((5, 0), (0, 5)):
+        cache = CacheHash(str(tmp_path / "cache.sqlite"))
+        try:
+            grupos, mensagens = _estatisticas(inventario, cache)
+        finally:
+            cache.fechar()
+        assert len(grupos) == 2
+        assert f"{etapa_3}{lidos} arquivos lidos por inteiro, {do_cache} encontrados no cache" in mensagens
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from acoes_duplicados import processar_pastas_identicas
+from movimentacao import PlanoMovimentacao
+
+
+def _escrever(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+
+
+@pytest.fixture
+def hd(tmp_path, monkeypatch):
+    """HD com uma pasta duplicada, com a pasta de trabalho na pasta acima dele"""
+    raiz = tmp_path / "hd"
+    _escrever(str(raiz / "Fotos" / "a.jpg"), b"a" * 100)
+    _escrever(str(raiz / "Copia" / "a.jpg"), b"a" * 100)
+    _escrever(str(raiz / "Copia" / "b.jpg"), b"b" * 50)
+    monkeypatch.chdir(tmp_path)
+    return raiz
+
+
+def test_plano_com_caminhos_relativos_aplicado_de_outra_pasta(hd, tmp_path, monkeypatch):
+    plano = PlanoMovimentacao()
+    plano.mover(os.path.join("hd", "Copia", "b.jpg"), os.path.join("hd", "Fotos"))
+    plano.remover_pasta(os.path.join("hd", "Copia"))
+    arquivo_plano = str(tmp_path / "plano.jsonl")
+    plano.salvar(arquivo_plano)
+
+    with open(arquivo_plano, encoding='utf-8') as f:
+        operacoes = [json.loads(linha) for linha in f][1:]
+    assert all(os.path.isabs(operacao["origem"]) for operacao in operacoes)
+
+    outra = tmp_path / "outra"
+    outra.mkdir()
+    monkeypatch.chdir(outra)
+    carregado = PlanoMovimentacao.carregar(arquivo_plano)
+    carregado.executar(diario=arquivo_plano)
+
+    assert carregado.erros == 0
+    assert (hd / "Fotos" / "b.jpg").read_bytes() == b"b" * 50
+    assert not (hd / "Copia").exists()
+    assert not (outra / "hd").exists()
+
+
+def test_remocao_de_pasta_ausente_nao_conta_como_aplicada(hd, tmp_path, monkeypatch):
+    plano = PlanoMovimentacao()
+    plano.remover_pasta(str(hd / "Copia"))
+    arquivo_plano = str(tmp_path / "plano.jsonl")
+    plano.salvar(arquivo_plano)
+    os.rename(str(hd / "Copia"), str(hd / "Copia movida"))
+
+    carregado = PlanoMovimentacao.carregar(arquivo_plano)
+    carregado.executar(diario=arquivo_plano)
+
+    # O erro fica registrado e o diário não marca a operação como feita
+    assert carregado.erros == 1
+    assert not PlanoMovimentacao.carregar(arquivo_plano).concluidas_anteriores
+
+
+def test_processar_pastas_identicas_com_caminho_relativo(hd, tmp_path):
+    plano = processar_pastas_identicas((os.path.join("hd", "Fotos"), os.path.join("hd", "Copia")),
+                                       modo_acao=1, plano=PlanoMovimentacao())
+    assert [operacao.origem for operacao in plano.operacoes] == [str(hd / "Copia")]
+
+
+def test_espaco_recuperado_sem_contar_duas_vezes(hd):
+    plano = PlanoMovimentacao()
+    # Mover para "Arquivos Duplicados" no mesmo HD não libera espaço
+    plano.mover(str(hd / "Copia" / "a.jpg"), str(hd / "Arquivos Duplicados"), recupera=True)
+    # A remoção libera só o que ainda estará na pasta (b.jpg)
+    plano.remover_pasta(str(hd / "Copia"))
+    assert plano.totais()["bytes_recuperados"] == 50
+
+    uso_antes = sum(os.lstat(os.path.join(pasta, nome)).st_size
+                    for pasta, _, nomes in os.walk(str(hd)) for nome in nomes)
+    plano.executar()
+    uso_depois = sum(os.lstat(os.path.join(pasta, nome)).st_size
+                     for pasta, _, nomes in os.walk(str(hd)) for nome in nomes)
+    assert plano.erros == 0
+    assert uso_antes - uso_depois == 50
@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from organizador_cli import main
+
+
+@pytest.fixture
+def hd(tmp_path):
+    """HD com duas pastas idênticas, A e B"""
+    raiz = tmp_path / "hd"
+    for pasta in ("A", "B"):
+        (raiz / pasta).mkdir(parents=True)
+        (raiz / pasta / "foto.jpg").write_bytes(b"f" * 100)
+        (raiz / pasta / "nota.txt").write_bytes(b"n" * 30)
+    return raiz
+
+
+def test_pastas_identicas_antes_dos_duplicados(hd):
+    assert main(["dupes", str(hd), "-q", "--duplicates", "keep-first", "--folders", "keep-second"]) == 0
+
+    # Uma das pastas foi removida e a outra continua inteira, sem nada movido dela
+    restantes = [pasta for pasta in ("A", "B") if (hd / pasta).exists()]
+    assert len(restantes) == 1
+    assert (hd / restantes[0] / "foto.jpg").read_bytes() == b"f" * 100
+    assert (hd / restantes[0] / "nota.txt").read_bytes() == b"n" * 30
+    assert not os.path.exists(str(hd / "Arquivos Duplicados"))
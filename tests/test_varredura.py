@@ -0,0 +1,30 @@
+import pytest
+
+import varredura
+from varredura import varrer
+
+
+@pytest.fixture
+def inventario(tmp_path):
+    tamanhos = {"a": 10, "b": 20, "c": 10, "d": 30, "e": 20, "f": 10, "g": 40}
+    for nome, tamanho in tamanhos.items():
+        (tmp_path / nome).write_bytes(b"x" * tamanho)
+    return varrer(str(tmp_path))
+
+
+def _esperado(inventario, minimo):
+    grupos = {}
+    for entrada in inventario.arquivos:
+        grupos.setdefault(entrada.tamanho, []).append(entrada.caminho)
+    return {tamanho: caminhos for tamanho, caminhos in grupos.items() if len(caminhos) >= minimo}
+
+
+@pytest.mark.parametrize("minimo", [1, 2])
+def test_arquivos_por_tamanho_sem_numpy(inventario, monkeypatch, minimo):
+    monkeypatch.setattr(varredura, "numpy", None)
+    grupos = inventario.arquivos_por_tamanho(minimo=minimo)
+
+    assert list(grupos) == sorted(grupos)
+    assert {tamanho: [entrada.caminho for entrada in entradas] for tamanho, entradas in grupos.items()} \
+        == _esperado(inventario, minimo)
+    assert grupos.unicos == (2 if minimo == 2 else 0)
@@ -0,0 +1,570 @@
+import os
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from collections.abc import Mapping, Sequence
+
+from perfilamento import contar
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Arquivos criados pelo próprio programa na raiz do HD, ignorados na varredura
+ARQUIVOS_INTERNOS = frozenset({
+    'cache_hashes.sqlite',
+    'cache_hashes.sqlite-journal',
+    'snapshot_varredura.sqlite',
+    'snapshot_varredura.sqlite-journal',
+})
+
+# Quantidade máxima de caminhos de pastas montados guardados para reuso
+LIMITE_CAMINHOS = 65536
+
+
+class EntradaInventario(namedtuple('EntradaInventario',
+                                   ['pasta', 'nome', 'tamanho', 'mtime_ns',
+                                    'inode', 'dispositivo', 'is_dir'])):
+    """
+    Um arquivo ou pasta encontrado durante a varredura.
+    """
+    __slots__ = ()
+
+    @property
+    def caminho(self):
+        return os.path.join(self.pasta, self.nome)
+
+
+class _Visao(Sequence):
+    """Sequência somente leitura que monta cada item (entrada ou caminho) só quando é lido"""
+    __slots__ = ('_indices', '_obter')
+
+    def __init__(self, indices, obter):
+        self._indices = indices
+        self._obter = obter
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._obter(indice) for indice in self._indices[i]]
+        return self._obter(self._indices[i])
+
+    def __iter__(self):
+        return map(self._obter, self._indices)
+
+    def __reversed__(self):
+        return map(self._obter, reversed(self._indices))
+
+
+def _vetor(valores):
+    """Converte um vetor de inteiros do NumPy em array('q')"""
+    vetor = array('q')
+    vetor.frombytes(valores.astype(numpy.int64).tobytes())
+    return vetor
+
+
+class GruposPorTamanho(Mapping):
+    """
+    Mapeamento tamanho -> lista de entradas dos arquivos com esse tamanho,
+    em ordem crescente de tamanho, guardado em três vetores: os tamanhos,
+    os limites de cada grupo e os índices dos arquivos no inventário. A
+    lista de EntradaInventario de um grupo só é montada quando ele é lido.
+
+    unicos é a quantidade de arquivos deixados de fora por terem um tamanho
+    com menos arquivos que o mínimo pedido ao inventário.
+    """
+
+    def __init__(self, inventario, tamanhos, limites, indices, unicos=0):
+        self._inventario = inventario
+        self._tamanhos = tamanhos
+        self._limites = limites
+        self._indices = indices
+        self.unicos = unicos
+
+    def _posicao(self, tamanho):
+        posicao = bisect_left(self._tamanhos, tamanho)
+        if posicao < len(self._tamanhos) and self._tamanhos[posicao] == tamanho:
+            return posicao
+        return None
+
+    def __getitem__(self, tamanho):
+        posicao = self._posicao(tamanho)
+        if posicao is None:
+            raise KeyError(tamanho)
+        indices = self._indices[self._limites[posicao]:self._limites[posicao + 1]]
+        return [self._inventario._arquivo(i) for i in indices]
+
+    def __contains__(self, tamanho):
+        return self._posicao(tamanho) is not None
+
+    def __iter__(self):
+        return iter(self._tamanhos)
+
+    def __len__(self):
+        return len(self._tamanhos)
+
+    def quantidade(self, tamanho):
+        """Quantidade de arquivos com o tamanho, sem montar as entradas"""
+        posicao = self._posicao(tamanho)
+        return 0 if posicao is None else self._limites[posicao + 1] - self._limites[posicao]
+
+    def quantidades(self):
+        """Pares (tamanho, quantidade de arquivos) em ordem crescente de tamanho"""
+        limites = self._limites
+        return ((tamanho, limites[posicao + 1] - limites[posicao]) for posicao, tamanho in enumerate(self._tamanhos))
+
+    def fechar(self):
+        pass
+
+
+class Inventario:
+    """
+    Inventário em memória de uma pasta, produzido por uma única varredura.
+
+    Todas as etapas (agrupamento de pastas por nome, agrupamento de arquivos
+    por tamanho, totais de progresso e mesclagem) consultam este inventário
+    em vez de percorrer o disco novamente.
+
+    Para caber dezenas de milhões de arquivos na memória, nada é guardado
+    como objeto por arquivo: as pastas formam uma tabela de ponteiros para
+    a pasta-mãe, os nomes são guardados uma única vez, em UTF-8, em um
+    único bloco de bytes (um "IMG_0001.JPG" repetido em mil pastas ocupa um
+    só trecho) e tamanhos, mtimes, inodes e dispositivos ficam em vetores
+    do módulo array. Os arquivos de cada pasta são contíguos nos vetores. As EntradaInventario e os caminhos só
+    são montados quando lidos (arquivos, pastas, arquivos_da_pasta,
+    percorrer e os grupos de arquivos_por_tamanho).
+    """
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        # Nomes distintos: bytes em UTF-8 concatenados e o início de cada um
+        self._nomes = bytearray()
+        self._inicio_nomes = array('q', [0])
+        self._id_nomes = {}
+        self._dispositivos = []
+        self._id_dispositivos = {}
+        # Tabela de pastas: a raiz é a pasta 0; cada pasta aponta para a
+        # mãe e para o próprio nome, e tem o intervalo dos seus arquivos
+        self._dir_pai = array('i', [-1])
+        self._dir_nome = array('i', [self._id_nome(raiz)])
+        self._dir_inicio = array('q', [0])
+        self._dir_fim = array('q', [0])
+        self._dir_reaproveitada = bytearray(1)
+        # Pastas efetivamente listadas (não inclui links simbólicos para
+        # pastas), na ordem em que foram encontradas (mesma de os.walk)
+        self._listadas = array('i')
+        # Entradas de pastas: a pasta da tabela e os dados do stat
+        self._pst_id = array('i')
+        self._pst_mtime = array('q')
+        self._pst_inode = array('Q')
+        self._pst_dispositivo = array('Q')
+        # Arquivos, na ordem em que foram encontrados
+        self._arq_pasta = array('i')
+        self._arq_nome = array('i')
+        self._arq_tamanho = array('q')
+        self._arq_mtime = array('q')
+        self._arq_inode = array('Q')
+        self._arq_dispositivo = array('I')  # índice em _dispositivos
+        self._atual = None
+        self._caminhos = {0: raiz}
+        self._por_caminho = None
+
+    def _id_nome(self, nome):
+        if self._id_nomes is None:
+            self._id_nomes = {self._nome(i): i for i in range(len(self._inicio_nomes) - 1)}
+        indice = self._id_nomes.get(nome)
+        if indice is None:
+            indice = self._id_nomes[nome] = len(self._inicio_nomes) - 1
+            # surrogatepass preserva nomes que não são UTF-8 válido (surrogateescape)
+            self._nomes += nome.encode('utf-8', 'surrogatepass')
+            self._inicio_nomes.append(len(self._nomes))
+        return indice
+
+    def _nome(self, indice):
+        return self._nomes[self._inicio_nomes[indice]:self._inicio_nomes[indice + 1]].decode('utf-8', 'surrogatepass')
+
+    def _id_dispositivo(self, dispositivo):
+        indice = self._id_dispositivos.get(dispositivo)
+        if indice is None:
+            indice = self._id_dispositivos[dispositivo] = len(self._dispositivos)
+            self._dispositivos.append(dispositivo)
+        return indice
+
+    def _caminho_pasta(self, indice):
+        """Monta (e guarda por um tempo) o caminho da pasta pela cadeia de pastas-mãe"""
+        caminho = self._caminhos.get(indice)
+        if caminho is not None:
+            return caminho
+        cadeia = []
+        while caminho is None:
+            cadeia.append(indice)
+            indice = self._dir_pai[indice]
+            caminho = self._caminhos.get(indice)
+        if len(self._caminhos) + len(cadeia) > LIMITE_CAMINHOS:
+            self._caminhos = {0: self.raiz}
+        for indice in reversed(cadeia):
+            caminho = os.path.join(caminho, self._nome(self._dir_nome[indice]))
+            self._caminhos[indice] = caminho
+        return caminho
+
+    def _arquivo(self, i):
+        return EntradaInventario(self._caminho_pasta(self._arq_pasta[i]), self._nome(self._arq_nome[i]),
+                                 self._arq_tamanho[i], self._arq_mtime[i], self._arq_inode[i],
+                                 self._dispositivos[self._arq_dispositivo[i]], False)
+
+    def _pasta(self, i):
+        indice = self._pst_id[i]
+        return EntradaInventario(self._caminho_pasta(self._dir_pai[indice]), self._nome(self._dir_nome[indice]),
+                                 0, self._pst_mtime[i], self._pst_inode[i], self._pst_dispositivo[i], True)
+
+    def _arquivos_da_pasta(self, indice):
+        return _Visao(range(self._dir_inicio[indice], self._dir_fim[indice]), self._arquivo)
+
+    @property
+    def pastas(self):
+        """Entradas das pastas, na ordem em que foram encontradas"""
+        return _Visao(range(len(self._pst_id)), self._pasta)
+
+    @property
+    def arquivos(self):
+        """Entradas dos arquivos, na ordem em que foram encontrados (mesma de os.walk)"""
+        return _Visao(range(len(self._arq_tamanho)), self._arquivo)
+
+    @property
+    def pastas_listadas(self):
+        """Caminhos das pastas efetivamente listadas (não inclui links simbólicos para pastas)"""
+        return _Visao(self._listadas, self._caminho_pasta)
+
+    @property
+    def pastas_reaproveitadas(self):
+        """Caminhos das pastas cujas entradas vieram do snapshot da varredura anterior"""
+        return {self._caminho_pasta(indice) for indice in self._listadas if self._dir_reaproveitada[indice]}
+
+    @property
+    def total_reaproveitadas(self):
+        return sum(self._dir_reaproveitada[indice] for indice in self._listadas)
+
+    @property
+    def total_arquivos(self):
+        return len(self._arq_tamanho)
+
+    @property
+    def total_pastas(self):
+        return len(self._pst_id)
+
+    @property
+    def total_bytes(self):
+        if numpy is not None and self._arq_tamanho:
+            return int(numpy.frombuffer(self._arq_tamanho, dtype=numpy.int64).sum())
+        return sum(self._arq_tamanho)
+
+    def iniciar_pasta(self, indice, caminho, reaproveitada=False):
+        """
+        Registra a pasta indice (0 para a raiz, ou o retornado por adicionar)
+        como listada; as entradas dela são adicionadas em seguida.
+        """
+        self._listadas.append(indice)
+        self._dir_inicio[indice] = self._dir_fim[indice] = len(self._arq_tamanho)
+        self._dir_reaproveitada[indice] = reaproveitada
+        self._atual = (indice, caminho)
+        self._caminhos[indice] = caminho
+        self._por_caminho = None
+
+    def adicionar(self, entrada):
+        """
+        Adiciona uma entrada da pasta iniciada por último. Para uma pasta,
+        retorna o índice dela, usado em iniciar_pasta quando for listada.
+        """
+        indice, caminho = self._atual
+        if entrada.pasta != caminho:
+            raise ValueError(f"Entrada fora da pasta em listagem ({caminho}): {entrada.caminho}")
+        if entrada.is_dir:
+            filho = len(self._dir_pai)
+            self._dir_pai.append(indice)
+            self._dir_nome.append(self._id_nome(entrada.nome))
+            self._dir_inicio.append(0)
+            self._dir_fim.append(0)
+            self._dir_reaproveitada.append(0)
+            self._pst_id.append(filho)
+            self._pst_mtime.append(entrada.mtime_ns)
+            self._pst_inode.append(entrada.inode)
+            self._pst_dispositivo.append(entrada.dispositivo)
+            return filho
+        self._arq_pasta.append(indice)
+        self._arq_nome.append(self._id_nome(entrada.nome))
+        self._arq_tamanho.append(entrada.tamanho)
+        self._arq_mtime.append(entrada.mtime_ns)
+        self._arq_inode.append(entrada.inode)
+        self._arq_dispositivo.append(self._id_dispositivo(entrada.dispositivo))
+        self._dir_fim[indice] = len(self._arq_tamanho)
+        return None
+
+    def concluir(self):
+        """Fim da varredura: libera o índice usado para reaproveitar os nomes repetidos"""
+        self._id_nomes = None
+        self._atual = None
+
+    def pastas_por_nome(self, minimo=1):
+        """
+        Agrupa os caminhos das pastas pelo nome (sem diferenciar maiúsculas).
+        Com minimo=2, só os nomes repetidos; os caminhos das demais pastas
+        nem são montados.
+        """
+        por_nome = defaultdict(list)
+        for i, indice in enumerate(self._pst_id):
+            por_nome[self._nome(self._dir_nome[indice]).lower()].append(i)
+        pastas = defaultdict(list)
+        for nome, indices in por_nome.items():
+            if len(indices) >= minimo:
+                pastas[nome] = [self._pasta(i).caminho for i in indices]
+        return pastas
+
+    def arquivos_por_tamanho(self, minimo=1, memoria_maxima=None):
+        """
+        Agrupa as entradas de arquivos pelo tamanho em bytes, retornando um
+        GruposPorTamanho. Os arquivos são ordenados pelo tamanho (com o
+        NumPy, se instalado, por argsort e unique), sem criar objetos por
+        arquivo; dentro de cada grupo a ordem é a da varredura. Com
+        minimo=2, os tamanhos únicos ficam de fora e só são contados.
+
+        Se o agrupamento em memória passar de memoria_maxima (bytes), ele é
+        feito em uma tabela SQLite temporária (GruposPorTamanhoEmDisco, com
+        a mesma interface): mais lento, mas sem estourar a memória.
+        """
+        if memoria_maxima:
+            from agrupamento_externo import BYTES_POR_ARQUIVO_AGRUPAMENTO, agrupar_por_tamanho_em_disco
+            if len(self._arq_tamanho) * BYTES_POR_ARQUIVO_AGRUPAMENTO > memoria_maxima:
+                filtro = self._filtro_repetidos() if minimo > 1 else None
+                return agrupar_por_tamanho_em_disco(self._arq_tamanho, self._arquivo, minimo, filtro,
+                                                    memoria_maxima)
+
+        if numpy is not None and self._arq_tamanho:
+            tamanhos = numpy.frombuffer(self._arq_tamanho, dtype=numpy.int64)
+            ordem = numpy.argsort(tamanhos, kind='stable')
+            valores, contagens = numpy.unique(tamanhos[ordem], return_counts=True)
+            del tamanhos  # libera o vetor original para novas inclusões
+            manter = contagens >= minimo
+            indices = ordem[numpy.repeat(manter, contagens)]
+            limites = numpy.concatenate(([0], numpy.cumsum(contagens[manter])))
+            return GruposPorTamanho(self, _vetor(valores[manter]), _vetor(limites), _vetor(indices),
+                                    unicos=int(contagens[~manter].sum()))
+
+        # Só os tamanhos que passam pelo filtro são contados; os demais são
+        # únicos com certeza e, com minimo=1, viram grupos de um arquivo
+        repetido = self._filtro_repetidos()
+        contagem = Counter(tamanho for tamanho in self._arq_tamanho if repetido(tamanho))
+        valores = [tamanho for tamanho, quantidade in contagem.items() if quantidade >= minimo]
+        if minimo <= 1:
+            valores.extend(tamanho for tamanho in self._arq_tamanho if not repetido(tamanho))
+        valores = array('q', sorted(valores))
+        limites = array('q', [0])
+        proximo = {}
+        for tamanho in valores:
+            quantidade = contagem.get(tamanho)
+            if quantidade is None:
+                quantidade = 1
+            else:
+                proximo[tamanho] = limites[-1]
+            limites.append(limites[-1] + quantidade)
+        unicos = len(self._arq_tamanho) - limites[-1]
+        del contagem
+        indices = array('q', bytes(8 * limites[-1]))
+        for i, tamanho in enumerate(self._arq_tamanho):
+            posicao = proximo.get(tamanho)
+            if posicao is not None:
+                indices[posicao] = i
+                proximo[tamanho] = posicao + 1
+            elif minimo <= 1 and not repetido(tamanho):
+                indices[limites[bisect_left(valores, tamanho)]] = i
+        return GruposPorTamanho(self, valores, limites, indices, unicos=unicos)
+
+    def _filtro_repetidos(self):
+        """
+        Teste aproximado de "o tamanho aparece mais de uma vez", com um bit
+        por posição de uma tabela de 8 bits por arquivo: nunca descarta um
+        tamanho repetido e descarta a maioria dos únicos (uns 12% passam),
+        sem um dicionário com todos os tamanhos distintos.
+        """
+        bits = 8 * max(len(self._arq_tamanho), 8)
+        vistos = bytearray(bits // 8)
+        repetidos = bytearray(bits // 8)
+        for tamanho in self._arq_tamanho:
+            posicao = tamanho % bits
+            mascara = 1 << (posicao & 7)
+            if vistos[posicao >> 3] & mascara:
+                repetidos[posicao >> 3] |= mascara
+            else:
+                vistos[posicao >> 3] |= mascara
+        del vistos
+
+        def repetido(tamanho):
+            posicao = tamanho % bits
+            return repetidos[posicao >> 3] >> (posicao & 7) & 1
+        return repetido
+
+    def identificacoes(self):
+        """Tuplas (dispositivo, inode, tamanho, mtime_ns) de todos os arquivos, sem montar as entradas"""
+        return zip(map(self._dispositivos.__getitem__, self._arq_dispositivo), self._arq_inode,
+                   self._arq_tamanho, self._arq_mtime)
+
+    def arquivos_da_pasta(self, pasta):
+        """Entradas dos arquivos que estão diretamente na pasta"""
+        if self._por_caminho is None:
+            self._por_caminho = {self._caminho_pasta(indice): indice for indice in self._listadas}
+        indice = self._por_caminho.get(pasta)
+        return self._arquivos_da_pasta(indice) if indice is not None else []
+
+    def revalidar_reaproveitados(self):
+        """
+        Confere no disco os arquivos reaproveitados do snapshot que têm o
+        tamanho igual ao de outro arquivo, ou seja, os candidatos a duplicado.
+        Editar um arquivo não altera o mtime da pasta, então tamanho e mtime
+        gravados podem estar desatualizados; como esses valores identificam
+        o hash no cache, um valor antigo poderia apontar um duplicado falso.
+        Retorna a quantidade de entradas atualizadas ou removidas.
+        """
+        if not any(self._dir_reaproveitada):
+            return 0
+        repetidos = self.arquivos_por_tamanho(minimo=2)
+        alteradas = 0
+        removidas = set()
+        for i, tamanho in enumerate(self._arq_tamanho):
+            if tamanho not in repetidos or not self._dir_reaproveitada[self._arq_pasta[i]]:
+                continue
+            entrada = self._arquivo(i)
+            try:
+                st = os.stat(entrada.caminho)
+            except OSError:
+                removidas.add(i)
+                continue
+            inode = st.st_ino or entrada.inode
+            if (st.st_size, st.st_mtime_ns, inode) != (entrada.tamanho, entrada.mtime_ns, entrada.inode):
+                self._arq_tamanho[i] = st.st_size
+                self._arq_mtime[i] = st.st_mtime_ns
+                self._arq_inode[i] = inode
+                alteradas += 1
+        if removidas:
+            # Os arquivos de cada pasta continuam contíguos; só os intervalos mudam
+            for nome in ('_arq_pasta', '_arq_nome', '_arq_tamanho', '_arq_mtime', '_arq_inode', '_arq_dispositivo'):
+                vetor = getattr(self, nome)
+                setattr(self, nome, array(vetor.typecode, (valor for i, valor in enumerate(vetor) if i not in removidas)))
+            for indice in self._listadas:
+                self._dir_inicio[indice] = self._dir_fim[indice] = 0
+            anterior = None
+            for i, indice in enumerate(self._arq_pasta):
+                if indice != anterior:
+                    self._dir_inicio[indice] = i
+                    anterior = indice
+                self._dir_fim[indice] = i + 1
+        return alteradas + len(removidas)
+
+    def percorrer(self):
+        """
+        Percorre o inventário como os.walk, sem acessar o disco.
+        Gera tuplas (pasta, entradas_de_arquivos) em ordem top-down.
+        """
+        for indice in self._listadas:
+            yield self._caminho_pasta(indice), self._arquivos_da_pasta(indice)
+
+
+def varrer(pasta, callback=None, snapshot=None, metricas=None):
+    """
+    Percorre a pasta uma única vez usando os.scandir e retorna um Inventario
+    com caminho, tamanho, mtime, inode e tipo de cada entrada.
+
+    Parâmetros:
+    - pasta: pasta raiz da varredura
+    - callback: função chamada com (pastas_listadas, 0) durante a varredura;
+      o total é desconhecido até o fim, por isso o máximo é 0
+    - snapshot: SnapshotVarredura opcional; pastas que não mudaram desde a
+      varredura anterior são reaproveitadas em vez de listadas de novo, e o
+      snapshot é atualizado com as que precisaram ser lidas (nas entradas
+      reaproveitadas, o mtime das subpastas é o da varredura anterior)
+    - metricas: MetricasProgresso opcional que recebe cada pasta listada; com
+      o snapshot, a quantidade de pastas da varredura anterior serve de
+      previsão do total
+    """
+    inventario = Inventario(pasta)
+    # (caminho, índice da pasta no inventário)
+    pendentes = [(pasta, 0)]
+    if metricas is not None:
+        metricas.agendar('varredura', itens=snapshot.total_pastas if snapshot is not None else 0)
+
+    while pendentes:
+        atual, indice = pendentes.pop()
+        estado = None
+        if snapshot is not None:
+            try:
+                # Lido antes da listagem: uma mudança durante a listagem
+                # altera o mtime e a pasta é lida de novo na próxima vez
+                estado = snapshot.estado(atual)
+            except OSError:
+                continue
+            itens = snapshot.entradas(atual, estado)
+            if itens is not None:
+                inventario.iniciar_pasta(indice, atual, reaproveitada=True)
+                subpastas = []
+                for entrada, listar in itens:
+                    filho = inventario.adicionar(entrada)
+                    if listar:
+                        subpastas.append((entrada.caminho, filho))
+                pendentes.extend(reversed(subpastas))
+                if metricas is not None:
+                    metricas.concluir('varredura')
+                if callback:
+                    callback(len(inventario.pastas_listadas), 0)
+                continue
+
+        try:
+            with os.scandir(atual) as it:
+                entradas = list(it)
+        except OSError:
+            continue
+        inventario.iniciar_pasta(indice, atual)
+
+        itens = []
+        subpastas = []
+        for entrada in entradas:
+            if atual == pasta and entrada.name in ARQUIVOS_INTERNOS:
+                continue
+            try:
+                is_dir = entrada.is_dir()
+                st = entrada.stat(follow_symlinks=not is_dir)
+            except OSError:
+                continue
+            registro = EntradaInventario(
+                atual, entrada.name, 0 if is_dir else st.st_size,
+                st.st_mtime_ns, st.st_ino or entrada.inode(), st.st_dev, is_dir
+            )
+            filho = inventario.adicionar(registro)
+            # Assim como os.walk, não entra em links simbólicos para pastas
+            listar = is_dir and not entrada.is_symlink()
+            if listar:
+                subpastas.append((entrada.path, filho))
+            itens.append((registro, listar))
+
+        # DirEntry.stat não passa por os.stat; cada entrada listada conta um
+        contar('stats', len(entradas))
+
+        if snapshot is not None:
+            snapshot.registrar(atual, estado, itens)
+
+        # Empilha em ordem reversa para manter a ordem top-down de os.walk
+        pendentes.extend(reversed(subpastas))
+
+        if metricas is not None:
+            metricas.concluir('varredura')
+        if callback:
+            callback(len(inventario.pastas_listadas), 0)
+
+    inventario.concluir()
+    if snapshot is not None:
+        snapshot.concluir()
+        inventario.revalidar_reaproveitados()
+    if metricas is not None:
+        metricas.encerrar('varredura')
+
+    return inventario